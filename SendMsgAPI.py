@@ -1,4 +1,5 @@
 import os, re, aiofiles, aiohttp, asyncio
+import http_pool
 from time import strftime, localtime
 
 class Log:
@@ -59,7 +60,7 @@ class SendMsgAPI:
         CABINET = 'https://lk.sut.ru/cabinet/'
 
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(10)) as session:
+            async with http_pool.session(http_pool.LK_HOST, timeout=aiohttp.ClientTimeout(10)) as session:
                 async with session.get(f'{CABINET}?login=no') as response:
                     response.raise_for_status()
                     self.cookies = response.cookies
@@ -91,7 +92,7 @@ class SendMsgAPI:
         }
 
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(10)) as session:
+            async with http_pool.session(http_pool.LK_HOST, timeout=aiohttp.ClientTimeout(10)) as session:
                 async with session.post(URL, cookies=self.cookies, data=data) as response:
                     response.raise_for_status()
                     text = await response.text()
@@ -117,7 +118,7 @@ class SendMsgAPI:
             data.add_field("upload", "")
             data.add_field('userfile', file, filename=filename)
 
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(10)) as session:
+            async with http_pool.session(http_pool.LK_HOST, timeout=aiohttp.ClientTimeout(10)) as session:
                 async with session.post(URL, cookies=self.cookies, data=data) as response:
                     response.raise_for_status()
                     text = await response.text()
@@ -136,6 +137,7 @@ async def main():
     idinfo = await api.upload_file('8_marta.jpg')
     for id in ids:
         await api.send_msg(id, '', 'С 8 марта! Йоу!', idinfo)
+    await http_pool.close_connectors()
 
     #api.send_msg(113714, 'Отчисление из СПбГУТ', 'Здравствуйте, спешим вас обрадовать, вы отчислены из СПбГУТ!')
 
@@ -1,6 +1,9 @@
 import os, json, aiohttp, asyncio, threading, re, logging
-from bs4 import BeautifulSoup
 import parsers
+import http_pool
+import parse_pool
+import timetable_model
+import timetable_index
 from datetime import datetime, timedelta, time
 from tqdm.asyncio import tqdm_asyncio
 from time import sleep
@@ -30,7 +33,7 @@ class BonchAPI:
         CABINET = 'https://lk.sut.ru/cabinet/'
         
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(40), trust_env=True, headers=BROWSER_HEADERS, connector=aiohttp.TCPConnector(force_close=True)) as session:
+            async with http_pool.session(http_pool.LK_HOST, timeout=aiohttp.ClientTimeout(40), headers=BROWSER_HEADERS) as session:
                 async with session.get(f'{CABINET}?login=no') as response:
                     response.raise_for_status()
                     self.cookies = response.cookies
@@ -56,7 +59,7 @@ class BonchAPI:
 
         while True:
             try:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(40), trust_env=True, headers=BROWSER_HEADERS, connector=aiohttp.TCPConnector(force_close=True)) as session:
+                async with http_pool.session(http_pool.LK_HOST, timeout=aiohttp.ClientTimeout(40), headers=BROWSER_HEADERS) as session:
                     async with session.get(URL, cookies=self.cookies) as response:
                         response.raise_for_status()
                         text = await response.text()
@@ -66,7 +69,7 @@ class BonchAPI:
                                 response = await self.login(email, password)
                             continue
 
-                        soup = BeautifulSoup(text, 'html.parser')
+                        soup = parsers.make_soup(text)
                         week = soup.find('h3').text.split('№')[1].split()[0]
                         knop_ids = tuple(x['id'][4:] for x in soup.find_all('span') if x.get('id', '').startswith('knop'))
 
@@ -106,7 +109,7 @@ class BonchAPI:
         # сначала запрашиваем список факультетов, затем группы каждого факультета.
         URL = 'https://cabinet.sut.ru/raspisanie_all_new.php'
 
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(20), trust_env=True, headers=BROWSER_HEADERS) as session:
+        async with http_pool.session(http_pool.CABINET_HOST, timeout=aiohttp.ClientTimeout(20), headers=BROWSER_HEADERS) as session:
             async with session.post(URL, data={'choice': '1', 'type_z': '1', 'kurs': ''}) as response:
                 response.raise_for_status()
                 faculties = self._parse_id_name_pairs(await response.text())
@@ -139,11 +142,13 @@ class BonchAPI:
                 status = response.status
                 text = await response.text()
 
-                if status != 200:
-                    return 'Ошибка сервера'
+            if status != 200:
+                return 'Ошибка сервера'
 
-                group_name = self.groups_id.get(group_id, group_id)
-                return parsers.parse_timetable_table(text, group_name, self.first_day)
+            group_name = self.groups_id.get(group_id, group_id)
+            # Разбор — в пуле процессов и уже после возврата соединения в пул:
+            # загрузка следующих групп и event loop не ждут BeautifulSoup.
+            return await parse_pool.parse_timetable_table(text, group_name, self.first_day)
         except Exception as e:
             logging.error("Ошибка при разборе расписания группы %s: %s", group_id, e, exc_info=True)
             return 'Ошибка сервера'
@@ -156,9 +161,16 @@ class BonchAPI:
         
         timetable = {}
         group_items = list(self.groups_id.items())
-        connector = aiohttp.TCPConnector(limit=self.limit)
-        async with aiohttp.ClientSession(connector=connector, trust_env=True, headers=BROWSER_HEADERS) as session:
-            tasks = [self.get_timetable(session, '1', group_id) for group_id, _ in group_items]
+        # Соединения — из общего пула cabinet.sut.ru; self.limit ограничивает
+        # одновременные запросы этой загрузки.
+        slots = asyncio.Semaphore(self.limit)
+
+        async def bounded(group_id):
+            async with slots:
+                return await self.get_timetable(session, '1', group_id)
+
+        async with http_pool.session(http_pool.CABINET_HOST, headers=BROWSER_HEADERS) as session:
+            tasks = [bounded(group_id) for group_id, _ in group_items]
             results = await tqdm_asyncio.gather(*tasks, desc='Загрузка групп', unit=' Групп',
                 bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} | {rate_fmt}{postfix}')
             timetable = {group_name: results[index] for index, (_, group_name) in enumerate(group_items) if not isinstance(results[index], str)}
@@ -177,23 +189,13 @@ class BonchAPI:
 
     @staticmethod
     def teacher_timetable(timetable: dict, teacher: str) -> list:
-        teacher_lessons = []
-        for _, lessons in timetable.items():
-            for lesson in lessons:
-                if lesson['ФИО преподавателя'] and teacher in lesson['ФИО преподавателя']:
-                    teacher_lessons.append(lesson)
-
-        return sorted(teacher_lessons, key=lambda x: (x['Номер недели'], x['Номер дня недели'], BonchAPI.parse_lesson_time(x['Время занятия'])))
+        # Индекс строится один раз на снимок; выдача уже отсортирована
+        # по (неделя, день, время).
+        return timetable_index.for_snapshot(timetable).lookup(timetable_index.TEACHER, teacher)
 
     @staticmethod
     def classroom_timetable(timetable: dict, classroom: str) -> list:
-        classroom_lessons = []
-        for _, lessons in timetable.items():
-            for lesson in lessons:
-                if lesson['Номер кабинета'] and classroom in lesson['Номер кабинета']:
-                    classroom_lessons.append(lesson)
-
-        return sorted(classroom_lessons, key=lambda x: (x['Номер недели'], x['Номер дня недели'], BonchAPI.parse_lesson_time(x['Время занятия'])))
+        return timetable_index.for_snapshot(timetable).lookup(timetable_index.ROOM, classroom)
 
     @staticmethod
     def format_output(timetable: list, week_number: int = None) -> str:
@@ -290,8 +292,12 @@ class BonchAPI:
     @staticmethod
     def save_to_json(timetable: dict, filepath: str = 'timetable.json'):
         try:
+            data = timetable_model.dump_timetable(timetable)
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(timetable, f, indent=4, ensure_ascii=False)
+                if timetable_model.is_compact(data):
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                else:
+                    json.dump(data, f, indent=4, ensure_ascii=False)
             logging.info('Расписание сохранено в файл: %s', filepath)
         except Exception as e:
             logging.error('Ошибка при сохранении расписания в файл: %s', e, exc_info=True)
@@ -300,7 +306,7 @@ class BonchAPI:
     def load_from_json(filepath: str = 'timetable.json') -> dict:
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
-                timetable = json.load(f)
+                timetable = timetable_model.load_timetable(json.load(f))
             logging.info('Расписание загружено из файла: %s', filepath)
             return timetable
         except Exception as e:
@@ -533,7 +539,7 @@ class BonchAPI:
         page_url = f'{BASE_URL}?type=in' if page == 1 else f'{BASE_URL}?page={page}&type=in'
 
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(40), trust_env=True, headers=BROWSER_HEADERS, connector=aiohttp.TCPConnector(force_close=True)) as session:
+            async with http_pool.session(http_pool.LK_HOST, timeout=aiohttp.ClientTimeout(40), headers=BROWSER_HEADERS) as session:
                 # Прогрев сессии — только для первой страницы (необязательный шаг).
                 if page == 1:
                     try:
@@ -582,7 +588,7 @@ class BonchAPI:
                 response = await self.login(self.email, self.password)
         
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(40), trust_env=True, headers=BROWSER_HEADERS, connector=aiohttp.TCPConnector(force_close=True)) as session:
+            async with http_pool.session(http_pool.LK_HOST, timeout=aiohttp.ClientTimeout(40), headers=BROWSER_HEADERS) as session:
                 data = {
                     'id': message_id,
                     'prosmotr': ''
@@ -602,7 +608,7 @@ class BonchAPI:
                         return message_data
                     except json.JSONDecodeError:
                         # Если это не JSON, пытаемся парсить HTML
-                        soup = BeautifulSoup(text, 'html.parser')
+                        soup = parsers.make_soup(text)
                         message_data = {
                             'id': message_id,
                             'annotation': '',
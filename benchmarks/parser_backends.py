@@ -0,0 +1,88 @@
+"""Бенчмарк бэкендов разбора HTML: html.parser против lxml по каждому парсеру.
+
+Запуск из корня проекта:
+    python benchmarks/parser_backends.py [--repeat 200]
+
+Страницы — фикстуры tests/fixtures; для каждой функции parsers.py печатается
+среднее время вызова на обоих бэкендах и ускорение. Быстрый путь
+open_zan/showweek от бэкенда не зависит, поэтому DOM-ветки меряются отдельно
+(*_from_soup).
+"""
+import argparse
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import parsers  # noqa: E402
+
+FIXTURES_DIR = ROOT / "tests" / "fixtures"
+FIRST_DAY = datetime(2025, 9, 1)
+
+
+def _page(html):
+    page = parsers.LKTimetablePage(html)
+    parsers._fill_timetable_page(page)
+    page.days, page.knop_ids  # ленивые поля: меряем и построение DOM
+    return page
+
+
+# функция -> фикстуры, на которых она осмысленна
+CASES = {
+    "parse_week_number": ("raspisanie_with_lessons.html", "raspisanie_today.html"),
+    "week_param (DOM)": ("raspisanie_with_lessons.html", "raspisanie_today.html"),
+    "start_lesson_ids (DOM)": ("raspisanie_with_lessons.html", "raspisanie_today.html"),
+    "extract_lesson_ids_fallback": ("raspisanie_no_candidates.html",),
+    "parse_lk_timetable_page": ("raspisanie_with_lessons.html", "raspisanie_today.html"),
+    "parse_timetable_table": ("group_timetable.html",),
+    "parse_message_rows": ("messages.html",),
+    "parse_total_message_pages": ("messages.html",),
+    "parse_recipients": ("recipients.html",),
+}
+
+FUNCTIONS = {
+    "parse_week_number": parsers.parse_week_number,
+    "week_param (DOM)": lambda html: parsers._week_param_from_soup(parsers.make_soup(html), html),
+    "start_lesson_ids (DOM)": lambda html: parsers._start_lesson_ids_from_soup(parsers.make_soup(html)),
+    "extract_lesson_ids_fallback": parsers.extract_lesson_ids_fallback,
+    # Мимо page_memo: меряем сам разбор.
+    "parse_lk_timetable_page": _page,
+    "parse_timetable_table": lambda html: parsers.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY),
+    "parse_message_rows": parsers.parse_message_rows,
+    "parse_total_message_pages": parsers.parse_total_message_pages,
+    "parse_recipients": parsers.parse_recipients,
+}
+
+
+def _measure(function, pages, repeat: int) -> float:
+    """Среднее время одного вызова (мкс) по всем страницам."""
+    total = 0.0
+    for html in pages:
+        total += min(timeit.repeat(lambda: function(html), number=repeat, repeat=3)) / repeat
+    return total / len(pages) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="вызовов на замер")
+    args = parser.parse_args()
+
+    if parsers.set_html_parser("lxml") != "lxml":
+        sys.exit("lxml не установлен: pip install -r requirements.txt")
+
+    print(f"{'функция':<30} {'html.parser, мкс':>17} {'lxml, мкс':>11} {'ускорение':>10}")
+    for name, fixture_names in CASES.items():
+        pages = [(FIXTURES_DIR / fixture).read_text(encoding="utf-8") for fixture in fixture_names]
+        timings = {}
+        for backend in parsers.HTML_PARSER_BACKENDS:
+            parsers.set_html_parser(backend)
+            timings[backend] = _measure(FUNCTIONS[name], pages, args.repeat)
+        speedup = timings["html.parser"] / timings["lxml"]
+        print(f"{name:<30} {timings['html.parser']:>17.1f} {timings['lxml']:>11.1f} {speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Бенчмарк памяти кэша расписания: старые dict против timetable_model.
+
+Запуск из корня проекта:
+    python benchmarks/timetable_memory.py [--snapshot timetable.json] [--groups 250]
+
+Снимок — реальный timetable.json (любого формата) или синтетический:
+--groups групп по 40 пар на 17 недель со словарём преподавателей, кабинетов и
+предметов как у университета. Снимок пишется в оба формата, затем каждый
+загружается в отдельном процессе, и печатается прирост RSS и размер файла:
+
+- legacy  — как было: json.load старого timetable.json, dict на каждую неделю;
+- compact — как сейчас: BonchAPI.load_from_json компактного файла ->
+  GroupTimetable со слотами и интернированными строками.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import timetable_model  # noqa: E402
+from timetable_model import GroupTimetable  # noqa: E402
+
+FIRST_DAY = datetime(2025, 9, 1)
+LESSON_TIMES = ["09:00-10:35", "10:45-12:20", "13:00-14:35", "14:45-16:20", "16:30-18:05", "18:15-19:50"]
+LESSON_TYPES = ["Лекция", "Практические занятия", "Лабораторная работа"]
+
+
+def synthetic_snapshot(groups: int, seed: int = 1) -> dict:
+    rnd = random.Random(seed)
+    teachers = [f"Преподаватель{i} {chr(0x410 + i % 32)}.{chr(0x410 + i // 32 % 32)}." for i in range(1500)]
+    rooms = [f"{rnd.randint(100, 999)}; Б22/{rnd.randint(1, 2)}" for _ in range(400)]
+    subjects = [f"Дисциплина {i}" for i in range(600)]
+    all_weeks = tuple(range(1, 18))
+    snapshot = {}
+    for group_index in range(groups):
+        pairs = []
+        for _ in range(40):
+            number = rnd.randint(1, 6)
+            weeks = rnd.choice((all_weeks, all_weeks[::2], all_weeks[1::2], all_weeks[:8]))
+            pairs.append((
+                str(number), LESSON_TIMES[number - 1], rnd.randint(0, 5), rnd.choice(subjects),
+                rnd.choice(LESSON_TYPES), rnd.choice(teachers), rnd.choice(rooms), weeks,
+            ))
+        name = f"ИКПИ-{group_index}"
+        snapshot[name] = GroupTimetable.from_pairs(pairs, name, FIRST_DAY)
+    return snapshot
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(mode: str, path: str) -> None:
+    """Дочерний процесс: прирост RSS от загрузки timetable.json в кэш."""
+    from TImetabels import BonchAPI
+
+    gc.collect()
+    before = _rss_bytes()
+    if mode == "legacy":
+        with open(path, encoding="utf-8") as f:
+            timetable = json.load(f)
+    else:
+        timetable = BonchAPI.load_from_json(path)
+    gc.collect()
+    after = _rss_bytes()
+    lessons = sum(len(group) for group in timetable.values())
+    print(json.dumps({"rss": after - before, "lessons": lessons}))
+
+
+def _run_child(mode: str, path: Path) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure", mode, str(path)],
+        check=True, capture_output=True, text=True, cwd=ROOT,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snapshot", help="timetable.json (старый или компактный формат)")
+    parser.add_argument("--groups", type=int, default=250)
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    if args.snapshot:
+        with open(args.snapshot, encoding="utf-8") as f:
+            snapshot = timetable_model.load_timetable(json.load(f))
+    else:
+        snapshot = synthetic_snapshot(args.groups)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = Path(tmp) / "legacy.json"
+        compact_path = Path(tmp) / "compact.json"
+        legacy = {
+            group: [dict(lesson) for lesson in lessons] if isinstance(lessons, GroupTimetable) else lessons
+            for group, lessons in snapshot.items()
+        }
+        with open(legacy_path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f, indent=4, ensure_ascii=False)
+        del legacy
+        data = timetable_model.dump_timetable(snapshot)
+        if not timetable_model.is_compact(data):
+            sys.exit("Снимок не сворачивается в компактный формат без потерь")
+        with open(compact_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+        results = {"legacy": _run_child("legacy", legacy_path), "compact": _run_child("compact", compact_path)}
+        sizes = {"legacy": legacy_path.stat().st_size, "compact": compact_path.stat().st_size}
+
+    print(f"Групп: {len(snapshot)}, занятий: {results['legacy']['lessons']}")
+    print(f"{'формат':<10}{'RSS, МБ':>12}{'файл, МБ':>12}")
+    for name in ("legacy", "compact"):
+        print(f"{name:<10}{results[name]['rss'] / 2**20:>12.1f}{sizes[name] / 2**20:>12.1f}")
+    print(f"RSS: в {results['legacy']['rss'] / max(1, results['compact']['rss']):.1f} раза меньше, "
+          f"файл: в {sizes['legacy'] / sizes['compact']:.1f} раза меньше")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,9 @@
 
 Извлечён из main.py (задача 4.1, шаг 1) — чистая декомпозиция без изменения
 поведения. Side-effects при импорте СОХРАНЕНЫ намеренно: load_dotenv(),
-logging.basicConfig(...), мутация os.environ под прокси. Это лист графа
-зависимостей — модуль импортирует только stdlib + dotenv + yarl.
+logging.basicConfig(...). Прокси в os.environ больше не пишется — его задаёт
+пул соединений lk.sut.ru (http_pool). Это лист графа зависимостей — модуль
+импортирует только stdlib + dotenv + yarl (и stdlib-only lk_limiter).
 """
 import asyncio
 import logging
@@ -16,6 +17,8 @@ from typing import Optional
 from dotenv import load_dotenv
 from yarl import URL as YarlURL
 
+from lk_limiter import AdaptiveLimiter
+
 
 # КРИТИЧНО — порядок: в исходном main.py LK_CONCURRENCY/LK_LOGIN_DELAY_SEC/
 # LK_LOGIN_JITTER_SEC читались из env ДО вызова load_dotenv(). Порядок сохранён
@@ -40,16 +43,24 @@ LESSON_INTERVALS = [
 ]
 
 
-def get_lk_semaphore() -> asyncio.Semaphore:
+def get_lk_semaphore() -> AdaptiveLimiter:
     """
-    В Python 3.9 asyncio.Semaphore привязывается к event loop при создании.
-    Поэтому создаем семафор лениво для текущего loop (иначе получаем
-    'Future attached to a different loop').
+    Ограничитель параллелизма запросов к ЛК (AIMD, см. lk_limiter.py):
+    стартует с LK_CONCURRENCY, растёт до LK_CONCURRENCY_MAX при чистых быстрых
+    ответах и сужается на 403/ERR_MSG/таймаутах.
+    Futures ожидающих привязаны к event loop, поэтому ограничитель создаётся
+    лениво для текущего loop (иначе получаем 'Future attached to a different loop').
     """
     loop = asyncio.get_running_loop()
     sem = _LK_SEMAPHORE_BY_LOOP.get(loop)
     if sem is None:
-        sem = asyncio.Semaphore(LK_CONCURRENCY)
+        sem = AdaptiveLimiter(
+            initial=LK_CONCURRENCY,
+            max_limit=max(LK_CONCURRENCY, LK_CONCURRENCY_MAX),
+            latency_target_sec=LK_LATENCY_TARGET_SEC,
+            backoff_factor=LK_BACKOFF_FACTOR,
+            aging_sec=LK_PRIORITY_AGING_SEC,
+        )
         _LK_SEMAPHORE_BY_LOOP[loop] = sem
     return sem
 
@@ -77,32 +88,124 @@ logging.getLogger('aiogram').setLevel(
 
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 
+# --- Пулы keep-alive соединений к sut.ru ---------------------------------------
+# Каждый DebuggableBonchAPI держит долгоживущую aiohttp-сессию поверх своего
+# cookie_jar; TCP/TLS-соединения берутся из общих пулов по хостам (см.
+# http_pool). Неиспользуемые дольше LK_SESSION_IDLE_SEC сессии закрываются
+# фоновым циклом в main.py. SUT_POOL_LIMIT — лимит на пул каждого из прочих
+# хостов (cabinet.sut.ru, www.sut.ru).
+LK_POOL_LIMIT = max(1, int(os.getenv("LK_POOL_LIMIT", "20")))
+SUT_POOL_LIMIT = max(1, int(os.getenv("SUT_POOL_LIMIT", "20")))
+LK_KEEPALIVE_SEC = float(os.getenv("LK_KEEPALIVE_SEC", "75"))
+LK_SESSION_IDLE_SEC = float(os.getenv("LK_SESSION_IDLE_SEC", "900"))
+
+# --- Адаптивный параллелизм запросов к ЛК --------------------------------------
+# LK_CONCURRENCY (выше) — стартовое окно; при быстрых чистых ответах оно растёт
+# до LK_CONCURRENCY_MAX, на 403/ERR_MSG/таймаутах умножается на LK_BACKOFF_FACTOR.
+# LK_CONCURRENCY_MAX=LK_CONCURRENCY возвращает прежний фиксированный лимит.
+LK_CONCURRENCY_MAX = max(1, int(os.getenv("LK_CONCURRENCY_MAX", "8")))
+LK_LATENCY_TARGET_SEC = float(os.getenv("LK_LATENCY_TARGET_SEC", "3"))
+LK_BACKOFF_FACTOR = min(0.9, max(0.1, float(os.getenv("LK_BACKOFF_FACTOR", "0.5"))))
+# Очередь за окном — по классам (клик > напоминание > хэндлер > фон); каждые
+# LK_PRIORITY_AGING_SEC ожидания поднимают запрос на класс (защита от голодания).
+LK_PRIORITY_AGING_SEC = float(os.getenv("LK_PRIORITY_AGING_SEC", "5"))
+
+# --- Предохранитель ЛК (lk_breaker.py) -----------------------------------------
+# LK_BREAKER_FAILURES сбоев подряд (таймаут, ошибка соединения, 5xx/403) —
+# запросы к ЛК сразу отклоняются LK_BREAKER_RESET_SEC секунд, затем один
+# пробный; неудачная проба удваивает паузу (до LK_BREAKER_RESET_MAX_SEC).
+LK_BREAKER_FAILURES = max(1, int(os.getenv("LK_BREAKER_FAILURES", "5")))
+LK_BREAKER_RESET_SEC = float(os.getenv("LK_BREAKER_RESET_SEC", "60"))
+LK_BREAKER_RESET_MAX_SEC = float(os.getenv("LK_BREAKER_RESET_MAX_SEC", "600"))
+
+# --- Автологин на старте --------------------------------------------------------
+# Пользователи поднимаются LK_STARTUP_WORKERS воркерами (у кого пара раньше —
+# первыми). Полные логины идут в среднем раз в LK_LOGIN_DELAY_SEC (ведро токенов,
+# пачкой до LK_LOGIN_BURST); восстановление сессии из кук темпом не ограничено.
+LK_STARTUP_WORKERS = max(1, int(os.getenv("LK_STARTUP_WORKERS", "4")))
+LK_LOGIN_BURST = max(1, int(os.getenv("LK_LOGIN_BURST", "2")))
+
+# --- Переавторизация при массовом истечении сессий (reauth_service.py) -----------
+# Логины при «Session expired» идут через общую очередь: не больше
+# REAUTH_CONCURRENCY одновременно, темп — как у автологина (LK_LOGIN_DELAY_SEC,
+# LK_LOGIN_BURST). Истечение сессий у REAUTH_STORM_THRESHOLD разных пользователей
+# за REAUTH_STORM_WINDOW_SEC ставит автоотметку всех на паузу
+# REAUTH_STORM_PAUSE_SEC (при неудачной пробе после паузы — вдвое дольше, до
+# REAUTH_STORM_PAUSE_MAX_SEC). Если ЛК отклоняет переавторизацию пользователя
+# (сменился пароль), его контроллер ждёт REAUTH_REJECT_BACKOFF_SEC, дальше
+# вдвое дольше, а после REAUTH_MAX_REJECTIONS отказов подряд останавливается
+# и просит /login.
+REAUTH_CONCURRENCY = max(1, int(os.getenv("REAUTH_CONCURRENCY", "2")))
+REAUTH_STORM_THRESHOLD = max(1, int(os.getenv("REAUTH_STORM_THRESHOLD", "5")))
+REAUTH_STORM_WINDOW_SEC = float(os.getenv("REAUTH_STORM_WINDOW_SEC", "120"))
+REAUTH_STORM_PAUSE_SEC = float(os.getenv("REAUTH_STORM_PAUSE_SEC", "120"))
+REAUTH_STORM_PAUSE_MAX_SEC = float(os.getenv("REAUTH_STORM_PAUSE_MAX_SEC", "900"))
+REAUTH_REJECT_BACKOFF_SEC = float(os.getenv("REAUTH_REJECT_BACKOFF_SEC", "60"))
+REAUTH_MAX_REJECTIONS = max(1, int(os.getenv("REAUTH_MAX_REJECTIONS", "4")))
+
+# --- Автоотметка ------------------------------------------------------------------
+# Проверка отмеченной пары: раз в N минут убеждаемся, что кнопка «Начать
+# занятие» не вернулась (0 — не проверять, после отметки ЛК до конца пары не трогаем).
+LESSON_VERIFY_INTERVAL_MIN = float(os.getenv("LESSON_VERIFY_INTERVAL_MIN", "20"))
+# Тики всех контроллеров раздаёт один планировщик (lesson_scheduler.py); не
+# больше LESSON_SCHEDULER_WORKERS тиков одновременно (остальные ждут в куче).
+LESSON_SCHEDULER_WORKERS = max(1, int(os.getenv("LESSON_SCHEDULER_WORKERS", "16")))
+# Первый клик пары размазан по LESSON_CLICK_SPREAD_SEC после её начала
+# (сдвиг у пользователя постоянный — хэш user_id), чтобы ЛК не получал всплеск
+# кликов в :00. Неудачный клик повторяется через LESSON_CLICK_RETRY_SEC с
+# удвоением до минуты; к LESSON_CLICK_DEADLINE_MIN после начала пары отметка
+# должна быть получена (разброс не выходит за дедлайн, ретраи прижимаются к нему).
+LESSON_CLICK_SPREAD_SEC = max(0.0, float(os.getenv("LESSON_CLICK_SPREAD_SEC", "180")))
+LESSON_CLICK_RETRY_SEC = max(1.0, float(os.getenv("LESSON_CLICK_RETRY_SEC", "15")))
+LESSON_CLICK_DEADLINE_MIN = max(1.0, float(os.getenv("LESSON_CLICK_DEADLINE_MIN", "10")))
+# За LESSON_WARMUP_MIN до каждой пары из плана дня сессия ЛК проверяется одним
+# запросом и при необходимости переавторизуется заранее (0 — без прогрева).
+LESSON_WARMUP_MIN = max(0.0, float(os.getenv("LESSON_WARMUP_MIN", "3")))
+
+# --- Кэш страниц raspisanie.php ---------------------------------------------
+# LRU по неделям на пользователя (см. DebuggableBonchAPI.get_raw_timetable).
+# Текущая неделя меняется на глазах (кнопки «Начать занятие»), поэтому живёт
+# коротко; прошедшие недели не меняются — держим долго; будущие — между ними.
+# LK_TIMETABLE_CACHE_MAX_MB — общий потолок по всем пользователям lk_client.apis.
+LK_TIMETABLE_CACHE_WEEKS = max(1, int(os.getenv("LK_TIMETABLE_CACHE_WEEKS", "6")))
+LK_TIMETABLE_TTL_CURRENT_SEC = float(os.getenv("LK_TIMETABLE_TTL_CURRENT_SEC", "30"))
+LK_TIMETABLE_TTL_FUTURE_SEC = float(os.getenv("LK_TIMETABLE_TTL_FUTURE_SEC", "900"))
+LK_TIMETABLE_TTL_PAST_SEC = float(os.getenv("LK_TIMETABLE_TTL_PAST_SEC", "43200"))
+LK_TIMETABLE_CACHE_MAX_MB = float(os.getenv("LK_TIMETABLE_CACHE_MAX_MB", "64"))
+
+# --- Разбор HTML ----------------------------------------------------------------
+# Бэкенд BeautifulSoup для parsers.py: auto (lxml, если установлен), lxml или
+# html.parser (медленный чистый Python, но без C-зависимостей).
+HTML_PARSER = os.getenv("HTML_PARSER", "auto").strip().lower()
+# Разбор страниц расписания групп идёт в пуле процессов (parse_pool), чтобы
+# BeautifulSoup не блокировал event loop. auto — по квоте CPU контейнера
+# (cgroup cpu.max), 0 — разбирать прямо в event loop, как раньше.
+_PARSE_POOL_WORKERS = os.getenv("PARSE_POOL_WORKERS", "auto").strip().lower()
+PARSE_POOL_WORKERS: Optional[int] = (
+    None if _PARSE_POOL_WORKERS in ("", "auto") else max(0, int(_PARSE_POOL_WORKERS))
+)
+
 # Прокси нужен ТОЛЬКО для запросов в ЛК (lk.sut.ru).
 # Напрямую, без прокси, ходят: Telegram (api.telegram.org) и публичное расписание
 # (cabinet.sut.ru, www.sut.ru) — последнее через прокси отвечает таймаутом.
 #
-# Прокси прокидывается через стандартные переменные HTTP(S)_PROXY: aiohttp-сессии для
-# sut.ru создаются с trust_env=True и подхватывают их автоматически. Хосты из NO_PROXY
-# при этом исключаются и идут напрямую. Telegram-сессия (aiogram AiohttpSession) env не
-# читает вовсе, так что для неё прокси не применяется в любом случае.
+# Прокси задаётся коннектором пула lk.sut.ru в http_pool (aiohttp-socks), а не
+# через os.environ: остальные пулы и Telegram-сессия о нём не знают вовсе.
 NO_PROXY_HOSTS = "api.telegram.org,cabinet.sut.ru,www.sut.ru"
 LK_PROXY = os.getenv("ALL_PROXY")
 if LK_PROXY:
-    for _proxy_var in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy"):
-        os.environ[_proxy_var] = LK_PROXY
-    for _no_proxy_var in ("NO_PROXY", "no_proxy"):
-        os.environ[_no_proxy_var] = NO_PROXY_HOSTS
     logging.info("Прокси для ЛК (lk.sut.ru) включён: %s", YarlURL(LK_PROXY).with_user(None))
     logging.info("Напрямую, без прокси: %s", NO_PROXY_HOSTS)
 else:
     logging.info("ALL_PROXY не задан — запросы в ЛК идут напрямую")
 
-
 # --- Heartbeat для Docker healthcheck ---------------------------------------
 # Пока событийный цикл жив, heartbeat_loop периодически обновляет mtime файла.
 # healthcheck.py (отдельный процесс) проверяет его свежесть. См. docker-compose.yml.
 HEARTBEAT_FILE = Path(os.getenv("HEARTBEAT_FILE", "/tmp/satanbot_heartbeat"))
 HEARTBEAT_INTERVAL_SEC = 30
+# Прогресс автологина на старте (JSON) — healthcheck.py показывает его в выводе.
+STARTUP_STATUS_FILE = Path(os.getenv("STARTUP_STATUS_FILE", "/tmp/satanbot_startup.json"))
 
 
 def _write_heartbeat(path: Path) -> None:
@@ -28,7 +28,9 @@ USERS_SCHEMA = """
         password TEXT NOT NULL,
         notify_enabled INTEGER NOT NULL DEFAULT 1,
         notify_minutes INTEGER NOT NULL DEFAULT 10,
-        autoclick_enabled INTEGER NOT NULL DEFAULT 1
+        autoclick_enabled INTEGER NOT NULL DEFAULT 1,
+        lk_cookies TEXT,
+        next_lesson_at TEXT
     )
 """
 
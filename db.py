@@ -14,6 +14,8 @@ db.cursor (через `import db`), НИКОГДА `from db import conn`, ина
 """
 import sqlite3
 from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 
 # Рабочее соединение с users.db (относительный путь от CWD).
@@ -43,6 +45,10 @@ with closing(sqlite3.connect('users.db')) as _ddl_db:
         _ddl_db.execute('ALTER TABLE users ADD COLUMN notify_minutes INTEGER NOT NULL DEFAULT 10')
     if 'autoclick_enabled' not in _user_columns:
         _ddl_db.execute('ALTER TABLE users ADD COLUMN autoclick_enabled INTEGER NOT NULL DEFAULT 1')
+    if 'lk_cookies' not in _user_columns:
+        _ddl_db.execute('ALTER TABLE users ADD COLUMN lk_cookies TEXT')
+    if 'next_lesson_at' not in _user_columns:
+        _ddl_db.execute('ALTER TABLE users ADD COLUMN next_lesson_at TEXT')
     _ddl_db.commit()
 
 
@@ -104,3 +110,65 @@ def set_autoclick_enabled(user_id: int, enabled: bool) -> None:
             'UPDATE users SET autoclick_enabled = ? WHERE user_id = ?',
             (1 if enabled else 0, user_id),
         )
+
+
+# --- Куки сессии ЛК -------------------------------------------------------------
+# Зашифрованный (security.encrypt_secret) JSON с куками lk.sut.ru: после рестарта
+# бот восстанавливает сессию без повторного логина. Шифрует/расшифровывает
+# вызывающий код — здесь только хранение.
+
+def get_lk_cookies(user_id: int) -> Optional[str]:
+    cursor.execute('SELECT lk_cookies FROM users WHERE user_id = ?', (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def set_lk_cookies(user_id: int, token: Optional[str]) -> None:
+    with conn:
+        cursor.execute(
+            'UPDATE users SET lk_cookies = ? WHERE user_id = ?',
+            (token, user_id),
+        )
+
+
+# --- Ближайшая пара ---------------------------------------------------------------
+# ISO-время начала ближайшей пары из последнего расписания пользователя. Нужно
+# только для порядка автологина на старте: у кого пара раньше — того поднимаем первым.
+
+def set_next_lesson_at(user_id: int, iso_value: Optional[str]) -> None:
+    with conn:
+        cursor.execute(
+            'UPDATE users SET next_lesson_at = ? WHERE user_id = ?',
+            (iso_value, user_id),
+        )
+
+
+def _projected_next_lesson(iso_value: Optional[str], now: datetime) -> Optional[datetime]:
+    """
+    Оценка ближайшей пары по сохранённому времени. После простоя бота оно уже
+    в прошлом: сетка пар повторяется по неделям, поэтому сдвигаем на целое
+    число недель вперёд, до первого момента не раньше now. None — данных нет.
+    """
+    if not iso_value:
+        return None
+    try:
+        value = datetime.fromisoformat(iso_value)
+    except ValueError:
+        return None
+    if value.tzinfo is None:
+        return None
+    if value < now:
+        value += timedelta(weeks=-((value - now) // timedelta(weeks=1)))
+    return value
+
+
+def get_user_ids_by_next_lesson(now: Optional[datetime] = None) -> list:
+    """
+    user_id всех пользователей: сначала с ближайшей парой (прошедшие времена —
+    см. _projected_next_lesson), без данных — в конце, внутри — по user_id.
+    """
+    now = now or datetime.now(timezone.utc)
+    cursor.execute('SELECT user_id, next_lesson_at FROM users ORDER BY user_id')
+    rows = [(user_id, _projected_next_lesson(value, now)) for user_id, value in cursor.fetchall()]
+    rows.sort(key=lambda row: (row[1] is None, row[1] or now))
+    return [user_id for user_id, _start in rows]
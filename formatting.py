@@ -3,16 +3,20 @@
 Лист графа зависимостей: только stdlib + pytz. Не импортирует проектные модули.
 """
 
+from collections.abc import Mapping, Sequence
 from datetime import datetime, timedelta
 
 import pytz
 
 
 def filter_group_lessons_by_date(timetable, date_str: str) -> list:
-    """Занятия группы (дикт-формат) на дату вида '2026.05.18' (поле 'Число')."""
-    if not isinstance(timetable, list):
+    """
+    Занятия группы (дикт-формат: список или timetable_model.GroupTimetable)
+    на дату вида '2026.05.18' (поле 'Число').
+    """
+    if not isinstance(timetable, Sequence) or isinstance(timetable, str):
         return []
-    return [l for l in timetable if isinstance(l, dict) and l.get("Число") == date_str]
+    return [l for l in timetable if isinstance(l, Mapping) and l.get("Число") == date_str]
 
 
 def filter_personal_lessons_by_date(timetable, date_str: str) -> list:
@@ -134,3 +138,18 @@ def format_timetable_dict(timetable: list, title: str = "Расписание",
             formatted_timetable += "\n"
 
     return formatted_timetable
+
+
+def format_catalog_page(title: str, items: list, page: int, pages: int, total: int, footer: str = "") -> str:
+    """
+    Страница каталога (/teachers, /classrooms, /groups).
+    :param items: Пары (название, число занятий) этой страницы.
+    """
+    text = f"{title} ({total})"
+    if pages > 1:
+        text += f", стр. {page + 1}/{pages}"
+    text += ":\n\n"
+    text += "".join(f"• {name} — {count}\n" for name, count in items)
+    if footer:
+        text += f"\n{footer}"
+    return text
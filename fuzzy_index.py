@@ -0,0 +1,213 @@
+"""Нечёткий поиск групп, преподавателей и кабинетов по триграммам.
+
+/group_timetable искал группу перебором api.groups_id с подстрокой и брал
+первое совпадение; поиск преподавателя — подстрока по всем занятиям. Опечатка,
+пропущенный дефис или латинская «A» вместо кириллической «А» — и «не найдено».
+FuzzyIndex:
+
+- нормализует строку (fold): регистр, ё -> е, латинские двойники кириллицы
+  (A/а, C/с, E/е, O/о, P/р, X/х, ...) -> кириллица, пунктуация и дефисы -> пробел;
+- индексирует триграммы ключей: у группы — название, у преподавателя — ФИО и
+  отдельно фамилия, у кабинета — строка целиком и номер до «;»;
+- ранжирует по коэффициенту Дайса общих триграмм (1.0 — совпадение после
+  нормализации), при равенстве — более короткое, затем по алфавиту.
+
+Элементы получают постоянные id: обновление снимка расписания (sync) лишь
+добавляет новые и убирает исчезнувшие, id остальных не меняются, поэтому
+кнопки «возможно, вы имели в виду» (dym:<id>) переживают обновление кэша.
+
+Модуль зависит только от stdlib и timetable_index (виды каталога).
+"""
+import heapq
+import re
+from collections import Counter
+from typing import Optional
+
+from timetable_index import GROUPS, ROOMS, TEACHERS
+
+KINDS = (GROUPS, TEACHERS, ROOMS)
+MIN_SCORE = 0.3
+EXACT_SCORE = 1.0
+
+# Латинские буквы, неотличимые от кириллических на экране. Заглавные и
+# строчные — отдельно: «B» похожа на «В», а «b» — нет.
+_UPPER_LOOKALIKES = str.maketrans({
+    "A": "а", "B": "в", "C": "с", "E": "е", "H": "н", "K": "к", "M": "м",
+    "O": "о", "P": "р", "T": "т", "X": "х", "Y": "у",
+})
+_LOOKALIKES = str.maketrans({
+    "a": "а", "c": "с", "e": "е", "k": "к", "o": "о", "p": "р", "x": "х", "y": "у",
+    "ё": "е",
+})
+_SEPARATORS_RE = re.compile(r"[^\w]+|_")
+
+
+def fold(text: str) -> str:
+    """Нормализованная форма для поиска: кириллица, нижний регистр, пробелы вместо пунктуации."""
+    text = text.translate(_UPPER_LOOKALIKES).lower().translate(_LOOKALIKES)
+    return " ".join(_SEPARATORS_RE.sub(" ", text).split())
+
+
+def trigrams(folded: str) -> frozenset:
+    padded = f"  {folded} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _keys(kind: str, name: str) -> set:
+    """Ключи поиска элемента (нормализованные)."""
+    keys = {fold(name)}
+    if kind == TEACHERS:
+        surname = name.split()[0] if name.split() else ""
+        keys.add(fold(surname))
+    elif kind == ROOMS:
+        keys.add(fold(name.split(";")[0]))
+    keys.discard("")
+    return keys
+
+
+class FuzzyIndex:
+    """Триграммный индекс; id элементов постоянны между sync()."""
+
+    def __init__(self):
+        self._items = []           # id -> (вид, название) или None, если убран
+        self._by_name = {kind: {} for kind in KINDS}   # вид -> название -> id
+        self._item_keys = []       # id -> [id ключа]
+        self._key_info = []        # id ключа -> (id элемента, нормализованный ключ, число триграмм)
+        self._postings = {}        # триграмма -> {id ключа}
+        self._exact = {}           # нормализованный ключ -> {id элемента}
+        self._snapshot = None
+
+    def __len__(self) -> int:
+        return sum(len(names) for names in self._by_name.values())
+
+    def item(self, item_id: int) -> Optional[tuple]:
+        """(вид, название) по id или None — элемент убран при обновлении."""
+        if 0 <= item_id < len(self._items):
+            return self._items[item_id]
+        return None
+
+    def _add(self, kind: str, name: str) -> None:
+        item_id = len(self._items)
+        self._items.append((kind, name))
+        self._by_name[kind][name] = item_id
+        key_ids = []
+        for key in _keys(kind, name):
+            key_id = len(self._key_info)
+            grams = trigrams(key)
+            self._key_info.append((item_id, key, len(grams)))
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(key_id)
+            self._exact.setdefault(key, set()).add(item_id)
+            key_ids.append(key_id)
+        self._item_keys.append(key_ids)
+
+    def _remove(self, kind: str, name: str) -> None:
+        item_id = self._by_name[kind].pop(name)
+        for key_id in self._item_keys[item_id]:
+            _item, key, _count = self._key_info[key_id]
+            for gram in trigrams(key):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(key_id)
+                    if not posting:
+                        del self._postings[gram]
+            exact = self._exact.get(key)
+            if exact is not None:
+                exact.discard(item_id)
+                if not exact:
+                    del self._exact[key]
+        self._items[item_id] = None
+        self._item_keys[item_id] = []
+
+    def sync(self, names_by_kind: dict, snapshot=None) -> tuple:
+        """
+        Приводит индекс к новым спискам названий (вид -> iterable) без полной
+        перестройки. Возвращает (добавлено, убрано).
+        """
+        added = removed = 0
+        for kind, names in names_by_kind.items():
+            names = set(names)
+            current = self._by_name[kind]
+            for name in [name for name in current if name not in names]:
+                self._remove(kind, name)
+                removed += 1
+            for name in sorted(names - current.keys()):
+                self._add(kind, name)
+                added += 1
+        self._snapshot = snapshot
+        return added, removed
+
+    def is_synced(self, snapshot) -> bool:
+        """Индекс построен по тем же объектам: snapshot — объект или кортеж объектов."""
+        if snapshot is None or self._snapshot is None:
+            return False
+        if isinstance(snapshot, tuple):
+            return (isinstance(self._snapshot, tuple) and len(snapshot) == len(self._snapshot)
+                    and all(a is b for a, b in zip(snapshot, self._snapshot)))
+        return self._snapshot is snapshot
+
+    def search(self, query: str, kinds=KINDS, limit: int = 5, min_score: float = MIN_SCORE) -> list:
+        """[(id, вид, название, оценка)] по убыванию оценки; kinds — вид или кортеж видов."""
+        if isinstance(kinds, str):
+            kinds = (kinds,)
+        folded = fold(query)
+        if not folded:
+            return []
+        grams = trigrams(folded)
+        # Counter.update по множествам считает общие триграммы в C, без цикла на ключ.
+        common = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting:
+                common.update(posting)
+
+        size = len(grams)
+        scores = {}
+        top = []                   # мин-куча лучших оценок разных элементов, не больше limit
+        for item_id in self._exact.get(folded, ()):
+            scores[item_id] = EXACT_SCORE
+            if self._items[item_id][0] in kinds:
+                self._push(top, limit, EXACT_SCORE)
+        # Ключи по убыванию числа общих триграмм. Оценка ключа с shared общими
+        # не выше 2*shared/(size+shared): как только эта граница ниже порога или
+        # худшей из limit уже найденных, дальше смотреть незачем.
+        for key_id, shared in common.most_common():
+            bound = 2.0 * shared / (size + shared)
+            if bound < min_score or (len(top) == limit and bound < top[0]):
+                break
+            item_id, _key, count = self._key_info[key_id]
+            if self._items[item_id][0] not in kinds:
+                continue
+            score = min(2.0 * shared / (size + count), EXACT_SCORE)
+            if score < min_score:
+                continue
+            previous = scores.get(item_id)
+            if previous is None:
+                self._push(top, limit, score)
+            if previous is None or score > previous:
+                scores[item_id] = score
+
+        candidates = []
+        for item_id, score in scores.items():
+            kind, name = self._items[item_id]
+            if kind in kinds:
+                candidates.append((-score, len(name), name, item_id))
+        return [(item_id, self._items[item_id][0], name, -neg_score)
+                for neg_score, _length, name, item_id in heapq.nsmallest(limit, candidates)]
+
+    @staticmethod
+    def _push(top: list, limit: int, score: float) -> None:
+        if len(top) < limit:
+            heapq.heappush(top, score)
+        elif score > top[0]:
+            heapq.heapreplace(top, score)
+
+    def exact(self, query: str, kind: str) -> Optional[str]:
+        """Название элемента вида kind, совпадающее с запросом после нормализации."""
+        matches = [self._items[item_id] for item_id in self._exact.get(fold(query), ())]
+        names = sorted(name for item_kind, name in matches if item_kind == kind)
+        return names[0] if names else None
+
+
+# Единый индекс процесса. Доступ — fuzzy_index.index.
+index = FuzzyIndex()
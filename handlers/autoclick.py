@@ -5,7 +5,6 @@ send_autoclick_panel, используемый этим доменом и handle
 Поведение хэндлеров не менялось — только декоратор @dp.* → @router.* и импорты.
 """
 
-import asyncio
 import logging
 
 from aiogram import Router, F, types
@@ -58,7 +57,7 @@ async def cmd_start_lesson(message: types.Message):
         await message.answer("Автокликалка уже запущена.")
         return
 
-    controller.task = asyncio.create_task(controller.start_lesson())
+    await controller.start_lesson()
     set_autoclick_enabled(user_id, True)
     await message.answer("Автокликалка запущена.")
 
@@ -195,7 +194,7 @@ async def cb_autoclick(callback_query: types.CallbackQuery, state: FSMContext):
         if controller.is_running:
             await callback_query.answer("Уже включена")
         else:
-            controller.task = asyncio.create_task(controller.start_lesson())
+            await controller.start_lesson()
             await callback_query.answer("Включил ✅")
         set_autoclick_enabled(user_id, True)
         running = True
@@ -14,6 +14,7 @@ import logging
 from aiogram import Router, F, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
+from aiogram.types import ErrorEvent
 
 from botcore import bot
 from states import UIStates
@@ -96,6 +97,10 @@ async def cmd_login(message: types.Message, state: FSMContext):
             reply_markup=login_prompt_kb(),
         )
         return
+    unavailable = lk_client.lk_unavailable_message()
+    if unavailable:
+        await message.answer(unavailable)
+        return
     status = await message.answer("⏳ Вхожу в ЛК...")
     ok = await perform_login(message.from_user.id, email, password)
     if ok:
@@ -106,7 +111,7 @@ async def cmd_login(message: types.Message, state: FSMContext):
         await message.answer("Меню — снизу 👇", reply_markup=main_menu_kb())
     else:
         try:
-            await status.edit_text("❌ Не удалось войти. Проверь email и пароль.")
+            await status.edit_text(lk_client.lk_unavailable_message() or "❌ Не удалось войти. Проверь email и пароль.")
         except Exception:
             pass
 
@@ -254,6 +259,10 @@ async def fsm_login_password(message: types.Message, state: FSMContext):
             reply_markup=login_prompt_kb(),
         )
         return
+    unavailable = lk_client.lk_unavailable_message()
+    if unavailable:
+        await message.answer(unavailable)
+        return
     status = await message.answer("⏳ Вхожу в ЛК...")
     ok = await perform_login(message.from_user.id, email, password)
     if ok:
@@ -264,7 +273,7 @@ async def fsm_login_password(message: types.Message, state: FSMContext):
         await message.answer("Теперь доступны все разделы 👇", reply_markup=main_menu_kb())
     else:
         try:
-            await status.edit_text("❌ Не удалось войти. Проверь email и пароль.")
+            await status.edit_text(lk_client.lk_unavailable_message() or "❌ Не удалось войти. Проверь email и пароль.")
         except Exception:
             pass
         await message.answer("Попробовать ещё раз?", reply_markup=login_prompt_kb())
@@ -280,3 +289,21 @@ async def fallback_handler(message: types.Message):
         "Не понял 🤔 Пользуйся кнопками меню снизу 👇",
         reply_markup=main_menu_kb(),
     )
+
+
+async def lk_unavailable_error(event: ErrorEvent):
+    """
+    Глобальный обработчик LKUnavailableError (регистрируется в main.register_routers):
+    хэндлер, не поймавший отказ предохранителя ЛК, отвечает готовым текстом, а
+    не молчит с трейсбеком в логах.
+    """
+    text = lk_client.lk_unavailable_message() or str(event.exception)
+    update = event.update
+    try:
+        if update.callback_query is not None:
+            await update.callback_query.answer(text, show_alert=True)
+        elif update.message is not None:
+            await update.message.answer(text)
+    except Exception:
+        logging.debug("Не удалось ответить о недоступности ЛК", exc_info=True)
+    return True
@@ -27,7 +27,7 @@ from keyboards import (
     recipients_page_kb,
 )
 from db import is_registered
-from lk_client import get_message_api, lk_search_recipients, lk_send_message
+from lk_client import get_message_api, lk_search_recipients, lk_send_message, lk_unavailable_message
 import messages_service
 from messages_service import (
     MESSAGES_CACHE_TTL_SEC,
@@ -165,6 +165,10 @@ async def cmd_send_lk(message: types.Message, override_text: str = None):
                 return
 
         # Получаем API с авторизацией и cookies
+        unavailable = lk_unavailable_message()
+        if unavailable:
+            await message.answer(unavailable)
+            return
         message_api = await get_message_api(user_id)
         if not message_api:
             await message.answer("❌ Не удалось авторизоваться в ЛК. Выполните /login и попробуйте снова.")
@@ -274,6 +278,10 @@ async def handle_lk_send_callback(callback_query: CallbackQuery):
         title = payload.get("title", "")
         label = payload.get("label", f"id={recipient_id}")
 
+        unavailable = lk_unavailable_message()
+        if unavailable:
+            await callback_query.answer(unavailable, show_alert=True)
+            return
         message_api = await get_message_api(user_id)
         if not message_api:
             await callback_query.answer("❌ Ошибка авторизации в ЛК. Выполните /login.", show_alert=True)
@@ -318,6 +326,10 @@ async def cmd_messages(message: types.Message, uid: int = None):
             return
 
         # Получаем API для работы с сообщениями
+        unavailable = lk_unavailable_message()
+        if unavailable:
+            await message.answer(unavailable)
+            return
         message_api = await get_message_api(user_id)
         if not message_api:
             await message.answer("❌ Не удалось авторизоваться. Пожалуйста, выполните /login для авторизации.")
@@ -399,6 +411,10 @@ async def handle_message_callback(callback_query: CallbackQuery):
             message_id = data.split("_")[-1]
             await callback_query.answer("⏳ Загружаю сообщение...")
 
+            unavailable = lk_unavailable_message()
+            if unavailable:
+                await callback_query.message.answer(unavailable)
+                return
             message_api = await get_message_api(user_id)
             if not message_api:
                 await callback_query.message.answer("❌ Ошибка авторизации")
@@ -461,6 +477,10 @@ async def handle_message_callback(callback_query: CallbackQuery):
             # Обновление списка сообщений — заново тянем первую страницу.
             await callback_query.answer("🔄 Обновляю список...")
 
+            unavailable = lk_unavailable_message()
+            if unavailable:
+                await callback_query.message.answer(unavailable)
+                return
             message_api = await get_message_api(user_id)
             if not message_api:
                 await callback_query.message.answer("❌ Ошибка авторизации")
@@ -522,6 +542,11 @@ async def cb_msg_write(callback_query: CallbackQuery, state: FSMContext):
 
 async def start_recipient_pick(target_message: types.Message, user_id: int, query: str, state: FSMContext):
     """Ищет получателя: ID или единственный — сразу к тексту, несколько — список с прокруткой."""
+    unavailable = lk_unavailable_message()
+    if unavailable:
+        await state.clear()
+        await target_message.answer(unavailable)
+        return
     message_api = await get_message_api(user_id)
     if not message_api:
         await state.clear()
@@ -664,6 +689,10 @@ async def fsm_write_text(message: types.Message, state: FSMContext):
         )
         return
     user_id = message.from_user.id
+    unavailable = lk_unavailable_message()
+    if unavailable:
+        await message.answer(unavailable)
+        return
     message_api = await get_message_api(user_id)
     if not message_api:
         await message.answer(
@@ -85,7 +85,7 @@ async def cb_logout(callback_query: CallbackQuery, state: FSMContext):
             await controller.stop_lesson(user_id)
         except Exception:
             pass
-    lk_client.apis.pop(user_id, None)
+    await lk_client.drop_api(user_id)
     with db.conn:
         db.cursor.execute('DELETE FROM users WHERE user_id = ?', (user_id,))
     await callback_query.answer("Вы вышли")
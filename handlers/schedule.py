@@ -27,10 +27,14 @@ from keyboards import (
     get_teacher_week_navigation_buttons,
     get_classroom_week_navigation_buttons,
     get_group_week_navigation_buttons,
+    catalog_page_kb,
+    did_you_mean_kb,
 )
 from db import is_registered
+import fuzzy_index
 import lk_client
 from lk_client import TimetableBonchAPI, get_timetable_api
+import timetable_index
 import timetable_service
 from timetable_service import get_all_groups_timetable
 from formatting import (
@@ -38,6 +42,7 @@ from formatting import (
     format_timetable_dict,
     filter_group_lessons_by_date,
     filter_personal_lessons_by_date,
+    format_catalog_page,
     _week_offset_for_date,
     _moscow_today,
 )
@@ -46,6 +51,28 @@ from login_service import auto_login_user
 
 router = Router()
 
+DID_YOU_MEAN_LIMIT = 5
+
+
+# --- Нечёткий поиск: «возможно, вы имели в виду» -----------------------------
+
+def _search_index() -> fuzzy_index.FuzzyIndex:
+    """Индекс нечёткого поиска, синхронизированный со снимком кэша и списком групп API."""
+    cache = timetable_service.all_groups_timetable_cache
+    if not timetable_service.search_index_synced(cache):
+        timetable_service.refresh_search_indexes(cache)
+    return fuzzy_index.index
+
+
+async def _answer_not_found(message: types.Message, text: str, query: str, kind: str):
+    """Ответ «не найдено» с кнопками похожих названий, если они есть."""
+    suggestions = [(item_id, name) for item_id, _kind, name, _score
+                   in _search_index().search(query, kind, limit=DID_YOU_MEAN_LIMIT)]
+    if suggestions:
+        await message.answer(f"{text}\n\n❓ Возможно, вы имели в виду:", reply_markup=did_you_mean_kb(suggestions))
+    else:
+        await message.answer(text)
+
 
 # --- Пресеты расписания «Сегодня» / «Завтра» ---------------------------------
 
@@ -58,6 +85,10 @@ async def process_image_week(callback_query: CallbackQuery):
     if user_id not in lk_client.apis:
         await callback_query.answer("Сначала авторизуйтесь с помощью /login.", show_alert=True)
         return
+    unavailable = lk_client.lk_unavailable_message()
+    if unavailable:
+        await callback_query.answer(unavailable, show_alert=True)
+        return
 
     try:
         # Получаем расписание для выбранной недели
@@ -346,6 +377,10 @@ async def process_week_navigation(callback_query: CallbackQuery):
         if user_id not in lk_client.apis:
             await callback_query.answer("Сначала авторизуйтесь с помощью /login.", show_alert=True)
             return
+        unavailable = lk_client.lk_unavailable_message()
+        if unavailable:
+            await callback_query.answer(unavailable, show_alert=True)
+            return
 
         timetable = await lk_client.apis[user_id].get_timetable(week_offset=week_offset)
 
@@ -372,6 +407,10 @@ async def process_my_day(callback_query: CallbackQuery):
     if user_id not in lk_client.apis:
         await callback_query.answer("Сначала авторизуйтесь с помощью /login.", show_alert=True)
         return
+    unavailable = lk_client.lk_unavailable_message()
+    if unavailable:
+        await callback_query.answer(unavailable, show_alert=True)
+        return
     try:
         offset = int(callback_query.data.split("_")[2])
         today = _moscow_today()
@@ -396,6 +435,10 @@ async def process_my_day(callback_query: CallbackQuery):
 @router.message(Command("timetable"))
 async def cmd_timetable(message: types.Message, uid: int = None):
     user_id = uid if uid is not None else message.from_user.id
+    unavailable = lk_client.lk_unavailable_message()
+    if unavailable:
+        await message.answer(unavailable)
+        return
     if user_id not in lk_client.apis:  # Проверяем, есть ли api для пользователя
         # Пытаемся автоматически авторизовать пользователя, если он есть в БД
         success = await auto_login_user(user_id)
@@ -420,7 +463,7 @@ async def cmd_timetable(message: types.Message, uid: int = None):
         await message.answer("⚠️ Не удалось загрузить расписание. Попробуй позже.")
 
 @router.message(Command("teacher_timetable"))
-async def cmd_teacher_timetable(message: types.Message, override: str = None):
+async def cmd_teacher_timetable(message: types.Message, override: str = None, uid: int = None):
     """
     Команда для получения расписания преподавателя.
     Использование: /teacher_timetable <Фамилия преподавателя>
@@ -436,7 +479,7 @@ async def cmd_teacher_timetable(message: types.Message, override: str = None):
             )
             return
         teacher_name = args[1]
-    user_id = message.from_user.id
+    user_id = uid if uid is not None else message.from_user.id
     logging.info(f"Пользователь {user_id} запросил расписание преподавателя: {teacher_name}")
 
     try:
@@ -461,7 +504,8 @@ async def cmd_teacher_timetable(message: types.Message, override: str = None):
         teacher_timetable = TimetableBonchAPI.teacher_timetable(all_timetable, teacher_name)
 
         if not teacher_timetable:
-            await message.answer(f"❌ Не найдено занятий для преподавателя: {teacher_name}")
+            await _answer_not_found(message, f"❌ Не найдено занятий для преподавателя: {teacher_name}",
+                                    teacher_name, fuzzy_index.TEACHERS)
             return
 
         # Определяем текущую неделю (первая неделя с занятиями или текущая)
@@ -477,7 +521,7 @@ async def cmd_teacher_timetable(message: types.Message, override: str = None):
         await message.answer("⚠️ Не удалось загрузить расписание. Попробуй позже.")
 
 @router.message(Command("classroom_timetable"))
-async def cmd_classroom_timetable(message: types.Message, override: str = None):
+async def cmd_classroom_timetable(message: types.Message, override: str = None, uid: int = None):
     """
     Команда для получения расписания кабинета.
     Использование: /classroom_timetable <Номер кабинета>
@@ -493,7 +537,7 @@ async def cmd_classroom_timetable(message: types.Message, override: str = None):
             )
             return
         classroom_number = args[1]
-    user_id = message.from_user.id
+    user_id = uid if uid is not None else message.from_user.id
     logging.info(f"Пользователь {user_id} запросил расписание кабинета: {classroom_number}")
 
     try:
@@ -518,7 +562,8 @@ async def cmd_classroom_timetable(message: types.Message, override: str = None):
         classroom_timetable = TimetableBonchAPI.classroom_timetable(all_timetable, classroom_number)
 
         if not classroom_timetable:
-            await message.answer(f"❌ Не найдено занятий для кабинета: {classroom_number}")
+            await _answer_not_found(message, f"❌ Не найдено занятий для кабинета: {classroom_number}",
+                                    classroom_number, fuzzy_index.ROOMS)
             return
 
         # Определяем текущую неделю (первая неделя с занятиями или текущая)
@@ -533,59 +578,60 @@ async def cmd_classroom_timetable(message: types.Message, override: str = None):
         logging.error(f"Ошибка при получении расписания кабинета: {e}", exc_info=True)
         await message.answer("⚠️ Не удалось загрузить расписание. Попробуй позже.")
 
+# --- Каталог: /teachers, /classrooms, /groups --------------------------------
+# Списки готовит timetable_index.Catalog при загрузке снимка расписания;
+# команда и кнопки прокрутки отдают срез нужной страницы.
+
+CATALOG_KINDS = {
+    "t": (timetable_index.TEACHERS, "👤 Преподаватели",
+          "💡 Используйте /teacher_timetable <Фамилия> для получения расписания"),
+    "r": (timetable_index.ROOMS, "🏫 Кабинеты",
+          "💡 Используйте /classroom_timetable <Номер кабинета> для получения расписания"),
+    "g": (timetable_index.GROUPS, "👥 Группы",
+          "💡 Используйте /group_timetable <название> для получения расписания"),
+}
+
+
+def _catalog_page(kind_code: str, page: int):
+    """Текст и клавиатура страницы каталога по текущему снимку расписания."""
+    kind, title, footer = CATALOG_KINDS[kind_code]
+    catalog = timetable_index.for_snapshot(timetable_service.all_groups_timetable_cache).catalog
+    items, page, pages = catalog.page(kind, page)
+    text = format_catalog_page(title, items, page, pages, len(catalog.items(kind)), footer)
+    return text, catalog_page_kb(kind_code, page, pages), len(catalog.items(kind))
+
+
+async def _send_catalog(message: types.Message, kind_code: str, empty_text: str):
+    user_id = message.from_user.id
+    if timetable_service.all_groups_timetable_cache is None:
+        if timetable_service.timetable_loading:
+            status_msg = await message.answer("⏳ Расписание уже загружается, пожалуйста подождите...")
+        else:
+            status_msg = await message.answer("⏳ Загружаю расписание всех групп... Это может занять несколько минут.")
+        # Сообщение не удаляем — оно обновляется прогрессом загрузки.
+        await get_all_groups_timetable(user_id=user_id, progress_message=status_msg)
+        if timetable_service.all_groups_timetable_cache is None:
+            await message.answer(empty_text)
+            return
+
+    text, reply_markup, total = _catalog_page(kind_code, 0)
+    if not total:
+        await message.answer(empty_text)
+        return
+    logging.info(f"Каталог {CATALOG_KINDS[kind_code][0]}: {total} записей")
+    await message.answer(text, reply_markup=reply_markup)
+
+
 @router.message(Command("teachers"))
 async def cmd_teachers(message: types.Message):
     """
-    Команда для получения списка преподавателей из расписания.
+    Команда для получения списка преподавателей из расписания (постранично).
     """
     user_id = message.from_user.id
     logging.info(f"Пользователь {user_id} запросил список преподавателей (/teachers)")
 
     try:
-        # Проверяем наличие кэша
-        status_msg = None
-        if timetable_service.all_groups_timetable_cache is None:
-            if timetable_service.timetable_loading:
-                status_msg = await message.answer("⏳ Расписание уже загружается, пожалуйста подождите...")
-            else:
-                status_msg = await message.answer("⏳ Загружаю расписание всех групп... Это может занять несколько минут.")
-            all_timetable = await get_all_groups_timetable(user_id=user_id, progress_message=status_msg)
-            # Не удаляем сообщение, так как оно будет обновляться с прогрессом
-        else:
-            all_timetable = timetable_service.all_groups_timetable_cache
-            if status_msg:
-                try:
-                    await status_msg.delete()
-                except:
-                    pass
-
-        # Извлекаем уникальных преподавателей из расписания
-        teachers_set = set()
-        for group_name, lessons in all_timetable.items():
-            for lesson in lessons:
-                teacher = lesson.get('ФИО преподавателя')
-                if teacher:
-                    # Разделяем преподавателей по точке с запятой, если их несколько
-                    for t in teacher.split(';'):
-                        teachers_set.add(t.strip())
-
-        if not teachers_set:
-            await message.answer("❌ Не найдено преподавателей в расписании")
-            return
-
-        teachers_list = sorted(list(teachers_set))
-        logging.info(f"Найдено {len(teachers_list)} преподавателей")
-
-        # Формируем список для отправки
-        teachers_text = f"👤 Список преподавателей ({len(teachers_list)}):\n\n"
-        for teacher in teachers_list[:100]:  # Показываем первые 100
-            teachers_text += f"• {teacher}\n"
-
-        if len(teachers_list) > 100:
-            teachers_text += f"\n... и еще {len(teachers_list) - 100} преподавателей"
-
-        await message.answer(teachers_text)
-
+        await _send_catalog(message, "t", "❌ Не найдено преподавателей в расписании")
     except Exception as e:
         logging.error(f"Ошибка при получении списка преподавателей для пользователя {user_id}: {e}", exc_info=True)
         await message.answer("⚠️ Не удалось получить список преподавателей. Попробуй позже.")
@@ -593,54 +639,13 @@ async def cmd_teachers(message: types.Message):
 @router.message(Command("classrooms"))
 async def cmd_classrooms(message: types.Message):
     """
-    Команда для получения списка кабинетов из расписания.
+    Команда для получения списка кабинетов из расписания (постранично).
     """
     user_id = message.from_user.id
     logging.info(f"Пользователь {user_id} запросил список кабинетов (/classrooms)")
 
     try:
-        # Проверяем наличие кэша
-        status_msg = None
-        if timetable_service.all_groups_timetable_cache is None:
-            if timetable_service.timetable_loading:
-                status_msg = await message.answer("⏳ Расписание уже загружается, пожалуйста подождите...")
-            else:
-                status_msg = await message.answer("⏳ Загружаю расписание всех групп... Это может занять несколько минут.")
-            all_timetable = await get_all_groups_timetable(user_id=user_id, progress_message=status_msg)
-            # Не удаляем сообщение, так как оно будет обновляться с прогрессом
-        else:
-            all_timetable = timetable_service.all_groups_timetable_cache
-            if status_msg:
-                try:
-                    await status_msg.delete()
-                except:
-                    pass
-
-        # Извлекаем уникальные кабинеты из расписания
-        classrooms_set = set()
-        for group_name, lessons in all_timetable.items():
-            for lesson in lessons:
-                room = lesson.get('Номер кабинета')
-                if room:
-                    classrooms_set.add(room.strip())
-
-        if not classrooms_set:
-            await message.answer("❌ Не найдено кабинетов в расписании")
-            return
-
-        classrooms_list = sorted(list(classrooms_set))
-        logging.info(f"Найдено {len(classrooms_list)} кабинетов")
-
-        # Формируем список для отправки
-        classrooms_text = f"🏫 Список кабинетов ({len(classrooms_list)}):\n\n"
-        for classroom in classrooms_list[:100]:  # Показываем первые 100
-            classrooms_text += f"• {classroom}\n"
-
-        if len(classrooms_list) > 100:
-            classrooms_text += f"\n... и еще {len(classrooms_list) - 100} кабинетов"
-
-        await message.answer(classrooms_text)
-
+        await _send_catalog(message, "r", "❌ Не найдено кабинетов в расписании")
     except Exception as e:
         logging.error(f"Ошибка при получении списка кабинетов для пользователя {user_id}: {e}", exc_info=True)
         await message.answer("⚠️ Не удалось получить список аудиторий. Попробуй позже.")
@@ -648,38 +653,42 @@ async def cmd_classrooms(message: types.Message):
 @router.message(Command("groups"))
 async def cmd_groups(message: types.Message):
     """
-    Команда для получения списка групп.
+    Команда для получения списка групп из расписания (постранично).
     """
     user_id = message.from_user.id
     logging.info(f"Пользователь {user_id} запросил список групп (/groups)")
 
     try:
-        api = await get_timetable_api()
-
-        if not hasattr(api, 'groups_id') or not api.groups_id:
-            logging.error(f"Не удалось получить список групп для пользователя {user_id}")
-            await message.answer("❌ Не удалось получить список групп. Попробуйте позже.")
-            return
-
-        logging.info(f"Формирование списка групп для пользователя {user_id}. Всего групп: {len(api.groups_id)}")
-        groups_list = f"👥 Список групп ({len(api.groups_id)}):\n\n"
-        for group_id, group_name in list(api.groups_id.items())[:100]:  # Показываем первые 100
-            groups_list += f"• {group_name} (ID: {group_id})\n"
-
-        if len(api.groups_id) > 100:
-            groups_list += f"\n... и еще {len(api.groups_id) - 100} групп"
+        await _send_catalog(message, "g", "❌ Не удалось получить список групп. Попробуйте позже.")
+    except Exception as e:
+        logging.error(f"Ошибка при получении списка групп для пользователя {user_id}: {e}", exc_info=True)
+        await message.answer("⚠️ Не удалось получить список групп. Попробуй позже.")
 
-        groups_list += "\n\n💡 Используйте /group_timetable <название или ID> для получения расписания"
+@router.callback_query(F.data == "cat:noop")
+async def process_catalog_noop(callback_query: CallbackQuery):
+    await callback_query.answer()
 
-        await message.answer(groups_list)
-        logging.info(f"Список групп успешно отправлен пользователю {user_id}")
+@router.callback_query(F.data.startswith("cat:"))
+async def process_catalog_page(callback_query: CallbackQuery):
+    """Прокрутка каталога: cat:<вид>:<страница>."""
+    try:
+        _, kind_code, page_str = callback_query.data.split(":")
+        if kind_code not in CATALOG_KINDS:
+            await callback_query.answer("Неизвестная команда", show_alert=True)
+            return
+        if timetable_service.all_groups_timetable_cache is None:
+            await callback_query.answer("Расписание еще не загружено. Повторите команду.", show_alert=True)
+            return
 
+        text, reply_markup, _total = _catalog_page(kind_code, int(page_str))
+        await callback_query.message.edit_text(text, reply_markup=reply_markup)
+        await callback_query.answer()
     except Exception as e:
-        logging.error(f"Ошибка при получении списка групп для пользователя {user_id}: {e}", exc_info=True)
-        await message.answer("⚠️ Не удалось получить список групп. Попробуй позже.")
+        logging.error(f"Ошибка при прокрутке каталога: {e}", exc_info=True)
+        await callback_query.answer("⚠️ Не удалось выполнить действие. Попробуй позже.", show_alert=True)
 
 @router.message(Command("group_timetable"))
-async def cmd_group_timetable(message: types.Message, override: str = None):
+async def cmd_group_timetable(message: types.Message, override: str = None, uid: int = None):
     """
     Команда для получения расписания группы.
     Использование: /group_timetable <ID_группы или название группы>
@@ -698,7 +707,7 @@ async def cmd_group_timetable(message: types.Message, override: str = None):
             )
             return
         group_input = args[1]
-    user_id = message.from_user.id
+    user_id = uid if uid is not None else message.from_user.id
     logging.info(f"Пользователь {user_id} запросил расписание группы: {group_input}")
 
     try:
@@ -719,28 +728,27 @@ async def cmd_group_timetable(message: types.Message, override: str = None):
                 except:
                     pass
 
-        api = await get_timetable_api()
-
         # Пытаемся найти группу по ID или названию
-        group_id = None
         group_name = None
 
+        # Список групп API — и для id, и для названий (см. _search_index).
+        api = await get_timetable_api()
+
         # Сначала проверяем, является ли ввод ID
         if group_input.isdigit():
             if hasattr(api, 'groups_id') and group_input in api.groups_id:
-                group_id = group_input
-                group_name = api.groups_id[group_id]
+                group_name = api.groups_id[group_input]
         else:
-            # Ищем по названию группы
-            if hasattr(api, 'groups_id'):
-                for gid, gname in api.groups_id.items():
-                    if group_input.lower() in gname.lower():
-                        group_id = gid
-                        group_name = gname
-                        break
-
-        if not group_id or not group_name:
-            await message.answer(f"❌ Группа '{group_input}' не найдена. Используйте /groups для просмотра списка групп.")
+            # Название — совпадение после нормализации (регистр, дефисы, латинские
+            # двойники букв); иначе — похожие группы кнопками.
+            group_name = _search_index().exact(group_input, fuzzy_index.GROUPS)
+
+        if not group_name:
+            await _answer_not_found(
+                message,
+                f"❌ Группа '{group_input}' не найдена. Используйте /groups для просмотра списка групп.",
+                group_input, fuzzy_index.GROUPS,
+            )
             return
 
         # Получаем расписание группы из загруженного кэша
@@ -751,7 +759,7 @@ async def cmd_group_timetable(message: types.Message, override: str = None):
         timetable = all_timetable[group_name]
 
         if isinstance(timetable, str):
-            logging.warning(f"Ошибка при получении расписания группы {group_id} для пользователя {user_id}: {timetable}")
+            logging.warning(f"Ошибка при получении расписания группы {group_name} для пользователя {user_id}: {timetable}")
             await message.answer(f"❌ {timetable}")
             return
 
@@ -763,7 +771,7 @@ async def cmd_group_timetable(message: types.Message, override: str = None):
         weeks = sorted(set(lesson.get('Номер недели', 0) for lesson in timetable))
         current_week = weeks[0] if weeks else None
 
-        logging.info(f"Расписание группы {group_id} ({group_name}) успешно получено для пользователя {user_id}. Занятий: {len(timetable)}")
+        logging.info(f"Расписание группы {group_name} успешно получено для пользователя {user_id}. Занятий: {len(timetable)}")
 
         # Форматируем расписание для текущей недели
         formatted_timetable = format_timetable_dict(timetable, f"Расписание группы {group_name}", week_number=current_week)
@@ -904,3 +912,29 @@ async def fsm_ask_teacher(message: types.Message, state: FSMContext):
 async def fsm_ask_classroom(message: types.Message, state: FSMContext):
     await state.clear()
     await cmd_classroom_timetable(message, override=(message.text or "").strip())
+
+
+_DID_YOU_MEAN_COMMANDS = {
+    fuzzy_index.GROUPS: cmd_group_timetable,
+    fuzzy_index.TEACHERS: cmd_teacher_timetable,
+    fuzzy_index.ROOMS: cmd_classroom_timetable,
+}
+
+
+@router.callback_query(F.data.startswith("dym:"))
+async def process_did_you_mean(callback_query: CallbackQuery):
+    """Кнопка «возможно, вы имели в виду»: dym:<id элемента fuzzy_index>."""
+    try:
+        item = fuzzy_index.index.item(int(callback_query.data.split(":", 1)[1]))
+        if item is None:
+            await callback_query.answer("Список устарел — повторите поиск.", show_alert=True)
+            return
+        kind, name = item
+        await callback_query.answer()
+        # from_user у callback_query.message — бот; пользователя передаём явно.
+        await _DID_YOU_MEAN_COMMANDS[kind](
+            callback_query.message, override=name, uid=callback_query.from_user.id
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при выборе подсказки поиска: {e}", exc_info=True)
+        await callback_query.answer("⚠️ Не удалось выполнить действие. Попробуй позже.", show_alert=True)
@@ -9,7 +9,11 @@
     python -u healthcheck.py
 Выход 0 — здоров, 1 — нездоров. Импортировать модуль безопасно:
 никаких побочных эффектов при импорте (в отличие от main.py).
+
+Если есть статус автологина (STARTUP_STATUS_FILE, пишет main.py), к сообщению
+добавляется прогресс и ETA. На здоровье он не влияет.
 """
+import json
 import os
 import sys
 import time
@@ -17,6 +21,7 @@ from pathlib import Path
 
 HEARTBEAT_FILE = Path(os.getenv("HEARTBEAT_FILE", "/tmp/satanbot_heartbeat"))
 HEARTBEAT_MAX_AGE_SEC = float(os.getenv("HEARTBEAT_MAX_AGE_SEC", "120"))
+STARTUP_STATUS_FILE = Path(os.getenv("STARTUP_STATUS_FILE", "/tmp/satanbot_startup.json"))
 
 
 def check(path: Path, max_age_sec: float) -> tuple[bool, str]:
@@ -29,8 +34,25 @@ def check(path: Path, max_age_sec: float) -> tuple[bool, str]:
     return True, f"ok, heartbeat обновлён {age:.0f}s назад"
 
 
+def startup_progress(path: Path) -> str:
+    """Строка о прогрессе автологина из статус-файла; пустая, если статуса нет."""
+    try:
+        status = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return ""
+    done, total = status.get("done", 0), status.get("total", 0)
+    if status.get("finished"):
+        return f"автологин завершён: {done}/{total}, ошибок {status.get('failed', 0)}"
+    eta = status.get("eta_sec")
+    eta_part = f", ETA {eta:.0f}s" if isinstance(eta, (int, float)) else ""
+    return f"автологин: {done}/{total}{eta_part}"
+
+
 def main() -> int:
     ok, message = check(HEARTBEAT_FILE, HEARTBEAT_MAX_AGE_SEC)
+    progress = startup_progress(STARTUP_STATUS_FILE)
+    if progress:
+        message = f"{message}; {progress}"
     print(message, file=sys.stdout if ok else sys.stderr)
     return 0 if ok else 1
 
@@ -0,0 +1,108 @@
+"""Общий HTTP-слой процесса к хостам СПбГУТ: один пул соединений на хост.
+
+Раньше config.py выставлял прокси через HTTP(S)_PROXY/NO_PROXY в os.environ,
+а каждая сессия (lk_client, TImetabels.BonchAPI, SendMsgAPI) открывала свой
+коннектор с trust_env=True — на каждый запрос заново DNS, TCP, TLS и CONNECT
+через прокси. Теперь коннекторы живут здесь, по одному на (event loop, хост):
+
+- lk.sut.ru — через ALL_PROXY (aiohttp-socks: socks5/socks4/http), если задан;
+- cabinet.sut.ru, www.sut.ru и любые другие хосты — напрямую.
+
+У каждого коннектора кэш DNS, keep-alive и общий SSLContext (TLS-параметры
+и сертификаты грузятся один раз), лимит соединений — свой на хост
+(LK_POOL_LIMIT, SUT_POOL_LIMIT). Сессии создаются через session() с
+connector_owner=False: закрытие сессии не закрывает пул, это делает
+close_connectors() на остановке бота.
+
+Модуль — лист графа зависимостей (stdlib + aiohttp/aiohttp-socks + config).
+"""
+import asyncio
+import logging
+import ssl
+from typing import Optional
+
+import aiohttp
+
+from config import LK_KEEPALIVE_SEC, LK_POOL_LIMIT, LK_PROXY, SUT_POOL_LIMIT
+
+LK_HOST = "lk.sut.ru"
+CABINET_HOST = "cabinet.sut.ru"
+WWW_HOST = "www.sut.ru"
+
+# Хосты, которые ходят через ALL_PROXY. Остальные — напрямую: публичное
+# расписание через прокси отвечает таймаутом.
+PROXIED_HOSTS = frozenset({LK_HOST})
+
+DNS_CACHE_TTL_SEC = 300
+
+# (loop, host) -> коннектор. Примитивы aiohttp привязаны к loop, поэтому
+# пул ленивый и отдельный на каждый event loop (как семафор ЛК в config).
+_CONNECTORS: dict = {}
+_SSL_CONTEXT: Optional[ssl.SSLContext] = None
+
+
+def _ssl_context() -> ssl.SSLContext:
+    global _SSL_CONTEXT
+    if _SSL_CONTEXT is None:
+        _SSL_CONTEXT = ssl.create_default_context()
+    return _SSL_CONTEXT
+
+
+def proxy_for(host: str) -> Optional[str]:
+    """URL прокси для хоста или None — хост ходит напрямую."""
+    if LK_PROXY and host in PROXIED_HOSTS:
+        return LK_PROXY
+    return None
+
+
+def _connector_options(host: str) -> dict:
+    return {
+        "limit": LK_POOL_LIMIT if host == LK_HOST else SUT_POOL_LIMIT,
+        "keepalive_timeout": LK_KEEPALIVE_SEC,
+        "ttl_dns_cache": DNS_CACHE_TTL_SEC,
+        "ssl": _ssl_context(),
+    }
+
+
+def _new_connector(host: str) -> aiohttp.BaseConnector:
+    proxy = proxy_for(host)
+    if proxy:
+        # Импорт здесь: без ALL_PROXY aiohttp-socks не нужен вовсе.
+        from aiohttp_socks import ProxyConnector
+        return ProxyConnector.from_url(proxy, **_connector_options(host))
+    return aiohttp.TCPConnector(**_connector_options(host))
+
+
+def get_connector(host: str) -> aiohttp.BaseConnector:
+    """Общий keep-alive коннектор к хосту для текущего event loop."""
+    key = (asyncio.get_running_loop(), host)
+    connector = _CONNECTORS.get(key)
+    if connector is None or connector.closed:
+        connector = _new_connector(host)
+        _CONNECTORS[key] = connector
+    return connector
+
+
+def session(host: str, **kwargs) -> aiohttp.ClientSession:
+    """
+    aiohttp-сессия поверх общего пула хоста. Параметры (timeout, headers,
+    cookie_jar) — как у ClientSession; коннектор и прокси задаёт пул.
+    """
+    return aiohttp.ClientSession(
+        connector=get_connector(host),
+        connector_owner=False,
+        **kwargs,
+    )
+
+
+async def close_connectors() -> None:
+    """Закрывает пулы текущего event loop (graceful shutdown)."""
+    loop = asyncio.get_running_loop()
+    for key, connector in list(_CONNECTORS.items()):
+        if key[0] is not loop:
+            continue
+        del _CONNECTORS[key]
+        try:
+            await connector.close()
+        except Exception:
+            logging.warning("Не удалось закрыть пул соединений к %s", key[1], exc_info=True)
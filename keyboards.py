@@ -291,3 +291,30 @@ def recipients_page_kb(results: list, page: int) -> InlineKeyboardMarkup:
         rows.append(nav)
     rows.append([InlineKeyboardButton(text="❌ Отмена", callback_data="m:cancel")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+# --- Каталог /teachers, /classrooms, /groups: постраничная прокрутка ---
+# callback_data: cat:<вид>:<страница>, вид — t (преподаватели), r (кабинеты), g (группы).
+
+def catalog_page_kb(kind_code: str, page: int, pages: int):
+    """Кнопки прокрутки каталога; None, если страница одна."""
+    if pages <= 1:
+        return None
+    nav = []
+    if page > 0:
+        if page > 1:
+            nav.append(InlineKeyboardButton(text="⏮", callback_data=f"cat:{kind_code}:0"))
+        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"cat:{kind_code}:{page - 1}"))
+    nav.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="cat:noop"))
+    if page < pages - 1:
+        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"cat:{kind_code}:{page + 1}"))
+        if page < pages - 2:
+            nav.append(InlineKeyboardButton(text="⏭", callback_data=f"cat:{kind_code}:{pages - 1}"))
+    return InlineKeyboardMarkup(inline_keyboard=[nav])
+
+
+def did_you_mean_kb(suggestions: list) -> InlineKeyboardMarkup:
+    """Кнопки «возможно, вы имели в виду»: suggestions — [(id, название)] из fuzzy_index."""
+    rows = [[InlineKeyboardButton(text=name, callback_data=f"dym:{item_id}")]
+            for item_id, name in suggestions]
+    return InlineKeyboardMarkup(inline_keyboard=rows)
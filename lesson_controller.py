@@ -1,7 +1,8 @@
 """Контроллер автоотметки занятий (задача 4.1, шаг 11).
 
 Извлечён из main.py без изменения поведения. Содержит:
-- `LessonController` — управляет фоновым циклом автоотметки и напоминаниями;
+- `LessonController` — автоотметка и напоминания; тики выполняет центральный
+  планировщик lesson_scheduler.scheduler (одна куча на всех пользователей);
 - `controllers` — реестр контроллеров {user_id: LessonController}.
 
 Направление зависимостей: lesson_controller -> lk_client / config / db /
@@ -11,18 +12,38 @@ security (вниз по слоям). Разделяемое изменяемое
 цикла зависимостей нет.
 """
 import asyncio
+import hashlib
 import logging
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from pathlib import Path
 from typing import Optional
 
 import pytz
 
 import db
+import lesson_scheduler
 import lk_client
-from config import LESSON_INTERVALS
+import monitoring
+import reauth_service
+from config import (
+    LESSON_CLICK_DEADLINE_MIN,
+    LESSON_CLICK_RETRY_SEC,
+    LESSON_CLICK_SPREAD_SEC,
+    LESSON_INTERVALS,
+    LESSON_VERIFY_INTERVAL_MIN,
+    LESSON_WARMUP_MIN,
+    REAUTH_MAX_REJECTIONS,
+    REAUTH_REJECT_BACKOFF_SEC,
+)
 from db import get_notify_settings
+from lk_breaker import LKUnavailableError, lk_unavailable
 from lk_client import save_debug_dump
+from lk_limiter import (
+    lk_priority,
+    PRIORITY_BACKGROUND,
+    PRIORITY_CLICK,
+    PRIORITY_REMINDER,
+)
 from security import decrypt_password
 
 # Реестр контроллеров автоотметки. Читается/пишется хэндлерами в main.py
@@ -30,6 +51,26 @@ from security import decrypt_password
 # модуль-квалифицированный доступ lesson_controller.controllers.
 controllers = {}  # Словарь для хранения контроллеров
 
+# Вне пар контроллер спит до ближайшего события плана дня, но не дольше этого —
+# чтобы подхватывать смену настроек напоминаний.
+DAY_PLAN_MAX_SLEEP_SEC = 600
+# Пока переавторизация ждёт очереди координатора, тик контроллера
+# перепроверяет её с этим шагом (воркер планировщика не занят ожиданием).
+REAUTH_POLL_SEC = 2
+SESSION_EXPIRED_TEXT = "⚠️ Ваша сессия истекла. Пожалуйста, выполните /login для повторной авторизации."
+
+
+def click_offset_sec(user_id) -> float:
+    """
+    Сдвиг первого клика пользователя от начала пары: 0..LESSON_CLICK_SPREAD_SEC,
+    постоянный для user_id (хэш, не random) — нагрузка на ЛК ровная, а у
+    пользователя отметка каждый раз примерно в одно и то же время.
+    Разброс не выходит за половину дедлайна, чтобы осталось время на ретраи.
+    """
+    spread = min(LESSON_CLICK_SPREAD_SEC, LESSON_CLICK_DEADLINE_MIN * 60 / 2)
+    digest = hashlib.blake2b(str(user_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 * spread
+
 
 class LessonController:
     def __init__(self, api, bot, user_id):
@@ -37,10 +78,30 @@ class LessonController:
         self.bot = bot
         self.user_id = user_id
         self.is_running = False
-        self.task = None
         self.notified = False  # Флаг для отслеживания отправки уведомления
         self._last_success_lesson_key: Optional[str] = None
         self._last_upcoming_lesson_key: Optional[str] = None
+        # Отмеченная пара (ключ _lesson_key): до её конца повторно не кликаем.
+        self._marked_lesson_key: Optional[str] = None
+        self._marked_rasp_ids: tuple = ()
+        self._marked_verified_at: Optional[datetime] = None
+        # Диспетчер кликов текущей пары: постоянный сдвиг первого клика, число
+        # попыток и время следующей (None — кликать на ближайшем тике).
+        self.click_offset_sec = click_offset_sec(user_id)
+        self._click_lesson_key: Optional[str] = None
+        self._click_attempts = 0
+        self._next_click_at: Optional[datetime] = None
+        self._deadline_missed = False
+        # Пара, перед которой сессия уже прогрета (ключ _upcoming_).
+        self._warmed_lesson_key: Optional[str] = None
+        # Переавторизация в очереди reauth_service.coordinator (см. _request_reauth).
+        self._reauth_task: Optional[asyncio.Future] = None
+        # Отказы ЛК в переавторизации подряд (неверный пароль) — для паузы и остановки.
+        self._reauth_rejections = 0
+        # План дня (строится раз в сутки по raspisanie.php): {индекс пары 0..6: строка
+        # из LKTimetablePage.days}. None — плана нет (сбой загрузки), опрашиваем все слоты.
+        self._day_plan: Optional[dict] = None
+        self._day_plan_date = None
 
         # Интервалы пар (начало и конец)
         self.lesson_intervals = LESSON_INTERVALS
@@ -87,175 +148,457 @@ class LessonController:
         return False
 
     async def start_lesson(self):
+        """
+        Включает автоотметку: контроллер встаёт в центральный планировщик
+        (lesson_scheduler), первый тик — сразу. Возвращается без ожидания.
+        """
         if self.is_running:
             return "Автокликалка уже запущена."
 
         self.is_running = True
+        lesson_scheduler.scheduler.schedule(self, 0)
+        return "Автокликалка запущена."
+
+    async def tick(self) -> Optional[float]:
+        """
+        Один шаг автоотметки (план дня, напоминание, клик). Вызывается
+        планировщиком; возвращает паузу до следующего тика в секундах или
+        None, если автоотметка остановлена.
+        """
         moscow_tz = pytz.timezone('Europe/Moscow')
+        if not self.is_running:
+            return None
 
-        while self.is_running:
-            try:
-                now_dt = datetime.now(moscow_tz)
-                now = now_dt.time()
-
-                # Напоминание о начале пары (один раз на пару). Включение и
-                # «за сколько минут» настраиваются пользователем в разделе «Профиль».
-                # Диапазон (N-1)..N нужен из-за периодической проверки раз в минуту.
-                notify_enabled, notify_minutes = get_notify_settings(self.user_id)
-                upcoming_idx = self._upcoming_lesson_interval_index(
-                    now_dt,
-                    min_minutes_before_start=max(1, notify_minutes - 1),
-                    max_minutes_before_start=notify_minutes,
-                ) if notify_enabled else None
-                if upcoming_idx is not None:
-                    lesson_key = f"{now_dt.strftime('%Y-%m-%d')}_upcoming_{upcoming_idx}"
-                    if self._last_upcoming_lesson_key != lesson_key:
-                        try:
-                            start_time, _end_time = self.lesson_intervals[upcoming_idx]
-                            start_dt = datetime.combine(now_dt.date(), start_time, tzinfo=now_dt.tzinfo)
-                            minutes_left = max(0, int((start_dt - now_dt).total_seconds() // 60))
-                            human_idx = upcoming_idx + 1
+        try:
+            # Переавторизация идёт в фоне через общую очередь — ждём её итога.
+            task = self._reauth_task
+            if task is not None:
+                if not task.done():
+                    return REAUTH_POLL_SEC
+                self._reauth_task = None
+                reauth_error = None if task.cancelled() else task.exception()
+                if task.cancelled() or reauth_error is not None:
+                    logging.error(f"Ошибка переавторизации для пользователя {self.user_id}: {reauth_error}")
+                    await self.bot.send_message(self.user_id, SESSION_EXPIRED_TEXT)
+                    self.is_running = False
+                    return None
+                if not task.result():
+                    return await self._on_reauth_rejected()
+                logging.info(f"Переавторизация успешна для пользователя {self.user_id}")
+                self._reauth_rejections = 0
+
+            # ЛК сбросил сессии всем разом — автоотметка на паузе у всех.
+            pause = reauth_service.coordinator.pause_remaining()
+            if pause > 0:
+                logging.debug("Автоотметка %s на паузе ещё %.0f с", self.user_id, pause)
+                return max(1.0, min(pause, DAY_PLAN_MAX_SLEEP_SEC))
+
+            now_dt = datetime.now(moscow_tz)
+            now = now_dt.time()
+
+            # План дня: какие пары у пользователя сегодня реально есть.
+            await self._ensure_day_plan(now_dt)
+
+            # Прогрев: за LESSON_WARMUP_MIN до пары убеждаемся, что сессия жива,
+            # чтобы первый клик не упёрся в «Session expired».
+            await self._warm_up_before_pair(now_dt)
+
+            # Напоминание о начале пары (один раз на пару). Включение и
+            # «за сколько минут» настраиваются пользователем в разделе «Профиль».
+            # Диапазон (N-1)..N нужен из-за периодической проверки раз в минуту.
+            notify_enabled, notify_minutes = get_notify_settings(self.user_id)
+            upcoming_idx = self._upcoming_lesson_interval_index(
+                now_dt,
+                min_minutes_before_start=max(1, notify_minutes - 1),
+                max_minutes_before_start=notify_minutes,
+            ) if notify_enabled else None
+            if upcoming_idx is not None and self._slot_planned(upcoming_idx):
+                lesson_key = f"{now_dt.strftime('%Y-%m-%d')}_upcoming_{upcoming_idx}"
+                if self._last_upcoming_lesson_key != lesson_key:
+                    try:
+                        start_time, _end_time = self.lesson_intervals[upcoming_idx]
+                        start_dt = datetime.combine(now_dt.date(), start_time, tzinfo=now_dt.tzinfo)
+                        minutes_left = max(0, int((start_dt - now_dt).total_seconds() // 60))
+                        human_idx = upcoming_idx + 1
 
+                        with lk_priority(PRIORITY_REMINDER):
                             details = await self.api.get_upcoming_start_lesson_details(
                                 now_dt=now_dt,
                                 target_pair_index=upcoming_idx,
                                 window_minutes=notify_minutes,
                             )
-                            # Интервалы пар (LESSON_INTERVALS) — это просто сетка времени.
-                            # Уведомляем ТОЛЬКО если эта пара реально есть в расписании
-                            # на сегодня (details найдены). Нет пары -> молчим, ключ не
-                            # фиксируем, чтобы при сбое загрузки расписания был ретрай.
-                            if not details:
-                                logging.info(
-                                    "Пара %s в %s не отправлена: нет в расписании на сегодня (user_id=%s)",
-                                    human_idx,
-                                    now_dt.strftime("%H:%M"),
-                                    self.user_id,
-                                )
-                            else:
-                                room = details.get("room") or "—"
-                                subject = details.get("subject") or ""
-                                teacher = details.get("teacher") or ""
-                                subj_part = f"\n📚 {subject}" if subject else ""
-                                room_part = f"\n🚪 Аудитория: {room}" if room and room != "—" else f"\n🚪 Аудитория: —"
-                                teacher_part = f"\n👨‍🏫 {teacher}" if teacher else ""
-                                msg = (
-                                    f"🔔 Через {minutes_left} мин начнётся {human_idx}-я пара."
-                                    f"{subj_part}{room_part}{teacher_part}"
-                                )
-
-                                await self.bot.send_message(self.user_id, msg)
-                                self._last_upcoming_lesson_key = lesson_key
-                                logging.info(
-                                    "Отправлено напоминание о паре: user_id=%s, pair=%s, minutes_left=%s",
-                                    self.user_id,
-                                    human_idx,
-                                    minutes_left,
-                                )
-                        except Exception as notify_error:
-                            logging.warning(
-                                "Не удалось отправить напоминание о паре для user_id=%s: %s",
+                        # Интервалы пар (LESSON_INTERVALS) — это просто сетка времени.
+                        # Уведомляем ТОЛЬКО если эта пара реально есть в расписании
+                        # на сегодня (details найдены). Нет пары -> молчим, ключ не
+                        # фиксируем, чтобы при сбое загрузки расписания был ретрай.
+                        if not details:
+                            logging.info(
+                                "Пара %s в %s не отправлена: нет в расписании на сегодня (user_id=%s)",
+                                human_idx,
+                                now_dt.strftime("%H:%M"),
                                 self.user_id,
-                                notify_error,
-                                exc_info=True,
                             )
-
-                if self.is_lesson_time(now):
-                    # Если уведомление еще не отправлено, отправляем его
-                    if not self.notified:
-                        self.notified = True  # Устанавливаем флаг, что уведомление отправлено
-
-                    # Пытаемся выполнить клик
-                    logging.debug("Попытка кликнуть занятие для пользователя %s", self.user_id)
-                    clicked = await self.api.click_start_lesson(self.user_id)
-                    if clicked > 0:
-                        logging.info("Клик выполнен. Отправлено запросов: %s", clicked)
-                        # Оповещение в TG: ровно одно сообщение на одну пару
-                        now_dt = datetime.now(moscow_tz)
-                        interval_idx = self._current_lesson_interval_index(now_dt.time())
-                        # Ключ пары: дата + номер интервала (если по какой-то причине idx=None,
-                        # то fallback на дату+час, чтобы не спамить)
-                        if interval_idx is None:
-                            lesson_key = now_dt.strftime("%Y-%m-%d_%H")
                         else:
-                            lesson_key = f"{now_dt.strftime('%Y-%m-%d')}_lesson_{interval_idx}"
-
-                        if self._last_success_lesson_key != lesson_key:
-                            try:
-                                await self.bot.send_message(
-                                    self.user_id,
-                                    "✅ Автоотметка: отметка выполнена.",
-                                )
-                                self._last_success_lesson_key = lesson_key
-                            except Exception as mark_notify_error:
-                                logging.warning(
-                                    "Не удалось отправить сообщение об автоотметке для user_id=%s: %s",
-                                    self.user_id,
-                                    mark_notify_error,
-                                    exc_info=True,
-                                )
-                    else:
-                        logging.warning("Клик не выполнен: кандидатов для клика не найдено.")
-                else:
-                    # Если время пар закончилось, сбрасываем флаг уведомления
-                    self.notified = False
-                    logging.info("Сейчас не время пар. Клик не выполнен.")
-                await asyncio.sleep(60)  # Минутный тик для точного напоминания перед парой
-            except ValueError as e:
-                # Обрабатываем ошибку истекшей сессии
-                if "Session expired" in str(e) or "login=no" in str(e):
-                    logging.warning(f"Сессия истекла для пользователя {self.user_id}. Попытка переавторизации...")
-                    try:
-                        # Пытаемся переавторизоваться
-                        await self.reauthenticate()
-                        logging.info(f"Переавторизация успешна для пользователя {self.user_id}")
-                    except Exception as reauth_error:
-                        logging.error(f"Ошибка переавторизации для пользователя {self.user_id}: {reauth_error}")
-                        await self.bot.send_message(self.user_id, "⚠️ Ваша сессия истекла. Пожалуйста, выполните /login для повторной авторизации.")
-                        self.is_running = False
-                        break
-                else:
-                    if "LK group not defined" in str(e):
-                        logging.error("В ЛК не назначена группа для пользователя %s — автоклик невозможен.", self.user_id)
-                        try:
-                            await self.bot.send_message(
+                            room = details.get("room") or "—"
+                            subject = details.get("subject") or ""
+                            teacher = details.get("teacher") or ""
+                            subj_part = f"\n📚 {subject}" if subject else ""
+                            room_part = f"\n🚪 Аудитория: {room}" if room and room != "—" else f"\n🚪 Аудитория: —"
+                            teacher_part = f"\n👨‍🏫 {teacher}" if teacher else ""
+                            msg = (
+                                f"🔔 Через {minutes_left} мин начнётся {human_idx}-я пара."
+                                f"{subj_part}{room_part}{teacher_part}"
+                            )
+
+                            await self.bot.send_message(self.user_id, msg)
+                            self._last_upcoming_lesson_key = lesson_key
+                            logging.info(
+                                "Отправлено напоминание о паре: user_id=%s, pair=%s, minutes_left=%s",
                                 self.user_id,
-                                "⚠️ В вашем ЛК не назначена учебная группа (страница расписания пишет: «Ваша группа не определена»).\n"
-                                "Автоотметка не сможет работать, пока деканат не проведёт приказ о распределении в группу.\n\n"
-                                "После назначения группы — выполните /login ещё раз и запустите /start_lesson.",
+                                human_idx,
+                                minutes_left,
                             )
-                        except Exception:
-                            pass
-                        self.is_running = False
-                        break
-                    logging.error(f"Ошибка при выполнении клика: {e}", exc_info=True)
-                    await self.capture_debug_artifacts(e)
-                await asyncio.sleep(60)  # Пауза перед повторной попыткой (1 минута)
-                continue  # Продолжаем цикл для повторной попытки
-            except Exception as e:
+                    except Exception as notify_error:
+                        logging.warning(
+                            "Не удалось отправить напоминание о паре для user_id=%s: %s",
+                            self.user_id,
+                            notify_error,
+                            exc_info=True,
+                        )
+
+            current_idx = self._current_lesson_interval_index(now)
+            if current_idx is not None and self._slot_planned(current_idx):
+                # Если уведомление еще не отправлено, отправляем его
+                if not self.notified:
+                    self.notified = True  # Устанавливаем флаг, что уведомление отправлено
+
+                await self._click_tick(now_dt)
+            else:
+                # Если время пар закончилось, сбрасываем флаг уведомления
+                self.notified = False
+                logging.debug("Сейчас нет пары пользователя %s. Клик не выполнен.", self.user_id)
+            # Внутри пары — минутный тик; вне пар спим до ближайшего события плана.
+            return self._seconds_until_next_tick(datetime.now(moscow_tz), notify_enabled, notify_minutes)
+        except LKUnavailableError as e:
+            # ЛК лежит: без трейсбека и debug-снимков, следующий тик — к пробе предохранителя.
+            logging.debug("Тик %s пропущен: %s", self.user_id, e)
+            return max(1.0, min(e.retry_after, DAY_PLAN_MAX_SLEEP_SEC))
+        except ValueError as e:
+            # Обрабатываем ошибку истекшей сессии
+            if "Session expired" in str(e) or "login=no" in str(e):
+                logging.warning(f"Сессия истекла для пользователя {self.user_id}. Попытка переавторизации...")
+                reauth_service.coordinator.note_expired(self.user_id)
+                # Без сессии клик невозможен — в очередь переавторизации с приоритетом клика.
+                with lk_priority(PRIORITY_CLICK):
+                    self._request_reauth()
+                return REAUTH_POLL_SEC
+            else:
+                if "LK group not defined" in str(e):
+                    logging.error("В ЛК не назначена группа для пользователя %s — автоклик невозможен.", self.user_id)
+                    try:
+                        await self.bot.send_message(
+                            self.user_id,
+                            "⚠️ В вашем ЛК не назначена учебная группа (страница расписания пишет: «Ваша группа не определена»).\n"
+                            "Автоотметка не сможет работать, пока деканат не проведёт приказ о распределении в группу.\n\n"
+                            "После назначения группы — выполните /login ещё раз и запустите /start_lesson.",
+                        )
+                    except Exception:
+                        pass
+                    self.is_running = False
+                    return None
                 logging.error(f"Ошибка при выполнении клика: {e}", exc_info=True)
                 await self.capture_debug_artifacts(e)
-                await asyncio.sleep(60)  # Пауза перед повторной попыткой (1 минута)
-                continue  # Продолжаем цикл для повторной попытки
+            return 60  # Пауза перед повторной попыткой (1 минута)
+        except Exception as e:
+            logging.error(f"Ошибка при выполнении клика: {e}", exc_info=True)
+            await self.capture_debug_artifacts(e)
+            return 60  # Пауза перед повторной попыткой (1 минута)
 
-        return "Автокликалка запущена."
+    async def _ensure_day_plan(self, now_dt: datetime) -> None:
+        """
+        Раз в сутки строит план дня: пары, которые у пользователя сегодня есть,
+        с их rasp-id. Воскресенье — пустой план без запроса к ЛК. При сбое
+        загрузки план остаётся None (опрос всех слотов) и строится на следующем тике.
+        """
+        today = now_dt.date()
+        if self._day_plan_date == today:
+            return
+        if today.weekday() == 6:
+            self._day_plan, self._day_plan_date = {}, today
+            logging.info("Воскресенье — автоотметка пользователя %s спит до завтра", self.user_id)
+            return
+        with lk_priority(PRIORITY_BACKGROUND):
+            page = await self.api.get_timetable_page()
+        if page.session_expired:
+            raise ValueError("Session expired - day plan page. Need to re-authenticate.")
+        if page.group_undefined:
+            # Пустой план тут молча выключил бы клик — а с ним и уведомление в tick().
+            raise ValueError("LK group not defined - cannot auto-click")
+        if not page.week_param:
+            logging.warning("Не удалось построить план дня для %s — опрашиваем все слоты", self.user_id)
+            self._day_plan, self._day_plan_date = None, None
+            return
+        rows = page.days.get(now_dt.strftime("%d.%m.%Y"), ())
+        self._day_plan = {
+            row["pair_number"] - 1: row
+            for row in rows
+            if 0 < row["pair_number"] <= len(self.lesson_intervals)
+        }
+        self._day_plan_date = today
+        logging.info(
+            "План дня для %s: пары %s",
+            self.user_id,
+            sorted(index + 1 for index in self._day_plan) or "нет",
+        )
+
+    async def _warm_up_before_pair(self, now_dt: datetime) -> None:
+        """
+        Раз на пару, за LESSON_WARMUP_MIN до её начала: проверка сессии одним
+        запросом и переавторизация на месте, если она истекла. Сбой прогрева не
+        фатален — клик сам обработает истёкшую сессию.
+        """
+        if LESSON_WARMUP_MIN <= 0 or self._day_plan is None:
+            return
+        upcoming_idx = self._upcoming_lesson_interval_index(
+            now_dt,
+            min_minutes_before_start=0,
+            max_minutes_before_start=LESSON_WARMUP_MIN,
+        )
+        if upcoming_idx is None or not self._slot_planned(upcoming_idx):
+            return
+        lesson_key = f"{now_dt.strftime('%Y-%m-%d')}_upcoming_{upcoming_idx}"
+        if self._warmed_lesson_key == lesson_key:
+            return
+        self._warmed_lesson_key = lesson_key
+        try:
+            with lk_priority(PRIORITY_REMINDER):
+                if await self.api.check_session():
+                    logging.debug("Сессия %s жива перед парой %s", self.user_id, upcoming_idx + 1)
+                    return
+                logging.info(
+                    "Сессия %s истекла до пары %s — переавторизация заранее",
+                    self.user_id, upcoming_idx + 1,
+                )
+                reauth_service.coordinator.note_expired(self.user_id)
+                self._request_reauth()
+        except LKUnavailableError as e:
+            logging.debug("Прогрев сессии %s пропущен: %s", self.user_id, e)
+        except Exception:
+            logging.warning("Прогрев сессии перед парой не удался для %s", self.user_id, exc_info=True)
+
+    def _slot_planned(self, interval_idx: int) -> bool:
+        """Есть ли у пользователя сегодня пара в этом слоте (без плана — считаем, что есть)."""
+        return self._day_plan is None or interval_idx in self._day_plan
+
+    def _seconds_until_next_tick(self, now_dt: datetime, notify_enabled: bool, notify_minutes: int) -> float:
+        """
+        Пауза до следующего тика: внутри запланированной пары — до назначенной
+        попытки клика (не больше 60 с), без плана — 60 с; иначе до ближайшего
+        прогрева/напоминания/первого клика пары из плана или до полуночи
+        (перестроить план), но не дольше DAY_PLAN_MAX_SLEEP_SEC.
+        """
+        current_idx = self._current_lesson_interval_index(now_dt.time())
+        if current_idx is not None and self._slot_planned(current_idx):
+            # Внутри пары: до назначенной попытки клика, но не реже раза в минуту.
+            if (
+                self._marked_lesson_key != self._lesson_key(now_dt)
+                and self._next_click_at is not None
+                and self._next_click_at > now_dt
+            ):
+                return max(1.0, min(60.0, (self._next_click_at - now_dt).total_seconds()))
+            return 60
+        if self._day_plan is None:
+            return 60
+        events = []
+        for index in self._day_plan:
+            start_time, _end_time = self.lesson_intervals[index]
+            start_dt = datetime.combine(now_dt.date(), start_time, tzinfo=now_dt.tzinfo)
+            events.append(start_dt + timedelta(seconds=self.click_offset_sec))
+            if LESSON_WARMUP_MIN > 0:
+                events.append(start_dt - timedelta(minutes=LESSON_WARMUP_MIN))
+            if notify_enabled:
+                events.append(start_dt - timedelta(minutes=notify_minutes))
+        midnight = datetime.combine(now_dt.date() + timedelta(days=1), time(0, 0), tzinfo=now_dt.tzinfo)
+        events.append(midnight)
+        delays = [(event - now_dt).total_seconds() for event in events]
+        delay = min((d for d in delays if d > 0), default=60)
+        return max(1.0, min(delay, DAY_PLAN_MAX_SLEEP_SEC))
+
+    def _lesson_key(self, now_dt: datetime) -> str:
+        """
+        Ключ пары: дата + номер интервала (если по какой-то причине idx=None,
+        то fallback на дату+час, чтобы не спамить).
+        """
+        interval_idx = self._current_lesson_interval_index(now_dt.time())
+        if interval_idx is None:
+            return now_dt.strftime("%Y-%m-%d_%H")
+        return f"{now_dt.strftime('%Y-%m-%d')}_lesson_{interval_idx}"
+
+    async def _click_tick(self, now_dt: datetime) -> None:
+        """
+        Клик во время пары. После подтверждённой отметки пара считается
+        отмеченной: до её конца ЛК не дёргаем, кроме редкой проверки раз в
+        LESSON_VERIFY_INTERVAL_MIN (кнопка «Начать занятие» снова видна —
+        отметка не прошла, кликаем заново).
+        """
+        lesson_key = self._lesson_key(now_dt)
+        if self._marked_lesson_key == lesson_key:
+            if not await self._verify_due_mark_lost(now_dt):
+                logging.debug("Пара %s уже отмечена для %s — клик пропущен", lesson_key, self.user_id)
+                return
+            logging.warning("Отметка пары %s для %s не подтвердилась — кликаем снова", lesson_key, self.user_id)
+            self._marked_lesson_key = None
+            self._next_click_at = None
+
+        pair_start = self._pair_start(now_dt)
+        if self._click_lesson_key != lesson_key:
+            # Новая пара: первый клик — со сдвигом пользователя от её начала.
+            self._click_lesson_key = lesson_key
+            self._click_attempts = 0
+            self._deadline_missed = False
+            self._next_click_at = pair_start + timedelta(seconds=self.click_offset_sec)
+        if self._next_click_at is not None and now_dt < self._next_click_at:
+            logging.debug("Клик для %s отложен до %s", self.user_id, self._next_click_at.strftime("%H:%M:%S"))
+            return
+        deadline = pair_start + timedelta(minutes=LESSON_CLICK_DEADLINE_MIN)
+        if now_dt >= deadline and not self._deadline_missed:
+            self._deadline_missed = True
+            monitoring.time_to_mark.record_missed(self.user_id)
+            logging.warning(
+                "Пара %s для %s не отмечена за %s мин (попыток: %s)",
+                lesson_key, self.user_id, LESSON_CLICK_DEADLINE_MIN, self._click_attempts,
+            )
+
+        # Пытаемся выполнить клик. Следующая попытка назначается заранее —
+        # исключение из click_start_lesson тоже считается неудачной попыткой.
+        self._click_attempts += 1
+        self._next_click_at = now_dt + timedelta(seconds=self._click_retry_delay(now_dt, deadline))
+        logging.debug("Попытка кликнуть занятие для пользователя %s (#%s)", self.user_id, self._click_attempts)
+        with lk_priority(PRIORITY_CLICK):
+            clicked = await self.api.click_start_lesson(self.user_id)
+        if clicked <= 0:
+            logging.warning("Клик не выполнен: кандидатов для клика не найдено.")
+            return
+
+        time_to_mark = (now_dt - pair_start).total_seconds()
+        monitoring.time_to_mark.record(self.user_id, time_to_mark, self._click_attempts)
+        logging.info(
+            "Клик выполнен. Отправлено запросов: %s, с начала пары %.0f с, попыток %s",
+            clicked, time_to_mark, self._click_attempts,
+        )
+        self._marked_lesson_key = lesson_key
+        self._next_click_at = None
+        self._marked_rasp_ids = tuple(getattr(self.api, "last_clicked_ids", ()) or ())
+        self._marked_verified_at = now_dt
+
+        # Оповещение в TG: ровно одно сообщение на одну пару
+        if self._last_success_lesson_key != lesson_key:
+            try:
+                await self.bot.send_message(
+                    self.user_id,
+                    "✅ Автоотметка: отметка выполнена.",
+                )
+                self._last_success_lesson_key = lesson_key
+            except Exception as mark_notify_error:
+                logging.warning(
+                    "Не удалось отправить сообщение об автоотметке для user_id=%s: %s",
+                    self.user_id,
+                    mark_notify_error,
+                    exc_info=True,
+                )
+
+    def _pair_start(self, now_dt: datetime) -> datetime:
+        """Начало идущей пары (now_dt — если пары по сетке нет)."""
+        interval_idx = self._current_lesson_interval_index(now_dt.time())
+        if interval_idx is None:
+            return now_dt
+        start_time, _end_time = self.lesson_intervals[interval_idx]
+        return datetime.combine(now_dt.date(), start_time, tzinfo=now_dt.tzinfo)
+
+    def _click_retry_delay(self, now_dt: datetime, deadline: datetime) -> float:
+        """
+        Пауза до повторного клика: LESSON_CLICK_RETRY_SEC с удвоением на каждую
+        неудачную попытку, не больше минуты (прежний такт). До дедлайна повтор
+        не откладывается за него — последняя попытка приходится ровно на дедлайн.
+        """
+        delay = min(60.0, LESSON_CLICK_RETRY_SEC * 2 ** max(0, self._click_attempts - 1))
+        until_deadline = (deadline - now_dt).total_seconds()
+        if until_deadline > 0:
+            delay = min(delay, until_deadline)
+        return max(1.0, delay)
+
+    async def _verify_due_mark_lost(self, now_dt: datetime) -> bool:
+        """
+        Редкая проверка отмеченной пары. True — кнопка «Начать занятие» для
+        отмеченных rasp снова на странице (отметка потерялась).
+        """
+        if LESSON_VERIFY_INTERVAL_MIN <= 0 or not self._marked_rasp_ids:
+            return False
+        if (
+            self._marked_verified_at is not None
+            and (now_dt - self._marked_verified_at).total_seconds() < LESSON_VERIFY_INTERVAL_MIN * 60
+        ):
+            return False
+        self._marked_verified_at = now_dt
+        with lk_priority(PRIORITY_REMINDER):
+            page = await self.api.get_timetable_page()
+        return bool(set(page.start_lesson_ids) & set(self._marked_rasp_ids))
 
     async def stop_lesson(self, user_id: int):
         if not self.is_running:
             return "Автокликалка уже остановлена."
 
         self.is_running = False
-        if self.task:
-            self.task.cancel()
-            logging.info(f'Пользователь {user_id} остановил автокликалку.')
+        lesson_scheduler.scheduler.unschedule(self)
+        if self._reauth_task is not None and not self._reauth_task.done():
+            self._reauth_task.cancel()
+        logging.info(f'Пользователь {user_id} остановил автокликалку.')
         return "Автокликалка остановлена."
 
     async def get_status(self):
         return "Автокликалка запущена." if self.is_running else "Автокликалка остановлена."
 
-    async def reauthenticate(self):
+    async def _on_reauth_rejected(self) -> Optional[float]:
+        """
+        Логин не прошёл. Сразу повторять нельзя: следующий тик снова упрётся в
+        «Session expired» и встанет в общую очередь логинов. Пауза растёт вдвое
+        от REAUTH_REJECT_BACKOFF_SEC; после REAUTH_MAX_REJECTIONS отказов подряд
+        автоотметка останавливается и пользователя просят выполнить /login.
+        """
+        self._reauth_rejections += 1
+        if self._reauth_rejections >= REAUTH_MAX_REJECTIONS:
+            logging.error(
+                "Переавторизация пользователя %s не прошла %s раз подряд — автоотметка остановлена",
+                self.user_id, self._reauth_rejections,
+            )
+            await self.bot.send_message(self.user_id, SESSION_EXPIRED_TEXT)
+            self.is_running = False
+            return None
+        delay = REAUTH_REJECT_BACKOFF_SEC * 2 ** (self._reauth_rejections - 1)
+        logging.warning(
+            "Переавторизация пользователя %s не прошла (%s/%s), повтор через %.0f с",
+            self.user_id, self._reauth_rejections, REAUTH_MAX_REJECTIONS, delay,
+        )
+        return delay
+
+    def _request_reauth(self) -> None:
+        """Ставит переавторизацию в очередь координатора, не дожидаясь её (итог — в tick)."""
+        if self._reauth_task is None or self._reauth_task.done():
+            self._reauth_task = asyncio.ensure_future(self.reauthenticate())
+
+    async def reauthenticate(self) -> bool:
+        """
+        Переавторизует пользователя при истечении сессии — через общую очередь
+        reauth_service.coordinator (лимит, темп, дедупликация). Возвращает
+        результат логина.
+        """
+        return await reauth_service.coordinator.reauthenticate(self.user_id, self._login_again)
+
+    async def _login_again(self) -> bool:
         """
-        Переавторизует пользователя при истечении сессии.
+        Логин на месте — в текущем API пользователя (его keep-alive сессия и
+        пул соединений сохраняются); новый API создаётся, только если его нет
+        в реестре.
         """
         db.cursor.execute('SELECT email, password FROM users WHERE user_id = ?', (self.user_id,))
         result = db.cursor.fetchone()
@@ -264,18 +607,26 @@ class LessonController:
 
         email, password = result
         password = decrypt_password(password)
-        # Создаем новый экземпляр API и авторизуемся
-        lk_client.apis[self.user_id] = lk_client.DebuggableBonchAPI()
-        await lk_client.apis[self.user_id].login(email, password)
+        api = lk_client.apis.get(self.user_id)
+        if api is None:
+            api = lk_client.DebuggableBonchAPI()
+            await lk_client.set_api(self.user_id, api)
+        else:
+            api.reset_session_state()
         # Обновляем ссылку на API в контроллере
-        self.api = lk_client.apis[self.user_id]
+        self.api = api
+        ok = await api.login(email, password)
+        if not ok and api.login_rejected:
+            raise reauth_service.LoginRejected(f"ЛК отклонил данные входа пользователя {self.user_id}")
+        return ok
 
     async def dump_timetable_snapshot(self, reason: str) -> Optional[Path]:
         """
         Сохраняет HTML расписания для дальнейшего анализа.
         """
         try:
-            raw_html = await self.api.get_raw_timetable()
+            with lk_priority(PRIORITY_BACKGROUND):
+                raw_html = await self.api.get_raw_timetable()
 
             # Проверяем, не является ли ответ редиректом на login=no (истекшая сессия)
             if raw_html and ("login=no" in raw_html or "index.php?login=no" in raw_html):
@@ -297,6 +648,9 @@ class LessonController:
         """
         Снимает дополнительную отладочную информацию для проблемных сценариев.
         """
+        # ЛК недоступен — не догружаем страницы поверх сбоя.
+        if lk_unavailable() is not None:
+            return
         # Не сохраняем снимки при истекшей сессии
         if isinstance(error, ValueError) and ("Session expired" in str(error) or "login=no" in str(error)):
             logging.warning("Пропускаем сохранение снимка из-за истекшей сессии")
@@ -0,0 +1,148 @@
+"""Центральный планировщик тиков автоотметки.
+
+Раньше у каждого LessonController была своя asyncio-задача, просыпавшаяся
+раз в минуту навсегда: O(пользователей) пробуждений в минуту даже ночью.
+Теперь все контроллеры лежат в одной куче по времени следующего события
+(напоминание за N минут, клик внутри пары, перестройка плана в полночь —
+это решает сам контроллер, возвращая паузу из tick()). Одна задача-диспетчер
+спит до ближайшего события и раздаёт созревшие тики в ограниченный пул
+воркеров (LESSON_SCHEDULER_WORKERS).
+
+Контракт контроллера (duck typing, модуль не импортирует lesson_controller —
+зависит только от config):
+- ``user_id`` и ``is_running``;
+- ``async tick() -> Optional[float]`` — один шаг; возвращает паузу до
+  следующего тика в секундах или None, если контроллер остановился.
+
+На пользователя в куче не больше одного контроллера: schedule() нового
+контроллера вытесняет прежний (например, после повторного /login).
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Optional
+
+from config import LESSON_SCHEDULER_WORKERS
+
+
+class LessonScheduler:
+    """Куча (время, seq, user_id) + диспетчер + пул воркеров."""
+
+    def __init__(self, workers: int = 16):
+        self.workers = max(1, int(workers))
+        self._heap: list = []
+        self._seq = itertools.count()
+        # user_id -> (контроллер, seq актуальной записи в куче); устаревшие записи
+        # кучи (перепланирование/отмена) пропускаются при извлечении.
+        self._entries: dict = {}
+        self._running_jobs: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop = None
+
+    # --- управление ----------------------------------------------------------
+
+    def schedule(self, controller, delay: float = 0.0) -> None:
+        """Ставит (или переносит) следующий тик контроллера через delay секунд."""
+        self._ensure_dispatcher()
+        seq = next(self._seq)
+        due = time.monotonic() + max(0.0, delay)
+        self._entries[controller.user_id] = (controller, seq)
+        heapq.heappush(self._heap, (due, seq, controller.user_id))
+        if self._heap[0][1] == seq:
+            # Новое событие раньше, чем то, до которого спит диспетчер.
+            self._wakeup.set()
+
+    def unschedule(self, controller) -> None:
+        """Убирает контроллер из расписания (если в куче именно он)."""
+        entry = self._entries.get(controller.user_id)
+        if entry is not None and entry[0] is controller:
+            del self._entries[controller.user_id]
+
+    def is_scheduled(self, controller) -> bool:
+        entry = self._entries.get(controller.user_id)
+        return entry is not None and entry[0] is controller
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self._entries),
+            "running": len(self._running_jobs),
+            "heap": len(self._heap),
+        }
+
+    async def stop(self, timeout: float = 15.0) -> None:
+        """Останавливает диспетчер и ждёт текущие тики (graceful shutdown)."""
+        dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None and not dispatcher.done():
+            dispatcher.cancel()
+            try:
+                await dispatcher
+            except asyncio.CancelledError:
+                pass
+        jobs = [job for job in self._running_jobs if not job.done()]
+        if jobs:
+            _, pending = await asyncio.wait(jobs, timeout=timeout)
+            for job in pending:
+                job.cancel()
+        self._entries.clear()
+        self._heap.clear()
+
+    # --- диспетчер -------------------------------------------------------------
+
+    def _ensure_dispatcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is not None and not self._dispatcher.done() and self._loop is loop:
+            return
+        # Примитивы asyncio привязаны к loop — создаём их вместе с диспетчером.
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._dispatcher = loop.create_task(self._dispatch_loop())
+
+    def _pop_due(self, now: float) -> list:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _due, seq, user_id = heapq.heappop(self._heap)
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] != seq:
+                continue  # устаревшая запись
+            del self._entries[user_id]
+            due.append(entry[0])
+        return due
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            for controller in self._pop_due(time.monotonic()):
+                await self._slots.acquire()
+                job = asyncio.create_task(self._run_tick(controller))
+                self._running_jobs.add(job)
+                job.add_done_callback(self._running_jobs.discard)
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, self._heap[0][0] - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_tick(self, controller) -> None:
+        delay = None
+        try:
+            if controller.is_running:
+                delay = await controller.tick()
+        except Exception:
+            # tick() сам ловит ожидаемые ошибки; сюда попадает только баг.
+            logging.error("Необработанная ошибка тика автоотметки для %s", controller.user_id, exc_info=True)
+            delay = 60.0
+        finally:
+            self._slots.release()
+        if delay is not None and controller.is_running and controller.user_id not in self._entries:
+            self.schedule(controller, delay)
+
+
+# Единый планировщик процесса. Доступ — lesson_scheduler.scheduler.
+scheduler = LessonScheduler(LESSON_SCHEDULER_WORKERS)
@@ -0,0 +1,182 @@
+"""Предохранитель (circuit breaker) запросов к хостам ЛК.
+
+Когда lk.sut.ru лежит, каждый контроллер раз в минуту получал таймаут/5xx,
+писал трейсбек и, бывало, догружал страницы для debug-снимков. Предохранитель
+на хост считает подряд идущие сбои:
+
+- closed — запросы идут; failure_threshold сбоев подряд (таймаут, ошибка
+  соединения, 5xx/403) — open;
+- open — запросы сразу получают LKUnavailableError, сеть не трогаем;
+- после reset_timeout_sec — half-open: пропускаем ровно один пробный запрос,
+  остальные по-прежнему fail fast. Успех пробы — closed, сбой — снова open с
+  удвоенной паузой (до max_reset_timeout_sec).
+
+Что считать сбоем, решает вызывающий код (lk_client): он передаёт классы
+сетевых исключений в guard() и помечает плохие HTTP-статусы через
+call.fail(). Модуль — лист графа зависимостей (stdlib + config).
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from config import LK_BREAKER_FAILURES, LK_BREAKER_RESET_MAX_SEC, LK_BREAKER_RESET_SEC
+
+LK_HOST = "lk.sut.ru"
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class LKUnavailableError(Exception):
+    """ЛК недоступен: предохранитель хоста открыт, запрос не отправлялся."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"{host} недоступен, повтор через {retry_after:.0f} с")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class _Call:
+    """Один запрос под guard(): call.fail(reason) — сбой без исключения (5xx/403)."""
+
+    __slots__ = ("failed", "reason")
+
+    def __init__(self):
+        self.failed = False
+        self.reason = ""
+
+    def fail(self, reason: str) -> None:
+        self.failed = True
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """Предохранитель одного хоста: closed -> open -> half-open (одна проба)."""
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout_sec: float = 60.0,
+                 max_reset_timeout_sec: float = 600.0):
+        self.host = host
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout_sec = reset_timeout_sec
+        self.max_reset_timeout_sec = max(reset_timeout_sec, max_reset_timeout_sec)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_total = 0
+        self.rejected = 0
+        self._current_timeout = reset_timeout_sec
+        self._open_until = 0.0
+        self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        """Через сколько секунд предохранитель пустит пробу (0 — пускает сейчас)."""
+        if self.state == STATE_CLOSED:
+            return 0.0
+        return max(0.0, self._open_until - time.monotonic())
+
+    @property
+    def is_open(self) -> bool:
+        """Запросы сейчас отклоняются (open или half-open с пробой в полёте)."""
+        if self.state == STATE_CLOSED:
+            return False
+        if self.state == STATE_HALF_OPEN:
+            return self._probe_in_flight
+        return self.retry_after() > 0
+
+    def before_request(self) -> bool:
+        """Пускает запрос или бросает LKUnavailableError. True — этот запрос — проба."""
+        if self.state == STATE_CLOSED:
+            return False
+        if self.state == STATE_OPEN and time.monotonic() >= self._open_until:
+            self.state = STATE_HALF_OPEN
+            logging.info("%s: предохранитель полуоткрыт — пробный запрос", self.host)
+        if self.state == STATE_HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        raise LKUnavailableError(self.host, max(1.0, self.retry_after()))
+
+    def record_success(self) -> None:
+        if self.state != STATE_CLOSED:
+            logging.info("%s снова отвечает — предохранитель закрыт", self.host)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+        self._current_timeout = self.reset_timeout_sec
+
+    def record_failure(self, reason: str = "") -> None:
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN:
+            self._probe_in_flight = False
+            self._current_timeout = min(self.max_reset_timeout_sec, self._current_timeout * 2)
+            self._open(reason)
+        elif self.state == STATE_CLOSED and self.failures >= self.failure_threshold:
+            self._open(reason)
+
+    def _open(self, reason: str) -> None:
+        self.state = STATE_OPEN
+        self._open_until = time.monotonic() + self._current_timeout
+        self.opened_total += 1
+        logging.warning(
+            "%s недоступен (%s, сбоев подряд: %s) — запросы отклоняются %.0f с",
+            self.host, reason or "ошибка", self.failures, self._current_timeout,
+        )
+
+    @contextmanager
+    def guard(self, failure_exceptions: tuple = (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        """
+        Запрос под предохранителем. Исключения из failure_exceptions и
+        call.fail() — сбой; чистый выход — успех. Прочие исключения (разбор,
+        истёкшая сессия) о доступности хоста не говорят: проба лишь освобождается.
+        """
+        probe = self.before_request()
+        call = _Call()
+        try:
+            yield call
+        except failure_exceptions as error:
+            self.record_failure(type(error).__name__)
+            raise
+        except BaseException:
+            if probe:
+                self._probe_in_flight = False
+            raise
+        if call.failed:
+            self.record_failure(call.reason)
+        else:
+            self.record_success()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_after_sec": round(self.retry_after(), 1),
+            "opened_total": self.opened_total,
+            "rejected": self.rejected,
+        }
+
+
+_BREAKERS = {}
+
+
+def get_breaker(host: str = LK_HOST) -> CircuitBreaker:
+    """Предохранитель хоста (один на процесс; состояния без привязки к event loop)."""
+    breaker = _BREAKERS.get(host)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            host,
+            failure_threshold=LK_BREAKER_FAILURES,
+            reset_timeout_sec=LK_BREAKER_RESET_SEC,
+            max_reset_timeout_sec=LK_BREAKER_RESET_MAX_SEC,
+        )
+        _BREAKERS[host] = breaker
+    return breaker
+
+
+def lk_unavailable(host: str = LK_HOST) -> Optional[float]:
+    """None — хост доступен; иначе секунды до следующей пробы."""
+    breaker = _BREAKERS.get(host)
+    if breaker is None or not breaker.is_open:
+        return None
+    return breaker.retry_after()
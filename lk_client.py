@@ -14,39 +14,68 @@ debug-дампы HTML-страниц, реестр API-инстансов по u
 - ``timetable_api`` — синглтон ``TimetableBonchAPI``, переприсваивается в
   ``get_timetable_api``; внешний доступ строго через ``lk_client.timetable_api``.
 
+Keep-alive: у каждого ``DebuggableBonchAPI`` одна долгоживущая aiohttp-сессия
+поверх его ``cookie_jar``; соединения берутся из общего пула lk.sut.ru
+в ``http_pool`` (там же прокси). Замена/удаление API в реестре — через
+``set_api``/``drop_api`` (закрывают сессию вытесненного экземпляра).
+
+Куки сессии зарегистрированного API сохраняются в users.db (Fernet) при
+изменении и на остановке; после рестарта ``restore_api_from_cookies`` поднимает
+сессию без четырёх запросов логина.
+
 Модуль НЕ импортирует main на уровне модуля (избегаем цикла с
 lesson_controller). ``auto_login_user``/``perform_login``/``LessonController``
 остаются в main.py.
 """
 
 import asyncio
+import json
 import logging
 import os
 import re
+import sys
 import time as time_module
-from datetime import datetime
+from collections import OrderedDict
+from http.cookies import SimpleCookie
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
 import aiohttp
 import aiofiles
 import pytz
-from bs4 import BeautifulSoup
 from yarl import URL as YarlURL
 
-from bonchapi import BonchAPI, parser
+from bonchapi import BonchAPI
 
 import parsers
 import db
-from config import get_lk_semaphore, LESSON_INTERVALS
+import http_pool
+from lk_breaker import LK_HOST, LKUnavailableError, get_breaker, lk_unavailable
+from config import (
+    get_lk_semaphore,
+    LESSON_INTERVALS,
+    LK_SESSION_IDLE_SEC,
+    LK_TIMETABLE_CACHE_WEEKS,
+    LK_TIMETABLE_TTL_CURRENT_SEC,
+    LK_TIMETABLE_TTL_FUTURE_SEC,
+    LK_TIMETABLE_TTL_PAST_SEC,
+    LK_TIMETABLE_CACHE_MAX_MB,
+)
 from monitoring import _note_parser_failure
-from security import decrypt_password
+from security import decrypt_password, decrypt_secret, encrypt_secret
 
 # `apis` и `timetable_api` намеренно НЕ входят в __all__: это разделяемое
 # изменяемое состояние, доступ к нему — строго через lk_client.<имя> (модуль-
 # квалифицированный), иначе `from lk_client import *` сделал бы снимок ссылки.
 __all__ = [
     "DebuggableBonchAPI",
+    "set_api",
+    "drop_api",
+    "restore_api_from_cookies",
+    "forget_cookies",
+    "close_idle_lk_sessions",
+    "close_lk_sessions",
     "save_debug_dump",
     "get_timetable_api",
     "get_message_api",
@@ -55,6 +84,8 @@ __all__ = [
     "lk_send_message",
     "TimetableBonchAPI",
     "BROWSER_HEADERS",
+    "LKUnavailableError",
+    "lk_unavailable_message",
 ]
 
 # Импорт для работы с расписанием без авторизации
@@ -67,6 +98,48 @@ except ImportError:
     from TImetabels import BonchAPI as TimetableBonchAPI, BROWSER_HEADERS
 
 
+# Общие заголовки keep-alive сессий ЛК. Специфичные для запроса (Referer,
+# Accept, X-Requested-With) передаются в самом запросе и дополняют эти.
+LK_SESSION_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36",
+    "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+def _lk_guard():
+    """
+    Запрос к lk.sut.ru под предохранителем (lk_breaker): при открытом —
+    LKUnavailableError без сети; сетевые ошибки/таймауты и call.fail() — сбой.
+    """
+    return get_breaker(LK_HOST).guard((aiohttp.ClientError, asyncio.TimeoutError))
+
+
+def _is_outage_status(status: int) -> bool:
+    """HTTP-статус, который говорит о недоступности/блокировке ЛК, а не о сессии."""
+    return status >= 500 or status == 403
+
+
+LK_UNAVAILABLE_TEXT = (
+    "⚠️ Личный кабинет СПбГУТ сейчас недоступен. "
+    "Бот повторит попытку сам — попробуй через {minutes} мин."
+)
+
+
+def lk_unavailable_message() -> Optional[str]:
+    """Готовый ответ хэндлерам, пока предохранитель ЛК открыт; None — ЛК доступен."""
+    retry_after = lk_unavailable(LK_HOST)
+    if retry_after is None:
+        return None
+    return LK_UNAVAILABLE_TEXT.format(minutes=max(1, int(retry_after // 60) + 1))
+
+
+# Общий учёт кэшей raspisanie.php всех экземпляров API (лимит
+# LK_TIMETABLE_CACHE_MAX_MB): порядок использования страниц по всем
+# пользователям — (id API, неделя) -> API — и их суммарный объём в байтах.
+# Обновляются на put/pop страницы, поэтому проверка лимита не обходит кэши.
+_raw_cache_lru: OrderedDict = OrderedDict()
+_raw_cache_total_bytes = 0
+
+
 class DebuggableBonchAPI(BonchAPI):
     """
     Расширяет стандартный BonchAPI подробными логами при клике.
@@ -79,8 +152,55 @@ class DebuggableBonchAPI(BonchAPI):
         # Оставляем атрибут для обратной совместимости (используется в других местах кода),
         # но наполняем его из cookie_jar после логина.
         self.cookies = None
-        self._raw_timetable_cache_html: Optional[str] = None
-        self._raw_timetable_cache_ts: Optional[float] = None
+        # LRU страниц raspisanie.php по неделе (0 — текущая): неделя -> (html, ts, ttl).
+        # Объём в байтах ведём отдельно — для общего лимита по всем пользователям.
+        self._raw_timetable_cache: OrderedDict = OrderedDict()
+        self._raw_timetable_cache_bytes = 0
+        # Последняя разобранная страница raspisanie.php: клик, напоминание и
+        # статус на одном HTML используют один разбор (см. get_timetable_page).
+        self._timetable_page: Optional[parsers.LKTimetablePage] = None
+        # Запросы raspisanie.php «в полёте» по неделе (0 — текущая): одновременные
+        # вызовы get_raw_timetable ждут один общий запрос к ЛК (single-flight).
+        self._raw_timetable_inflight: dict = {}
+        # Долгоживущая сессия поверх cookie_jar: соединения к ЛК переиспользуются
+        # между минутными тиками, а не открываются заново на каждый запрос.
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_last_used: Optional[float] = None
+        # Владелец сессии (проставляет set_api): куки сохраняются в users.db,
+        # чтобы после рестарта восстановить сессию без логина. _persisted_cookies —
+        # последний сохранённый снимок (пишем в БД только при изменении).
+        self.user_id: Optional[int] = None
+        self._persisted_cookies: Optional[str] = None
+        self._next_lesson_at: Optional[str] = None
+        # Последний login() не прошёл потому, что ЛК ответил отказом на email/пароль
+        # (а не из-за сбоя/таймаута ЛК) — см. reauth_service.LoginRejected.
+        self.login_rejected = False
+        # rasp-id последнего клика — по ним контроллер проверяет, прошла ли отметка.
+        self.last_clicked_ids: tuple = ()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает keep-alive сессию пользователя, создавая её при необходимости."""
+        if self._session is None or self._session.closed:
+            self._session = http_pool.session(
+                LK_HOST,
+                timeout=aiohttp.ClientTimeout(total=40),
+                headers=LK_SESSION_HEADERS,
+                cookie_jar=self.cookie_jar,
+            )
+        self._session_last_used = time_module.monotonic()
+        return self._session
+
+    def session_idle_seconds(self) -> Optional[float]:
+        """Сколько секунд сессия не использовалась. None — открытой сессии нет."""
+        if self._session is None or self._session.closed or self._session_last_used is None:
+            return None
+        return time_module.monotonic() - self._session_last_used
+
+    async def close(self) -> None:
+        """Закрывает keep-alive сессию. Куки остаются в cookie_jar — следующий запрос откроет новую."""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
 
     def _refresh_cookies_view(self):
         """Обновляет self.cookies из текущего cookie_jar для совместимости с внешним кодом."""
@@ -89,18 +209,57 @@ class DebuggableBonchAPI(BonchAPI):
         except Exception:
             # В крайних случаях оставляем как есть
             pass
+        self.persist_cookies()
+
+    def export_cookies(self) -> list:
+        """Куки из cookie_jar в JSON-совместимом виде: [{name, value, domain, path}]."""
+        cookies = [
+            {
+                "name": morsel.key,
+                "value": morsel.value,
+                "domain": morsel["domain"],
+                "path": morsel["path"] or "/",
+            }
+            for morsel in self.cookie_jar
+        ]
+        return sorted(cookies, key=lambda c: (c["domain"], c["path"], c["name"]))
+
+    def load_cookies(self, cookies: list) -> None:
+        """Кладёт в cookie_jar куки из export_cookies (восстановление сессии)."""
+        for cookie in cookies:
+            jar_cookie = SimpleCookie()
+            jar_cookie[cookie["name"]] = cookie["value"]
+            morsel = jar_cookie[cookie["name"]]
+            if cookie.get("domain"):
+                morsel["domain"] = cookie["domain"]
+            morsel["path"] = cookie.get("path") or "/"
+            self.cookie_jar.update_cookies(jar_cookie, response_url=YarlURL("https://lk.sut.ru/"))
+        # Загруженное уже лежит в БД — повторно не пишем.
+        self._persisted_cookies = json.dumps(self.export_cookies(), sort_keys=True)
+        self._refresh_cookies_view()
 
-    def _get_week_safe(self, html: str) -> int:
-        """Извлекает номер недели из HTML расписания (см. parsers.parse_week_number)."""
-        return parsers.parse_week_number(html)
-
-    def _get_week_param_safe(self, html: str) -> int:
-        """Извлекает week_param для POST в raspisanie.php (см. parsers.parse_week_param)."""
-        return parsers.parse_week_param(html)
-
-    def _extract_start_lesson_ids(self, timetable_html: str) -> tuple[str, ...]:
-        """Извлекает занятия с кнопкой «Начать занятие» (см. parsers.extract_start_lesson_ids)."""
-        return parsers.extract_start_lesson_ids(timetable_html)
+    def persist_cookies(self) -> bool:
+        """
+        Сохраняет куки в users.db (Fernet, security.encrypt_secret), если они
+        изменились с прошлого сохранения. Без user_id или ключа шифрования
+        ничего не пишет. Возвращает True, если запись была.
+        """
+        if self.user_id is None:
+            return False
+        cookies = self.export_cookies()
+        snapshot = json.dumps(cookies, sort_keys=True)
+        if not cookies or snapshot == self._persisted_cookies:
+            return False
+        token = encrypt_secret(snapshot)
+        if token is None:
+            return False
+        try:
+            db.set_lk_cookies(self.user_id, token)
+        except Exception:
+            logging.warning("Не удалось сохранить куки ЛК для %s", self.user_id, exc_info=True)
+            return False
+        self._persisted_cookies = snapshot
+        return True
 
     async def login(self, email: str, password: str) -> bool:
         """
@@ -108,47 +267,45 @@ class DebuggableBonchAPI(BonchAPI):
         Исправляет проблему "The plain HTTP request was sent to HTTPS port".
         """
         AUTH = f'https://lk.sut.ru/cabinet/lib/autentificationok.php?users={email}&parole={password}'
+        self.login_rejected = False
         CABINET = 'https://lk.sut.ru/cabinet/'
 
         headers = {
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1",
             "Referer": CABINET,
         }
 
         try:
-            timeout_cfg = aiohttp.ClientTimeout(total=40)
-            async with get_lk_semaphore():
-                async with aiohttp.ClientSession(
-                    timeout=timeout_cfg,
-                    headers=headers,
-                    trust_env=True,
-                    cookie_jar=self.cookie_jar,
-                    connector=aiohttp.TCPConnector(force_close=True),
-                ) as session:
+            with _lk_guard() as call:
+                async with get_lk_semaphore():
+                    session = self._get_session()
                     # Инициализируем сессию (получаем куки)
-                    async with session.get(CABINET, proxy=None) as response:
+                    async with session.get(CABINET, headers=headers, proxy=None) as response:
                         if response.status == 403:
                             body = (await response.text())[:500]
                             logging.error("403 при открытии CABINET для %s. Тело: %s", email, body)
+                            get_lk_semaphore().note_overload("403")
+                            call.fail("HTTP 403")
                             return False
                         response.raise_for_status()
 
                     # Некоторым конфигурациям lk нужен ?login=no, оставляем как доп. шаг
-                    async with session.get(f"{CABINET}?login=no", proxy=None) as response:
+                    async with session.get(f"{CABINET}?login=no", headers=headers, proxy=None) as response:
                         if response.status == 403:
                             body = (await response.text())[:500]
                             logging.error("403 при открытии CABINET?login=no для %s. Тело: %s", email, body)
+                            get_lk_semaphore().note_overload("403")
+                            call.fail("HTTP 403")
                             return False
                         response.raise_for_status()
 
-                    async with session.post(AUTH, proxy=None) as response:
+                    async with session.post(AUTH, headers=headers, proxy=None) as response:
                         if response.status == 403:
                             body = (await response.text())[:500]
                             logging.error("403 при POST AUTH для %s. Тело: %s", email, body)
+                            get_lk_semaphore().note_overload("403")
+                            call.fail("HTTP 403")
                             return False
                         response.raise_for_status()
                         text = await response.text()
@@ -156,10 +313,12 @@ class DebuggableBonchAPI(BonchAPI):
                     # Обрезаем пробелы и переносы строк, так как сервер может возвращать '\n1' вместо '1'
                     text_clean = (text or "").strip()
                     if text_clean == "1":
-                        async with session.get(f"{CABINET}?login=yes", proxy=None) as response:
+                        async with session.get(f"{CABINET}?login=yes", headers=headers, proxy=None) as response:
                             if response.status == 403:
                                 body = (await response.text())[:500]
                                 logging.error("403 при открытии CABINET?login=yes для %s. Тело: %s", email, body)
+                                get_lk_semaphore().note_overload("403")
+                                call.fail("HTTP 403")
                                 return False
                             response.raise_for_status()
                             self._refresh_cookies_view()
@@ -167,6 +326,9 @@ class DebuggableBonchAPI(BonchAPI):
                             return True
 
                     self._refresh_cookies_view()
+                    # ЛК ответил на AUTH коротким кодом, но не «1» — отказ в данных
+                    # входа. Пустой ответ или HTML-страница — скорее сбой самого ЛК.
+                    self.login_rejected = bool(text_clean) and "<" not in text_clean
                     logging.warning(
                         "Ошибка авторизации для %s: ответ сервера '%s' (очищенный: '%s')",
                         email,
@@ -174,6 +336,9 @@ class DebuggableBonchAPI(BonchAPI):
                         text_clean,
                     )
                     return False
+        except LKUnavailableError as e:
+            logging.warning("Вход %s не выполнен: %s", email, e)
+            return False
         except Exception as e:
             logging.error("Ошибка при авторизации для %s: %s", email, e, exc_info=True)
             return False
@@ -182,52 +347,198 @@ class DebuggableBonchAPI(BonchAPI):
         """
         Получает HTML страницы raspisanie.php из lk.sut.ru.
         week_number — номер недели для навигации; без него берётся текущая.
-        Запрос к ЛК идёт через прокси (trust_env=True подхватывает HTTP(S)_PROXY из env).
+        Запрос к ЛК идёт через пул lk.sut.ru из http_pool (с прокси ALL_PROXY, если задан).
+
+        Одновременные вызовы для одной недели (напоминание, клик, /test_notify,
+        debug-снимок) не дублируют запрос: все ждут один общий fetch.
         """
+        # Кэш по неделям: напоминание "за 10 минут", клик и навигация по неделям
+        # не перекачивают страницу, которая у нас уже есть.
+        key = self._raw_cache_key(week_number)
+        cached = self._raw_cache_get(key)
+        if cached is not None:
+            return cached
+
+        task = self._raw_timetable_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_raw_timetable(week_number, key))
+            self._raw_timetable_inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._on_raw_timetable_done(k, t))
+        # shield: отмена одного ожидающего не должна обрывать запрос для остальных.
+        return await asyncio.shield(task)
+
+    def _on_raw_timetable_done(self, key, task: asyncio.Future) -> None:
+        """Снимает запрос с учёта «в полёте»; исключение помечаем полученным,
+        чтобы asyncio не ругался, если все ожидающие уже отменены."""
+        if self._raw_timetable_inflight.get(key) is task:
+            del self._raw_timetable_inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_raw_timetable(self, week_number: int = False, key: int = 0) -> str:
+        """Один сетевой запрос raspisanie.php (вызывается только из get_raw_timetable)."""
         URL = "https://lk.sut.ru/cabinet/project/cabinet/forms/raspisanie.php"
         if week_number:
             URL += f"?week={week_number}"
         ERR_MSG = "У Вас нет прав доступа. Или необходимо перезагрузить приложение.."
         headers = {
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
             "Referer": "https://lk.sut.ru/cabinet/",
-            "Connection": "keep-alive",
         }
 
-        timeout_cfg = aiohttp.ClientTimeout(total=40)
-
-        # Небольшой кэш для текущей недели, чтобы напоминание "за 10 минут" и клик
-        # не дёргали страницу слишком часто. Для конкретной недели кэш не используем.
-        use_cache = not week_number
-        if use_cache and self._raw_timetable_cache_html is not None and self._raw_timetable_cache_ts is not None:
-            if (time_module.time() - self._raw_timetable_cache_ts) < 30:
-                return self._raw_timetable_cache_html
-
-        async with get_lk_semaphore():
-            async with aiohttp.ClientSession(
-                timeout=timeout_cfg,
-                headers=headers,
-                trust_env=True,
-                cookie_jar=self.cookie_jar,
-                connector=aiohttp.TCPConnector(force_close=True),
-            ) as session:
-                async with session.get(URL, proxy=None) as response:
-                    text = await response.text()
+        with _lk_guard() as call:
+            async with get_lk_semaphore():
+                session = self._get_session()
+                try:
+                    async with session.get(URL, headers=headers, proxy=None) as response:
+                        text = await response.text()
+                except aiohttp.ServerDisconnectedError:
+                    # Сервер мог закрыть простаивавшее keep-alive соединение из пула
+                    # раньше нашего keepalive_timeout. GET идемпотентен — повторяем
+                    # один раз уже на свежем соединении.
+                    logging.debug("ЛК закрыл keep-alive соединение, повторяем запрос raspisanie.php")
+                    async with session.get(URL, headers=headers, proxy=None) as response:
+                        text = await response.text()
+                if _is_outage_status(response.status):
+                    call.fail(f"HTTP {response.status}")
                 if response.status == 403:
                     # Оставляем текст как есть (он будет задемплен выше по стеку),
                     # но логируем маленький кусок для быстрого понимания.
                     logging.error("403 Forbidden при получении raspisanie.php. Первые 200 символов: %s", (text or "")[:200])
+                    get_lk_semaphore().note_overload("403")
                 # ЛК иногда возвращает короткое сообщение вместо HTML при протухшей сессии
                 if (text or "").strip() == ERR_MSG:
                     logging.warning("ЛК вернул ERR_MSG вместо расписания — похоже, сессия истекла.")
+                    get_lk_semaphore().note_overload("ERR_MSG")
                 self._refresh_cookies_view()
-                if use_cache:
-                    self._raw_timetable_cache_html = text
-                    self._raw_timetable_cache_ts = time_module.time()
+                # Ошибочные ответы не кэшируем: иначе переавторизация увидит старую ошибку.
+                if response.status == 200 and not parsers.LKTimetablePage(text).session_expired:
+                    self._raw_cache_put(key, text)
                 return text
 
+    def _raw_cache_key(self, week_number) -> int:
+        """
+        Ключ кэша: 0 — текущая неделя. ?week=<week_param текущей недели> отдаёт
+        ту же страницу, поэтому тоже хранится под 0, а не второй копией.
+        """
+        if not week_number:
+            return 0
+        page = self._timetable_page
+        if page is not None and page.week_param and week_number == page.week_param:
+            return 0
+        return week_number
+
+    def _raw_cache_ttl(self, key: int) -> float:
+        """TTL недели: текущая — коротко, прошедшая — долго, будущая — между ними."""
+        if not key:
+            return LK_TIMETABLE_TTL_CURRENT_SEC
+        # Ключ недели — её week_param (?week=), сравниваем с week_param текущей.
+        page = self._timetable_page
+        current_week = page.week_param if page is not None and page.html else 0
+        if not current_week or key == current_week:
+            return LK_TIMETABLE_TTL_CURRENT_SEC
+        if key < current_week:
+            return LK_TIMETABLE_TTL_PAST_SEC
+        return LK_TIMETABLE_TTL_FUTURE_SEC
+
+    def _raw_cache_get(self, key: int) -> Optional[str]:
+        entry = self._raw_timetable_cache.get(key)
+        if entry is None:
+            return None
+        text, ts, ttl = entry
+        if (time_module.time() - ts) >= ttl:
+            self._raw_cache_pop(key)
+            return None
+        self._raw_timetable_cache.move_to_end(key)
+        _raw_cache_lru.move_to_end((id(self), key))
+        return text
+
+    def _raw_cache_put(self, key: int, text: str) -> None:
+        global _raw_cache_total_bytes
+        self._raw_cache_pop(key)
+        size = sys.getsizeof(text)
+        self._raw_timetable_cache[key] = (text, time_module.time(), self._raw_cache_ttl(key))
+        self._raw_timetable_cache_bytes += size
+        _raw_cache_lru[(id(self), key)] = self
+        _raw_cache_total_bytes += size
+        while len(self._raw_timetable_cache) > LK_TIMETABLE_CACHE_WEEKS:
+            self._raw_cache_pop(next(iter(self._raw_timetable_cache)))
+        _enforce_raw_cache_budget()
+
+    def _raw_cache_pop(self, key: int) -> None:
+        global _raw_cache_total_bytes
+        entry = self._raw_timetable_cache.pop(key, None)
+        if entry is not None:
+            size = sys.getsizeof(entry[0])
+            self._raw_timetable_cache_bytes -= size
+            _raw_cache_total_bytes -= size
+            _raw_cache_lru.pop((id(self), key), None)
+
+    def _raw_cache_clear(self) -> None:
+        for key in list(self._raw_timetable_cache):
+            self._raw_cache_pop(key)
+
+    async def get_timetable_page(self, week_number: int = False) -> parsers.LKTimetablePage:
+        """
+        raspisanie.php в виде LKTimetablePage. Пока get_raw_timetable отдаёт тот же
+        HTML текущей недели (кэш), повторно страница не разбирается.
+        """
+        html_text = await self.get_raw_timetable(week_number)
+        if week_number:
+            return parsers.parse_lk_timetable_page(html_text)
+        page = self._timetable_page
+        if page is None or page.html != (html_text or ""):
+            page = parsers.parse_lk_timetable_page(html_text)
+            self._timetable_page = page
+            # Неделя, закэшированная по ?week= до того, как стало известно, что
+            # она текущая, — копия страницы под ключом 0.
+            if page.week_param:
+                self._raw_cache_pop(page.week_param)
+            self._remember_next_lesson(page)
+        return page
+
+    def _remember_next_lesson(self, page: parsers.LKTimetablePage) -> None:
+        """Сохраняет в users.db начало ближайшей пары — по нему упорядочен автологин на старте."""
+        if self.user_id is None or page.session_expired or not page.week_param:
+            return
+        now = datetime.now(pytz.timezone("Europe/Moscow"))
+        # Пока сохранённая пара впереди, строки дня (DOM) не разбираем: клик
+        # обходится полями быстрого пути.
+        if self._next_lesson_at and datetime.fromisoformat(self._next_lesson_at) > now:
+            return
+        start = page.next_lesson_start(now, LESSON_INTERVALS)
+        if start is None:
+            # Пар до конца недели нет: на странице только текущая неделя, так что
+            # оцениваем следующую по первой паре этой же недели через 7 дней.
+            first = page.next_lesson_start(now - timedelta(weeks=1), LESSON_INTERVALS)
+            start = first + timedelta(weeks=1) if first else None
+        value = start.isoformat() if start else None
+        if value == self._next_lesson_at:
+            return
+        try:
+            db.set_next_lesson_at(self.user_id, value)
+            self._next_lesson_at = value
+        except Exception:
+            logging.warning("Не удалось сохранить ближайшую пару для %s", self.user_id, exc_info=True)
+
+    def reset_session_state(self) -> None:
+        """
+        Забывает протухшие куки и кэш страниц перед повторным логином на том же
+        объекте: keep-alive сессия и пул соединений сохраняются.
+        """
+        self.cookie_jar.clear()
+        self._raw_cache_clear()
+        self._timetable_page = None
+
+    async def check_session(self) -> bool:
+        """
+        Проверка сессии одним свежим запросом raspisanie.php (мимо кэша).
+        Заодно греет соединение и кэш страницы перед кликом.
+        """
+        self._raw_cache_pop(0)
+        page = await self.get_timetable_page()
+        return not page.session_expired
+
     def _parse_today_start_lesson_details(
         self, timetable_html: str, today_date_str: str, target_pair_number: int
     ) -> Optional[dict]:
@@ -237,91 +548,8 @@ class DebuggableBonchAPI(BonchAPI):
         """
         if not timetable_html:
             return None
-
-        soup = BeautifulSoup(timetable_html, "html.parser")
-
-        table = soup.find("table", class_="simple-little-table")
-        if not table:
-            return None
-
-        current_day = None
-        # Пробуем распарсить все tr из tbody
-        tbody = table.find("tbody")
-        if not tbody:
-            return None
-
-        for tr in tbody.find_all("tr"):
-            tds = tr.find_all("td")
-            if not tds:
-                continue
-
-            # Заголовок дня: td[colspan=6] + <b>День</b> + <small><br/>DD.MM.YYYY</small>
-            if len(tds) == 1 and tds[0].has_attr("colspan") and "6" in str(tds[0].get("colspan")):
-                day_text = tds[0].get_text(" ", strip=True)
-                m = re.search(r"(\d{2}\.\d{2}\.\d{4})", day_text)
-                current_day = m.group(1) if m else None
-                continue
-
-            # Строка занятия обычно имеет несколько td
-            if current_day != today_date_str:
-                continue
-
-            # В примере: [0]=пара, [1]=предмет, [2]=пусто/тип, [3]=кабинет, [4]=преподаватель, [5]=ссылки + кнопка
-            if len(tds) < 6:
-                continue
-
-            pair_cell_text = tds[0].get_text(" ", strip=True)
-            # Пример: "3 (13:00-14:35)"
-            m_pair = re.search(r"(\d+)\s*\(", pair_cell_text)
-            if not m_pair:
-                continue
-            pair_number = int(m_pair.group(1))
-            if pair_number != target_pair_number:
-                continue
-
-            # Ищем "Начать занятие" (open_zan) внутри последней ячейки.
-            # Для напоминаний нам кнопка может НЕ быть видна ещё (препод/время),
-            # поэтому не возвращаем None, если ссылки нет.
-            rasp = None
-            week_param = None
-            start_a = None
-            last_td = tds[-1]
-            for a in last_td.find_all("a"):
-                a_text = a.get_text(" ", strip=True)
-                onclick = a.get("onclick", "") or ""
-                if "Начать занятие" in a_text and "open_zan" in onclick:
-                    start_a = a
-                    break
-            if start_a:
-                m_onclick = re.search(
-                    r"open_zan\(\s*(\d+)\s*,\s*(\d+)\s*\)",
-                    start_a.get("onclick", "") or "",
-                )
-                if m_onclick:
-                    rasp = m_onclick.group(1)
-                    week_param = m_onclick.group(2)
-
-            # Предмет/кабинет
-            subject = None
-            b_tag = tds[1].find("b")
-            if b_tag:
-                subject = b_tag.get_text(" ", strip=True)
-            else:
-                subject = tds[1].get_text(" ", strip=True)
-
-            room = tds[3].get_text(" ", strip=True) if len(tds) > 3 else None
-            teacher = tds[4].get_text(" ", strip=True) if len(tds) > 4 else None
-
-            return {
-                "pair_number": pair_number,
-                "subject": subject,
-                "room": room,
-                "teacher": teacher,
-                "rasp": rasp,
-                "week_param": week_param,
-            }
-
-        return None
+        page = parsers.parse_lk_timetable_page(timetable_html)
+        return page.lesson_details(today_date_str, target_pair_number)
 
     async def get_upcoming_start_lesson_details(
         self, now_dt: datetime, target_pair_index: int, window_minutes: int = 15
@@ -341,8 +569,8 @@ class DebuggableBonchAPI(BonchAPI):
         today_date_str = now_dt.strftime("%d.%m.%Y")
         target_pair_number = target_pair_index + 1
 
-        html_text = await self.get_raw_timetable()
-        return self._parse_today_start_lesson_details(html_text, today_date_str, target_pair_number)
+        page = await self.get_timetable_page()
+        return page.lesson_details(today_date_str, target_pair_number)
 
     async def get_current_lesson_details(
         self, now_dt: datetime, target_pair_index: int
@@ -353,33 +581,32 @@ class DebuggableBonchAPI(BonchAPI):
         """
         today_date_str = now_dt.strftime("%d.%m.%Y")
         target_pair_number = target_pair_index + 1
-        html_text = await self.get_raw_timetable()
-        return self._parse_today_start_lesson_details(html_text, today_date_str, target_pair_number)
-
-    def _extract_lesson_ids_fallback(self, timetable_html: str) -> tuple[str, ...]:
-        """Запасной поиск lesson_id по id='knopXXXX' (см. parsers.extract_lesson_ids_fallback)."""
-        return parsers.extract_lesson_ids_fallback(timetable_html)
+        page = await self.get_timetable_page()
+        return page.lesson_details(today_date_str, target_pair_number)
 
     async def click_start_lesson(self, user_id=None) -> int:
         URL = "https://lk.sut.ru/cabinet/project/cabinet/forms/raspisanie.php"
-        ERR_MSG = "У Вас нет прав доступа. Или необходимо перезагрузить приложение.."
 
-        timetable = await self.get_raw_timetable()
+        # Один разбор страницы на весь клик (и на напоминание в том же тике).
+        page = await self.get_timetable_page()
+        timetable = page.html
 
         # Проверяем, не является ли ответ редиректом на login=no (истекшая сессия)
-        if timetable and ("login=no" in timetable or "index.php?login=no" in timetable):
+        if "login=no" in timetable:
             raise ValueError("Session expired - redirect to login=no. Need to re-authenticate.")
         # Сессия может “протухнуть” и вернуться коротким текстом
-        if (timetable or "").strip() == ERR_MSG:
+        if page.session_expired:
             raise ValueError("Session expired - ERR_MSG from LK. Need to re-authenticate.")
 
         # Отдельный кейс: в ЛК нет назначенной группы -> расписания и кнопок не будет
-        if "Ваша группа не определена" in (timetable or ""):
+        if page.group_undefined:
             raise ValueError("LK group not defined - cannot auto-click")
 
         # Номер недели — для логов; week_param — для POST (open=1&rasp=...&week=...)
-        week_number = self._get_week_safe(timetable)
-        week_param = self._get_week_param_safe(timetable)
+        week_number = page.week_number
+        week_param = page.week_param
+        if not week_number:
+            logging.warning("Не найден номер недели в расписании (нет h3/h2/паттерна 'Неделя №'), используем неделю 0")
 
         # Здоровье парсера: на валидной странице расписания week_param есть всегда
         # (сессионные/групповые кейсы отсеяны выше). Отсутствие = вёрстка ЛК
@@ -387,15 +614,9 @@ class DebuggableBonchAPI(BonchAPI):
         if not week_param:
             await _note_parser_failure(user_id)
 
-        # Самый надежный набор кандидатов: только реальные кнопки "Начать занятие"
-        lesson_ids = self._extract_start_lesson_ids(timetable)
-
-        # Fallback: если на странице нет "Начать занятие" (например, рано), пробуем старые варианты
-        if not lesson_ids:
-            parsed_ids = await parser.get_lesson_id(timetable)
-            lesson_ids = tuple(parsed_ids or ())
-            if not lesson_ids:
-                lesson_ids = self._extract_lesson_ids_fallback(timetable)
+        # Самый надежный набор кандидатов: только реальные кнопки "Начать занятие";
+        # если их нет (например, рано) — запасные id вида knopXXXX.
+        lesson_ids = page.lesson_ids
 
         logging.debug(
             "Неделя №%s (week_param=%s), найдено %s кандидат(ов) для клика: %s",
@@ -424,23 +645,18 @@ class DebuggableBonchAPI(BonchAPI):
             return 0
 
         clicked = 0
+        self.last_clicked_ids = tuple(lesson_ids)
         headers = {
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36",
             "Accept": "*/*",
             "X-Requested-With": "XMLHttpRequest",
             "Referer": URL,
         }
-        async with get_lk_semaphore():
-            async with aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(40),
-                headers=headers,
-                trust_env=True,
-                cookie_jar=self.cookie_jar,
-                connector=aiohttp.TCPConnector(force_close=True),
-            ) as session:
+        with _lk_guard() as call:
+            async with get_lk_semaphore():
+                session = self._get_session()
                 for lesson_id in lesson_ids:
                     data = {"open": 1, "rasp": lesson_id, "week": week_param}
-                    async with session.post(URL, data=data, proxy=None) as resp:
+                    async with session.post(URL, data=data, headers=headers, proxy=None) as resp:
                         text = await resp.text()
 
                     # Проверяем ответ на ошибку авторизации
@@ -451,6 +667,10 @@ class DebuggableBonchAPI(BonchAPI):
 
                     if resp.status == 200:
                         clicked += 1
+                    elif resp.status == 403:
+                        get_lk_semaphore().note_overload("403")
+                    if _is_outage_status(resp.status):
+                        call.fail(f"HTTP {resp.status}")
 
                     logging.debug(
                         "Ответ на клик урока %s: статус %s, первые 200 символов: %s",
@@ -467,6 +687,98 @@ class DebuggableBonchAPI(BonchAPI):
 # никогда не переприсваивается. Внешний доступ строго через lk_client.apis.
 apis = {}  # Словарь для хранения экземпляров BonchAPI
 
+
+async def set_api(user_id: int, api: DebuggableBonchAPI) -> None:
+    """
+    Кладёт API в реестр и сохраняет его куки; keep-alive сессию вытесненного
+    экземпляра закрывает.
+    """
+    previous = apis.get(user_id)
+    apis[user_id] = api
+    api.user_id = user_id
+    api.persist_cookies()
+    if api._timetable_page is not None:
+        api._remember_next_lesson(api._timetable_page)
+    if previous is not None and previous is not api:
+        previous._raw_cache_clear()
+        await previous.close()
+
+
+def restore_api_from_cookies(user_id: int) -> Optional[DebuggableBonchAPI]:
+    """
+    API с куками, сохранёнными в users.db (без сети). None — сохранённых кук
+    нет или их не расшифровать. Жива ли сессия, проверяет вызывающий код.
+    """
+    try:
+        payload = decrypt_secret(db.get_lk_cookies(user_id))
+        cookies = json.loads(payload) if payload else None
+    except Exception:
+        logging.warning("Не удалось прочитать сохранённые куки ЛК для %s", user_id, exc_info=True)
+        cookies = None
+    if not cookies:
+        return None
+    api = DebuggableBonchAPI()
+    api.load_cookies(cookies)
+    return api
+
+
+def forget_cookies(user_id: int) -> None:
+    """Удаляет сохранённые куки пользователя (сессия мертва)."""
+    try:
+        db.set_lk_cookies(user_id, None)
+    except Exception:
+        logging.warning("Не удалось удалить куки ЛК для %s", user_id, exc_info=True)
+
+
+async def drop_api(user_id: int) -> None:
+    """Убирает API пользователя из реестра и закрывает его keep-alive сессию."""
+    api = apis.pop(user_id, None)
+    if api is not None:
+        api._raw_cache_clear()
+        await api.close()
+
+
+def _enforce_raw_cache_budget() -> None:
+    """
+    Держит суммарный объём кэшей raspisanie.php всех API в пределах
+    LK_TIMETABLE_CACHE_MAX_MB: вытесняет самые давно использованные страницы
+    по всем пользователям. Самую свежую (только что положенную) не трогаем.
+    Итог ведётся на put/pop, поэтому в пределах лимита это одно сравнение.
+    """
+    budget = LK_TIMETABLE_CACHE_MAX_MB * 1024 * 1024
+    while _raw_cache_total_bytes > budget and len(_raw_cache_lru) > 1:
+        (_api_id, key), api = next(iter(_raw_cache_lru.items()))
+        api._raw_cache_pop(key)
+
+
+async def close_idle_lk_sessions(max_idle_sec: float = LK_SESSION_IDLE_SEC) -> int:
+    """
+    Закрывает сессии, простаивающие дольше max_idle_sec (пользователь не
+    кликает и не смотрит расписание). Куки остаются в cookie_jar — при
+    следующем запросе сессия откроется заново. Возвращает число закрытых.
+    """
+    closed = 0
+    for api in list(apis.values()):
+        idle = api.session_idle_seconds()
+        if idle is not None and idle > max_idle_sec:
+            await api.close()
+            closed += 1
+    return closed
+
+
+async def close_lk_sessions() -> None:
+    """
+    Сохраняет изменившиеся куки и закрывает все сессии пользователей и общие
+    пулы соединений http_pool (graceful shutdown).
+    """
+    for api in list(apis.values()):
+        try:
+            api.persist_cookies()
+            await api.close()
+        except Exception:
+            logging.warning("Не удалось закрыть сессию ЛК", exc_info=True)
+    await http_pool.close_connectors()
+
 # Экземпляр TimetableBonchAPI для работы с расписанием без авторизации.
 # Переприсваивается лениво в get_timetable_api — внешний доступ строго
 # через lk_client.timetable_api.
@@ -582,11 +894,12 @@ async def lk_search_recipients(message_api: TimetableBonchAPI, query: str):
     URL = "https://lk.sut.ru/cabinet/subconto/search.php"
 
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(40), trust_env=True, headers=BROWSER_HEADERS, connector=aiohttp.TCPConnector(force_close=True)) as session:
-            async with session.get(URL, params={"value": query}, cookies=message_api.cookies, proxy=None) as response:
-                status = response.status
-                response.raise_for_status()
-                html_text = await response.text()
+        with _lk_guard():
+            async with http_pool.session(LK_HOST, timeout=aiohttp.ClientTimeout(40), headers=BROWSER_HEADERS) as session:
+                async with session.get(URL, params={"value": query}, cookies=message_api.cookies, proxy=None) as response:
+                    status = response.status
+                    response.raise_for_status()
+                    html_text = await response.text()
 
         # Парсим строки вида "ФИО (id=12345)"
         results = parsers.parse_recipients(html_text)
@@ -600,6 +913,9 @@ async def lk_search_recipients(message_api: TimetableBonchAPI, query: str):
                 (html_text or "")[:400].replace("\n", " "),
             )
         return results
+    except LKUnavailableError as e:
+        logging.warning("Запрос в ЛК не выполнен: %s", e)
+        return []
     except Exception as e:
         logging.error(f"Ошибка при поиске получателей в ЛК: {type(e).__name__} {e}", exc_info=True)
         return []
@@ -621,17 +937,21 @@ async def lk_upload_file(message_api: TimetableBonchAPI, filename: str, id: int
         data.add_field("upload", "")
         data.add_field('userfile', file, filename=os.path.basename(filename))
 
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(40), trust_env=True, headers=BROWSER_HEADERS, connector=aiohttp.TCPConnector(force_close=True)) as session:
-            async with session.post(URL, cookies=message_api.cookies, data=data, proxy=None) as response:
-                response.raise_for_status()
-                text = await response.text()
-                match = re.search(r'data\.idinfo = "(\d+)"', text)
-                if not match:
-                    logging.error("Не удалось извлечь idinfo из ответа при загрузке файла")
-                    return 0
-                idinfo = match.group(1)
-                logging.info('Файл успешно загружен в ЛК, idinfo=%s', idinfo)
-                return int(idinfo)
+        with _lk_guard():
+            async with http_pool.session(LK_HOST, timeout=aiohttp.ClientTimeout(40), headers=BROWSER_HEADERS) as session:
+                async with session.post(URL, cookies=message_api.cookies, data=data, proxy=None) as response:
+                    response.raise_for_status()
+                    text = await response.text()
+                    match = re.search(r'data\.idinfo = "(\d+)"', text)
+                    if not match:
+                        logging.error("Не удалось извлечь idinfo из ответа при загрузке файла")
+                        return 0
+                    idinfo = match.group(1)
+                    logging.info('Файл успешно загружен в ЛК, idinfo=%s', idinfo)
+                    return int(idinfo)
+    except LKUnavailableError as e:
+        logging.warning("Запрос в ЛК не выполнен: %s", e)
+        return 0
     except Exception as e:
         logging.error(f'Ошибка при загрузке файла в ЛК: {type(e).__name__} {e}', exc_info=True)
         return 0
@@ -660,22 +980,26 @@ async def lk_send_message(
     }
 
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(40), trust_env=True, headers=BROWSER_HEADERS, connector=aiohttp.TCPConnector(force_close=True)) as session:
-            async with session.post(URL, cookies=message_api.cookies, data=data, proxy=None) as response:
-                response.raise_for_status()
-                text = await response.text()
-                # Успех — пустой ответ; ЛК часто отдаёт его как пробелы/перевод строки.
-                if text.strip() == '':
-                    logging.info('Сообщение в ЛК успешно отправлено (adresat=%s)', recipient_id)
-                    return True
-                else:
-                    # Сервер иногда возвращает ошибку про link_url, но сообщение всё равно отправляется
-                    # Проверяем, является ли это только ошибкой про link_url
-                    if 'link_url' in text.lower() and 'undefined index' in text.lower():
-                        logging.warning('Сервер вернул предупреждение про link_url, но сообщение должно быть отправлено (adresat=%s)', recipient_id)
+        with _lk_guard():
+            async with http_pool.session(LK_HOST, timeout=aiohttp.ClientTimeout(40), headers=BROWSER_HEADERS) as session:
+                async with session.post(URL, cookies=message_api.cookies, data=data, proxy=None) as response:
+                    response.raise_for_status()
+                    text = await response.text()
+                    # Успех — пустой ответ; ЛК часто отдаёт его как пробелы/перевод строки.
+                    if text.strip() == '':
+                        logging.info('Сообщение в ЛК успешно отправлено (adresat=%s)', recipient_id)
                         return True
-                    logging.error('Ошибка при отправке сообщения в ЛК, ответ сервера: %r', text)
-                    return False
+                    else:
+                        # Сервер иногда возвращает ошибку про link_url, но сообщение всё равно отправляется
+                        # Проверяем, является ли это только ошибкой про link_url
+                        if 'link_url' in text.lower() and 'undefined index' in text.lower():
+                            logging.warning('Сервер вернул предупреждение про link_url, но сообщение должно быть отправлено (adresat=%s)', recipient_id)
+                            return True
+                        logging.error('Ошибка при отправке сообщения в ЛК, ответ сервера: %r', text)
+                        return False
+    except LKUnavailableError as e:
+        logging.warning("Запрос в ЛК не выполнен: %s", e)
+        return False
     except Exception as e:
         logging.error(f'Ошибка при отправке сообщения в ЛК: {type(e).__name__} {e}', exc_info=True)
         return False
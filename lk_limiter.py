@@ -0,0 +1,259 @@
+"""Адаптивный (AIMD) ограничитель параллелизма запросов к lk.sut.ru.
+
+Фиксированный семафор с лимитом 1 сериализует логины, загрузку расписания и
+клики всех пользователей: в 9:00 при сотнях пользователей отметка уходит на
+минуты позже начала пары. Ограничитель ведёт «окно» как TCP:
+
+- чистый ответ с нормальной задержкой — окно растёт аддитивно (+1/окно за
+  запрос, т.е. примерно +1 за «круг» запросов);
+- 403 / ERR_MSG / таймаут — окно делится на LK_BACKOFF_FACTOR (не чаще раза
+  в cooldown: запросы, ушедшие при старом окне, сообщают о той же перегрузке);
+- медленный, но чистый ответ — окно не меняется.
+
+Интерфейс совместим с asyncio.Semaphore в том виде, как его использует бот:
+`async with get_lk_semaphore(): ...`. Сигнал перегрузки, который не является
+исключением (403, ERR_MSG), передаётся через note_overload() изнутри блока.
+
+Очередь за окном — по классам приоритета (PRIORITY_*): клики отметки, затем
+напоминания, интерактивные хэндлеры, фоновые логины/обновления. Класс задаёт
+вызывающий код через `with lk_priority(...)` (contextvar — доходит до
+get_raw_timetable/login без протаскивания параметра). От голодания защищает
+старение: каждые aging_sec ожидания поднимают запрос на один класс.
+
+TokenBucket — темп (а не параллелизм) для пачек логинов на старте бота.
+
+Модуль — лист графа зависимостей (только stdlib), его импортирует config.py.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+# Классы приоритета: меньше — важнее.
+PRIORITY_CLICK = 0
+PRIORITY_REMINDER = 1
+PRIORITY_INTERACTIVE = 2
+PRIORITY_BACKGROUND = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_CLICK: "click",
+    PRIORITY_REMINDER: "reminder",
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+}
+
+_current_priority = contextvars.ContextVar("lk_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def lk_priority(priority: int):
+    """Запросы к ЛК внутри блока встают в очередь с классом priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class AdaptiveLimiter:
+    """AIMD-окно параллелизма с приоритетными очередями ожидающих."""
+
+    def __init__(self, initial: int = 1, min_limit: int = 1, max_limit: int = 8,
+                 latency_target_sec: float = 3.0, backoff_factor: float = 0.5,
+                 cooldown_sec: Optional[float] = None, aging_sec: float = 5.0):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.window = float(min(max(int(initial), self.min_limit), self.max_limit))
+        self.latency_target_sec = latency_target_sec
+        self.backoff_factor = backoff_factor
+        self.cooldown_sec = latency_target_sec if cooldown_sec is None else cooldown_sec
+        self.aging_sec = aging_sec
+        self._in_flight = 0
+        # Очередь на класс: deque[(future, monotonic постановки)].
+        self._lanes = {priority: deque() for priority in PRIORITY_NAMES}
+        # Время ожидания слота по классам: [число, сумма, максимум].
+        self._wait_stats = {priority: [0, 0.0, 0.0] for priority in PRIORITY_NAMES}
+        # Захваченные слоты по задаче: task -> [monotonic старта, был ли сигнал перегрузки].
+        self._slots: dict = {}
+        self._last_backoff: Optional[float] = None
+        self._latency_ewma: Optional[float] = None
+        self.overloads = 0
+
+    # --- состояние ------------------------------------------------------------
+
+    @property
+    def limit(self) -> int:
+        """Текущее число одновременно разрешённых запросов."""
+        return max(self.min_limit, int(self.window))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for lane in self._lanes.values() for fut, _ts in lane if not fut.done())
+
+    def stats(self) -> dict:
+        """Снимок для логов/диагностики."""
+        waits = {}
+        for priority, (count, total, worst) in self._wait_stats.items():
+            waits[PRIORITY_NAMES[priority]] = {
+                "count": count,
+                "avg_wait_sec": round(total / count, 3) if count else 0.0,
+                "max_wait_sec": round(worst, 3),
+                "queued": sum(1 for fut, _ts in self._lanes[priority] if not fut.done()),
+            }
+        return {
+            "window": round(self.window, 2),
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "overloads": self.overloads,
+            "latency_ewma_sec": None if self._latency_ewma is None else round(self._latency_ewma, 3),
+            "waits": waits,
+        }
+
+    # --- захват / освобождение -----------------------------------------------
+
+    async def acquire(self, priority: Optional[int] = None) -> None:
+        if priority is None:
+            priority = _current_priority.get()
+        if priority not in self._lanes:
+            priority = PRIORITY_BACKGROUND
+        if self._in_flight < self.limit and not self.queue_depth:
+            self._in_flight += 1
+            self._record_wait(priority, 0.0)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        entry = (fut, time.monotonic())
+        self._lanes[priority].append(entry)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Слот уже выдан, но задачу отменили — возвращаем его.
+                self._in_flight -= 1
+                self._wake_waiters()
+            raise
+        finally:
+            try:
+                self._lanes[priority].remove(entry)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        self._wake_waiters()
+
+    def _next_lane(self, now: float) -> Optional[int]:
+        """Класс, чья голова очереди важнее всех с учётом старения."""
+        best, best_score = None, None
+        for priority, lane in self._lanes.items():
+            while lane and lane[0][0].done():
+                lane.popleft()
+            if not lane:
+                continue
+            waited = now - lane[0][1]
+            score = priority - (waited / self.aging_sec if self.aging_sec > 0 else 0.0)
+            if best_score is None or score < best_score:
+                best, best_score = priority, score
+        return best
+
+    def _wake_waiters(self) -> None:
+        while self._in_flight < self.limit:
+            now = time.monotonic()
+            priority = self._next_lane(now)
+            if priority is None:
+                return
+            fut, enqueued = self._lanes[priority].popleft()
+            self._in_flight += 1
+            fut.set_result(True)
+            self._record_wait(priority, now - enqueued)
+
+    def _record_wait(self, priority: int, waited: float) -> None:
+        stat = self._wait_stats[priority]
+        stat[0] += 1
+        stat[1] += waited
+        stat[2] = max(stat[2], waited)
+
+    async def __aenter__(self):
+        await self.acquire()
+        task = asyncio.current_task()
+        if task is not None:
+            self._slots[task] = [time.monotonic(), False]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        slot = self._slots.pop(asyncio.current_task(), None)
+        try:
+            if exc_type is not None and issubclass(exc_type, (asyncio.TimeoutError, TimeoutError)):
+                self.note_overload("timeout")
+            elif slot is not None and not slot[1] and exc_type is None:
+                self._on_success(time.monotonic() - slot[0])
+        finally:
+            self.release()
+        return False
+
+    # --- сигналы ----------------------------------------------------------------
+
+    def note_overload(self, reason: str = "") -> None:
+        """403 / ERR_MSG / таймаут: мультипликативно сужаем окно (не чаще cooldown)."""
+        slot = self._slots.get(asyncio.current_task())
+        if slot is not None:
+            slot[1] = True
+        self.overloads += 1
+        now = time.monotonic()
+        if self._last_backoff is not None and now - self._last_backoff < self.cooldown_sec:
+            return
+        self._last_backoff = now
+        old = self.window
+        self.window = max(float(self.min_limit), self.window * self.backoff_factor)
+        logging.warning(
+            "ЛК перегружен (%s): окно параллелизма %.2f -> %.2f, в очереди %s",
+            reason or "overload", old, self.window, self.queue_depth,
+        )
+
+    def _on_success(self, latency: float) -> None:
+        self._latency_ewma = latency if self._latency_ewma is None else (
+            0.8 * self._latency_ewma + 0.2 * latency
+        )
+        if latency > self.latency_target_sec or self.window >= self.max_limit:
+            return
+        old_limit = self.limit
+        self.window = min(float(self.max_limit), self.window + 1.0 / self.window)
+        if self.limit != old_limit:
+            logging.debug("Окно параллелизма ЛК расширено до %s (задержка %.2fs)", self.limit, latency)
+            self._wake_waiters()
+
+
+class TokenBucket:
+    """
+    Ведро токенов: в среднем rate операций в секунду, пачкой не больше burst.
+    Используется для темпа логинов в ЛК вместо фиксированных пауз между ними.
+    rate <= 0 — без ограничения.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = float(max(1, int(burst)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
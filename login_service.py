@@ -3,6 +3,7 @@
 Извлечён из main.py без изменения поведения. Содержит:
 - `parse_login_credentials` — парсинг команды `/login email password`;
 - `perform_login` — вход в ЛК и сохранение учётных данных в БД при успехе;
+- `restore_lk_session` — подъём сессии из сохранённых кук без логина;
 - `auto_login_user` — автоматическая авторизация пользователя из БД;
 - `auto_start_lesson` — автозапуск автокликалки при старте бота;
 - константы валидации логина (`LOGIN_CMD_RE`, `EMAIL_RE`, `MAX_EMAIL_LEN`,
@@ -24,7 +25,6 @@
 а также -> botcore, security, db (вниз по слоям). Модуль НЕ импортирует main
 на уровне модуля — цикла зависимостей нет.
 """
-import asyncio
 import logging
 import re
 
@@ -66,9 +66,40 @@ def parse_login_credentials(message_text: str) -> tuple[str, str] | None:
     return email, password
 
 
-async def auto_login_user(user_id):
+async def restore_lk_session(user_id) -> bool:
+    """
+    Поднимает сессию ЛК из сохранённых кук без логина. Живость проверяется одним
+    запросом raspisanie.php (он же прогревает кэш страницы для первого тика).
+    Полный логин нужен, только если ЛК ответил «сессия истекла» — тогда куки
+    удаляются. Если проверить не удалось (ЛК лежит, предохранитель открыт,
+    таймаут), сессия всё равно регистрируется: мёртвую заметит первый тик, а
+    массового перелогина на старте во время сбоя ЛК не будет.
+    """
+    api = lk_client.restore_api_from_cookies(user_id)
+    if api is None:
+        return False
+    try:
+        page = await api.get_timetable_page()
+    except Exception as e:
+        logging.warning("Не удалось проверить сохранённую сессию ЛК для %s: %s — проверит первый тик", user_id, e)
+    else:
+        if page.session_expired:
+            logging.info("Сохранённая сессия ЛК пользователя %s недействительна — нужен логин.", user_id)
+            await api.close()
+            lk_client.forget_cookies(user_id)
+            return False
+
+    await lk_client.set_api(user_id, api)
+    lesson_controller.controllers[user_id] = LessonController(api, bot, user_id)
+    logging.info("✅ Сессия ЛК пользователя %s восстановлена из сохранённых кук.", user_id)
+    return True
+
+
+async def auto_login_user(user_id, try_restore: bool = True):
     """
     Автоматически авторизует пользователя, если он есть в базе данных.
+    Сначала пробует сохранённую сессию (restore_lk_session), логинится заново
+    только если она мертва. try_restore=False — сразу полный логин.
     Возвращает True, если авторизация успешна, False в противном случае.
     """
     db.cursor.execute('SELECT email, password FROM users WHERE user_id = ?', (user_id,))
@@ -77,11 +108,14 @@ async def auto_login_user(user_id):
         logging.info(f"Пользователь {user_id} не найден в базе данных.")
         return False
 
+    if try_restore and await restore_lk_session(user_id):
+        return True
+
     email, password = result
     password = decrypt_password(password)
     logging.info(f"Попытка автоматической авторизации для пользователя {user_id} (email: {email})")
     try:
-        lk_client.apis[user_id] = lk_client.DebuggableBonchAPI()
+        await lk_client.set_api(user_id, lk_client.DebuggableBonchAPI())
         ok = await lk_client.apis[user_id].login(email, password)
         if not ok:
             raise ValueError("auto_login_failed")
@@ -94,8 +128,8 @@ async def auto_login_user(user_id):
         error_msg = str(e)
         logging.error(f"❌ Ошибка автоматической авторизации для пользователя {user_id} (email: {email}): {error_msg}", exc_info=True)
         # Удаляем частично созданные объекты при ошибке
-        if user_id in lk_client.apis:
-            del lk_client.apis[user_id]
+        await lk_client.drop_api(user_id)
+        lk_client.forget_cookies(user_id)
         if user_id in lesson_controller.controllers:
             del lesson_controller.controllers[user_id]
         return False
@@ -114,7 +148,7 @@ async def auto_start_lesson(user_id):
     if user_id in lesson_controller.controllers:  # Проверяем, есть ли контроллер для пользователя
         controller = lesson_controller.controllers[user_id]
         if not controller.is_running:  # Если автокликалка не запущена, запускаем её
-            controller.task = asyncio.create_task(controller.start_lesson())
+            await controller.start_lesson()
             logging.info(f"Автокликалка автоматически запущена для пользователя {user_id}.")
 
 
@@ -124,8 +158,9 @@ async def perform_login(user_id: int, email: str, password: str) -> bool:
         api = lk_client.DebuggableBonchAPI()
         ok = await api.login(email, password)
         if not ok:
+            await api.close()
             return False
-        lk_client.apis[user_id] = api
+        await lk_client.set_api(user_id, api)
         lesson_controller.controllers[user_id] = LessonController(api, bot, user_id)
         db.cursor.execute('SELECT user_id FROM users WHERE user_id = ?', (user_id,))
         existing = db.cursor.fetchone()
@@ -149,6 +184,7 @@ __all__ = [
     "MAX_EMAIL_LEN",
     "MAX_PASSWORD_LEN",
     "parse_login_credentials",
+    "restore_lk_session",
     "auto_login_user",
     "auto_start_lesson",
     "perform_login",
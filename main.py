@@ -1,4 +1,4 @@
-"""SatanBonchBot — точка входа.
+"""SatanBonchBot — оркестратор бота; процесс запускается тонким run.py.
 
 После декомпозиции (задача 4.1) main.py — тонкий оркестратор: импортирует
 модули-фасады (config / db / security / lk_client / handlers и т.д.),
@@ -10,6 +10,7 @@ import asyncio
 import logging
 import random
 from aiogram import Bot, Dispatcher
+from aiogram.filters import ExceptionTypeFilter
 from aiogram.types import BotCommand
 
 # Конфигурация извлечена в config.py (задача 4.1, шаг 1). main.py остаётся
@@ -104,6 +105,13 @@ from rendering import (
 import lk_client
 from lk_client import *
 from lk_client import _prune_debug_dumps
+# Предохранитель запросов к ЛК (lk_breaker.py): состояние — в debug-логе heartbeat.
+import lk_breaker
+# Память разборов raspisanie.php (parsers.page_memo): счётчики — в debug-логе
+# heartbeat; бэкенд разбора HTML выбирается на старте (parsers.set_html_parser).
+import parsers
+# Классы приоритета очереди к ЛК (lk_limiter.py): стартовый массовый логин — фон.
+from lk_limiter import lk_priority, PRIORITY_BACKGROUND, TokenBucket
 
 # Контроллер автоотметки занятий (LessonController) извлечён в
 # lesson_controller.py (задача 4.1, шаг 11). main.py остаётся фасадом —
@@ -114,6 +122,12 @@ from lk_client import _prune_debug_dumps
 # доступ), чтобы переприсваивания/мутации словаря были видны всем.
 import lesson_controller
 from lesson_controller import LessonController
+# Центральный планировщик тиков автоотметки (одна куча на всех пользователей).
+import lesson_scheduler
+# Пул процессов разбора расписаний групп (parse_pool.py): останавливается в on_shutdown.
+import parse_pool
+# Очередь переавторизаций и пауза автоотметки при массовом истечении сессий.
+import reauth_service
 
 # Сервис загрузки расписания всех групп извлечён в timetable_service.py
 # (задача 4.1, шаг 12b). main.py остаётся фасадом — реэкспортит публичные
@@ -158,6 +172,7 @@ from messages_service import (
 import login_service
 from login_service import (
     perform_login,
+    restore_lk_session,
     auto_login_user,
     auto_start_lesson,
     parse_login_credentials,
@@ -244,6 +259,8 @@ def register_routers(dispatcher: Dispatcher) -> None:
     dispatcher.include_router(messages.router)
     dispatcher.include_router(profile.router)
     dispatcher.include_router(common.router)
+    # Отказы предохранителя ЛК, не пойманные хэндлером, — готовый ответ пользователю.
+    dispatcher.errors.register(common.lk_unavailable_error, ExceptionTypeFilter(LKUnavailableError))
 
 
 async def set_bot_commands(bot: Bot):
@@ -258,29 +275,58 @@ async def set_bot_commands(bot: Bot):
 async def auto_login_all_users():
     """
     Автоматически авторизует всех пользователей в фоновом режиме.
+    LK_STARTUP_WORKERS воркеров разбирают очередь, упорядоченную по ближайшей
+    паре; каждый сразу запускает автокликалку своего пользователя. Полные
+    логины идут темпом ведра токенов, восстановление из кук — без пауз.
+    Прогресс и ETA — в логах и в STARTUP_STATUS_FILE (см. healthcheck.py).
     """
     logging.info("👥 Проверка пользователей в базе данных...")
-    db.cursor.execute('SELECT user_id FROM users')
-    users = db.cursor.fetchall()
-    logging.info(f"📊 Найдено пользователей: {len(users)}")
-    
-    for idx, user in enumerate(users):
-        user_id = user[0]
-        logging.info(f"🔐 Авторизация пользователя {user_id}...")
-        try:
-            success = await auto_login_user(user_id)
-            if success:
-                logging.info(f"✅ Пользователь {user_id} авторизован, запуск автокликалки...")
-                await auto_start_lesson(user_id)
-            else:
-                logging.warning(f"❌ Не удалось автоматически авторизовать пользователя {user_id} при старте бота.")
-        except Exception as e:
-            logging.error(f"❌ Ошибка при авторизации пользователя {user_id}: {e}", exc_info=True)
-        
-        # Стагерим логины, чтобы не получить бан/ERR_MSG на стороне ЛК
-        delay = LK_LOGIN_DELAY_SEC + random.random() * LK_LOGIN_JITTER_SEC
-        logging.debug("Пауза между логинами пользователей: %.2fs", delay)
-        await asyncio.sleep(delay)
+    user_ids = db.get_user_ids_by_next_lesson()
+    logging.info(f"📊 Найдено пользователей: {len(user_ids)}")
+
+    queue = asyncio.Queue()
+    for user_id in user_ids:
+        queue.put_nowait(user_id)
+    progress = StartupProgress(len(user_ids), status_file=STARTUP_STATUS_FILE)
+    progress.write_status()
+    login_bucket = TokenBucket(
+        rate=1.0 / LK_LOGIN_DELAY_SEC if LK_LOGIN_DELAY_SEC > 0 else 0,
+        burst=LK_LOGIN_BURST,
+    )
+
+    async def worker():
+        while True:
+            try:
+                user_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            restored = success = False
+            try:
+                # Массовый логин на старте — фон: не должен обгонять клики и хэндлеры.
+                # Сначала сохранённые куки (один запрос), полный логин — только если сессия мертва.
+                with lk_priority(PRIORITY_BACKGROUND):
+                    restored = await restore_lk_session(user_id)
+                    if not restored:
+                        # Темп логинов, чтобы не получить бан/ERR_MSG на стороне ЛК
+                        await login_bucket.acquire()
+                        await asyncio.sleep(random.random() * LK_LOGIN_JITTER_SEC)
+                        logging.info(f"🔐 Авторизация пользователя {user_id}...")
+                    success = restored or await auto_login_user(user_id, try_restore=False)
+                if success:
+                    logging.info(f"✅ Пользователь {user_id} авторизован, запуск автокликалки...")
+                    await auto_start_lesson(user_id)
+                else:
+                    logging.warning(f"❌ Не удалось автоматически авторизовать пользователя {user_id} при старте бота.")
+            except Exception as e:
+                logging.error(f"❌ Ошибка при авторизации пользователя {user_id}: {e}", exc_info=True)
+            progress.record(success, restored=restored)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(LK_STARTUP_WORKERS, len(user_ids)))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
 
 # preload_timetable извлечён в timetable_service.py (задача 4.1, шаг 12b) —
 # реэкспортируется выше; on_startup использует его как preload_timetable.
@@ -289,10 +335,28 @@ async def heartbeat_loop():
     """Периодически обновляет heartbeat-файл — для Docker healthcheck."""
     while True:
         _write_heartbeat(HEARTBEAT_FILE)
+        # Окно параллелизма и очередь к ЛК — видно, упирается ли бот в лимит.
+        logging.debug("Ограничитель запросов к ЛК: %s", get_lk_semaphore().stats())
+        logging.debug("Время до отметки: %s", monitoring.time_to_mark.snapshot())
+        logging.debug("Переавторизации: %s", reauth_service.coordinator.stats())
+        logging.debug("Предохранитель ЛК: %s", lk_breaker.get_breaker().stats())
+        logging.debug("Память разборов raspisanie.php: %s", parsers.page_memo.stats())
         await asyncio.sleep(HEARTBEAT_INTERVAL_SEC)
 
+async def lk_session_reaper_loop():
+    """Закрывает простаивающие keep-alive сессии ЛК (см. LK_SESSION_IDLE_SEC)."""
+    while True:
+        await asyncio.sleep(max(60.0, LK_SESSION_IDLE_SEC / 3))
+        try:
+            closed = await lk_client.close_idle_lk_sessions(LK_SESSION_IDLE_SEC)
+            if closed:
+                logging.debug("Закрыто простаивающих сессий ЛК: %s", closed)
+        except Exception:
+            logging.warning("Не удалось закрыть простаивающие сессии ЛК", exc_info=True)
+
 async def on_startup(dp):
     logging.info("🚀 Запуск бота...")
+    logging.info("Бэкенд разбора HTML: %s", parsers.set_html_parser(HTML_PARSER))
 
     # Подключаем доменные роутеры из пакета handlers/ (задача 4.1, шаг 12e).
     # common.router — последним из-за fallback_handler.
@@ -306,6 +370,7 @@ async def on_startup(dp):
     # Heartbeat для healthcheck: пишем сразу, дальше обновляем по таймеру.
     _write_heartbeat(HEARTBEAT_FILE)
     _background_tasks.append(asyncio.create_task(heartbeat_loop()))
+    _background_tasks.append(asyncio.create_task(lk_session_reaper_loop()))
 
     # Запускаем авторизацию пользователей в фоновом режиме
     logging.info("🔄 Запуск авторизации пользователей в фоновом режиме...")
@@ -321,31 +386,31 @@ async def on_shutdown():
     """Корректная остановка: гасим автокликалки и фоновые задачи."""
     logging.info("🛑 Остановка бота: завершаем фоновые задачи...")
 
-    # Сигналим автокликалкам остановиться и даём текущим LK-запросам доработать.
-    controller_tasks = []
+    # Сигналим автокликалкам остановиться и даём текущим тикам (LK-запросам)
+    # доработать; новые тики планировщик уже не раздаёт.
     for controller in list(lesson_controller.controllers.values()):
         controller.is_running = False
-        task = getattr(controller, "task", None)
-        if task and not task.done():
-            controller_tasks.append(task)
-    if controller_tasks:
-        _, still_running = await asyncio.wait(controller_tasks, timeout=15)
-        for task in still_running:
-            task.cancel()
+    await lesson_scheduler.scheduler.stop(timeout=15)
 
-    # Гасим остальные фоновые задачи (heartbeat, автологин, предзагрузка).
+    # Гасим остальные фоновые задачи (heartbeat, автологин, предзагрузка,
+    # очистка сессий ЛК).
     for task in _background_tasks:
         if not task.done():
             task.cancel()
 
-    leftovers = [t for t in (*controller_tasks, *_background_tasks) if not t.done()]
+    leftovers = [t for t in _background_tasks if not t.done()]
     if leftovers:
         try:
             await asyncio.wait(leftovers, timeout=10)
         except Exception:
             logging.warning("Не все фоновые задачи завершились вовремя", exc_info=True)
 
+    # Закрываем keep-alive сессии ЛК и общие пулы соединений (http_pool).
+    await lk_client.close_lk_sessions()
+    parse_pool.shutdown()
+
     HEARTBEAT_FILE.unlink(missing_ok=True)
+    STARTUP_STATUS_FILE.unlink(missing_ok=True)
     logging.info("🛑 Бот остановлен.")
 
 async def main():
@@ -360,5 +425,7 @@ async def main():
     finally:
         await on_shutdown()
 
+# Запуск — через run.py: при `python main.py` воркеры parse_pool (spawn)
+# переимпортируют весь этот модуль с aiogram и db.py.
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
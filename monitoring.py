@@ -11,9 +11,13 @@
 вызова (runtime, при сбое парсера) модуль main полностью загружен.
 """
 
+import json
 import logging
 import os
+import time as time_module
+from collections import deque
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Optional
 
 import pytz
@@ -96,3 +100,117 @@ async def _note_parser_failure(user_id) -> None:
         window_min = _parser_failure_monitor.window.total_seconds() / 60
         logging.warning("Всплеск сбоёв парсера ЛК: %s пользователей — шлю алерт админам", distinct)
         await _alert_admins_parser_broken(distinct, window_min)
+
+
+class StartupProgress:
+    """Прогресс автологина на старте: счётчики, ETA, периодический лог и
+    JSON-статус для healthcheck.py (STARTUP_STATUS_FILE)."""
+
+    def __init__(self, total: int, status_file: Optional[Path] = None,
+                 log_every_sec: float = 10.0):
+        self.total = total
+        self.status_file = status_file
+        self.log_every_sec = log_every_sec
+        self.done = 0
+        self.ok = 0
+        self.restored = 0
+        self.failed = 0
+        self._started = time_module.monotonic()
+        self._last_log: Optional[float] = None
+
+    def eta_seconds(self) -> Optional[float]:
+        """Оценка оставшегося времени по среднему темпу; None — пока нечего оценивать."""
+        if not self.done:
+            return None
+        elapsed = time_module.monotonic() - self._started
+        return elapsed / self.done * (self.total - self.done)
+
+    def snapshot(self) -> dict:
+        eta = self.eta_seconds()
+        return {
+            "total": self.total,
+            "done": self.done,
+            "ok": self.ok,
+            "restored": self.restored,
+            "failed": self.failed,
+            "elapsed_sec": round(time_module.monotonic() - self._started, 1),
+            "eta_sec": None if eta is None else round(eta, 1),
+            "finished": self.done >= self.total,
+            "updated_at": time_module.time(),
+        }
+
+    def record(self, ok: bool, restored: bool = False) -> None:
+        self.done += 1
+        if ok:
+            self.ok += 1
+            if restored:
+                self.restored += 1
+        else:
+            self.failed += 1
+        self.write_status()
+        now = time_module.monotonic()
+        if self.done >= self.total or self._last_log is None or now - self._last_log >= self.log_every_sec:
+            self._last_log = now
+            self.log()
+
+    def log(self) -> None:
+        eta = self.eta_seconds()
+        logging.info(
+            "🔐 Автологин: %s/%s (успешно %s, из кук %s, ошибок %s), ETA %s",
+            self.done, self.total, self.ok, self.restored, self.failed,
+            "—" if eta is None else f"{eta:.0f}s",
+        )
+
+    def write_status(self) -> None:
+        if self.status_file is None:
+            return
+        try:
+            tmp = self.status_file.with_name(self.status_file.name + ".tmp")
+            tmp.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+            tmp.replace(self.status_file)
+        except Exception:
+            logging.warning("Не удалось записать статус автологина %s", self.status_file, exc_info=True)
+
+
+class TimeToMarkStats:
+    """Время от начала пары до подтверждённой отметки: последние значения по
+    пользователям и перцентили по всем — чтобы подбирать LESSON_CLICK_SPREAD_SEC
+    (меньше всплеск к ЛК) против задержки отметки."""
+
+    def __init__(self, keep: int = 2000):
+        self._samples = deque(maxlen=keep)
+        self._attempts = deque(maxlen=keep)
+        # user_id -> (секунд до отметки, попыток клика)
+        self.last_by_user: dict = {}
+        self.missed = 0
+
+    def record(self, user_id, seconds: float, attempts: int) -> None:
+        self._samples.append(seconds)
+        self._attempts.append(attempts)
+        self.last_by_user[user_id] = (round(seconds, 1), attempts)
+
+    def record_missed(self, user_id) -> None:
+        """Отметка не получена к дедлайну."""
+        self.missed += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        count = len(self._samples)
+        return {
+            "count": count,
+            "p50_sec": self.percentile(50),
+            "p95_sec": self.percentile(95),
+            "max_sec": max(self._samples) if count else None,
+            "avg_attempts": round(sum(self._attempts) / count, 2) if count else None,
+            "missed_deadline": self.missed,
+        }
+
+
+# Единая метрика процесса; пишет lesson_controller, логирует heartbeat_loop.
+time_to_mark = TimeToMarkStats()
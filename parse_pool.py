@@ -0,0 +1,128 @@
+"""Пул процессов для разбора страниц расписания групп.
+
+При обновлении расписания всех групп (~тысяча страниц cabinet.sut.ru)
+parsers.parse_timetable_table выполнялся прямо в event loop: сотни разборов
+BeautifulSoup подряд на секунды замораживали polling Telegram, heartbeat и
+автоотметку. Теперь разбор уходит в ProcessPoolExecutor:
+
+- размер пула — квота CPU контейнера (cgroup v2 cpu.max, v1 cfs_quota_us),
+  иначе доступные процессу ядра; PARSE_POOL_WORKERS переопределяет, 0 —
+  разбор в event loop, как раньше;
+- процессы запускаются через spawn: fork процесса с живым event loop и
+  потоками aiogram небезопасен. Воркер импортирует parsers (bs4/lxml) и
+  заново — главный модуль процесса; поэтому бот запускается тонким run.py,
+  а не main.py, иначе каждый воркер поднимал бы aiogram и db.py;
+- из воркера возвращается компактный разбор (parsers.parse_timetable_pairs —
+  пары без раскрытия по неделям), здесь она становится
+  timetable_model.GroupTimetable — по неделям занятия не раскрываются вовсе;
+- если пул сломался (воркер убит OOM и т.п.), страница разбирается в event
+  loop, а пул пересоздаётся при следующем вызове.
+
+Сетевые запросы, разбор и бот при этом идут параллельно, а не по очереди.
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import parsers
+import timetable_model
+from config import PARSE_POOL_WORKERS
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def cpu_quota(cgroup_root: Path = CGROUP_ROOT) -> int:
+    """Сколько CPU доступно процессу с учётом квоты cgroup (минимум 1)."""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        available = os.cpu_count() or 1
+
+    quota = None
+    try:
+        # cgroup v2: "<квота> <период>" или "max <период>".
+        value, period = (cgroup_root / "cpu.max").read_text().split()[:2]
+        if value != "max":
+            quota = int(value) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: квота -1 — без ограничения.
+            value = int((cgroup_root / "cpu" / "cpu.cfs_quota_us").read_text())
+            period = int((cgroup_root / "cpu" / "cpu.cfs_period_us").read_text())
+            if value > 0 and period > 0:
+                quota = value / period
+        except (OSError, ValueError):
+            pass
+
+    if quota is not None:
+        available = min(available, math.ceil(quota))
+    return max(1, available)
+
+
+def pool_size() -> int:
+    """Размер пула: PARSE_POOL_WORKERS или квота CPU; 0 — пул выключен."""
+    if PARSE_POOL_WORKERS is not None:
+        return PARSE_POOL_WORKERS
+    return cpu_quota()
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if _executor is None:
+        workers = pool_size()
+        if workers <= 0:
+            return None
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=parsers.set_html_parser,
+            initargs=(parsers.get_html_parser(),),
+        )
+        logging.info("Пул разбора расписаний: %s процесс(ов)", workers)
+    return _executor
+
+
+async def parse_timetable_table(html: str, group_name: str, first_day: datetime):
+    """
+    То же, что parsers.parse_timetable_table, но разбор HTML — в пуле
+    процессов, а результат — компактный GroupTimetable (как список занятий
+    он раскрывается в те же dict).
+    """
+    global _executor
+    executor = _get_executor()
+    if executor is None:
+        return _compact(parsers.parse_timetable_pairs(html), group_name, first_day)
+    try:
+        pairs = await asyncio.get_running_loop().run_in_executor(
+            executor, parsers.parse_timetable_pairs, html
+        )
+    except BrokenProcessPool:
+        logging.warning("Пул разбора расписаний сломан — пересоздаём, страница разбирается в event loop")
+        if _executor is executor:
+            _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        pairs = parsers.parse_timetable_pairs(html)
+    return _compact(pairs, group_name, first_day)
+
+
+def _compact(pairs, group_name: str, first_day: datetime):
+    if isinstance(pairs, str):
+        return pairs
+    return timetable_model.GroupTimetable.from_pairs(pairs, group_name, first_day)
+
+
+def shutdown() -> None:
+    """Останавливает пул (graceful shutdown); незапущенные разборы отменяются."""
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
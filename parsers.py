@@ -3,16 +3,21 @@
 Сюда вынесена логика разбора ответов сайта, отделённая от сетевого кода.
 Модуль НЕ делает сетевых запросов и не имеет импорт-тайм side-effects,
 поэтому его легко покрыть юнит-тестами (см. tests/). Зависит только от
-bs4 и стандартной библиотеки.
+bs4 и стандартной библиотеки; lxml — опционально, как быстрый бэкенд
+BeautifulSoup (см. set_html_parser).
 
 Польза: при изменении вёрстки сайта тесты падают явно, а не «0 групп без
 ошибки».
 """
 from __future__ import annotations
 
+import hashlib
 import logging
 import re
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from html import unescape as _unescape_html
 
 from bs4 import BeautifulSoup
 
@@ -21,6 +26,55 @@ DAYS_OF_WEEK = ['Понедельник', 'Вторник', 'Среда', 'Че
 DAYS_OF_WEEK_STR_TO_INT = {day: index for index, day in enumerate(DAYS_OF_WEEK)}
 
 
+# --- Бэкенд HTML-парсера ------------------------------------------------------
+# Все разборы ниже строят soup через make_soup(). lxml (C) разбирает страницы
+# в разы быстрее чистого Python html.parser — заметно на обновлении расписания
+# всех групп (~тысяча страниц). Выбор — HTML_PARSER в config (main вызывает
+# set_html_parser на старте); без lxml — откат на html.parser. Равенство
+# результатов обоих бэкендов проверяет tests/test_parser_backends.py.
+
+HTML_PARSER_BACKENDS = ("lxml", "html.parser")
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_html_parser = "lxml" if _lxml_available() else "html.parser"
+
+
+def set_html_parser(name: str = "auto") -> str:
+    """
+    Выбирает бэкенд: 'auto' (lxml, если установлен), 'lxml' или 'html.parser'.
+    Недоступный lxml — предупреждение и html.parser. Возвращает выбранный бэкенд.
+    """
+    global _html_parser
+    name = (name or "auto").strip().lower()
+    if name not in ("auto",) + HTML_PARSER_BACKENDS:
+        logging.warning("Неизвестный HTML_PARSER=%r — выбираем автоматически", name)
+        name = "auto"
+    if name in ("auto", "lxml") and _lxml_available():
+        _html_parser = "lxml"
+    else:
+        if name == "lxml":
+            logging.warning("HTML_PARSER=lxml, но lxml не установлен — используем html.parser")
+        _html_parser = "html.parser"
+    return _html_parser
+
+
+def get_html_parser() -> str:
+    return _html_parser
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    """BeautifulSoup выбранным бэкендом (см. set_html_parser)."""
+    return BeautifulSoup(html or "", _html_parser)
+
+
 # --- cabinet.sut.ru: списки факультетов / групп ------------------------------
 
 def parse_id_name_pairs(text: str) -> dict:
@@ -38,6 +92,233 @@ def parse_id_name_pairs(text: str) -> dict:
 
 
 # --- lk.sut.ru raspisanie.php: номер недели и week_param ---------------------
+# Каждое поле страницы извлекается хелпером над уже построенным soup: публичные
+# функции ниже строят soup под одно поле, а parse_lk_timetable_page — один раз
+# под все поля сразу (см. LKTimetablePage). week_param и id кнопок сначала
+# ищутся быстрым путём без дерева (см. _start_lesson_ids_fast).
+
+# Короткий ответ ЛК вместо страницы при протухшей сессии.
+LK_ERR_MSG = "У Вас нет прав доступа. Или необходимо перезагрузить приложение.."
+
+
+def _week_number_from_soup(soup) -> int:
+    """Номер недели из заголовка h3/h2 либо из текста страницы; 0 — не найден."""
+    # 1) Быстрый путь: h3/h2, как было раньше.
+    header = soup.find(["h3", "h2"])
+    if header:
+        header_text = header.get_text(" ", strip=True)
+        m = re.search(r"№\s*(\d+)", header_text)
+        if m:
+            return int(m.group(1))
+
+    # 2) Fallback: ищем "Неделя №X" по всему тексту страницы.
+    page_text = soup.get_text(" ", strip=True)
+    m = re.search(r"(Недел[яи]|Week)\s*№?\s*(\d+)", page_text, flags=re.IGNORECASE)
+    if m:
+        return int(m.group(2))
+    return 0
+
+
+def _week_param_from_soup(soup, html: str) -> int:
+    """week_param из showweek(...)/open_zan(...) ссылок, затем regex по сырому html."""
+    # 1) Самый надежный способ: ссылка showweek(...) текущей недели обычно выделена <b>...</b>
+    for a in soup.find_all("a"):
+        onclick = a.get("onclick", "") or ""
+        if not isinstance(onclick, str):
+            continue
+        m = re.search(r"showweek\(\s*(\d+)\s*\)", onclick)
+        if m and a.find("b"):
+            return int(m.group(1))
+
+    # 2) Fallback: берем week_param из любой кнопки "Начать занятие" open_zan(rasp, week)
+    for a in soup.find_all("a"):
+        onclick = a.get("onclick", "") or ""
+        if not isinstance(onclick, str):
+            continue
+        m = re.search(r"open_zan\(\s*\d+\s*,\s*(\d+)\s*\)", onclick)
+        if m:
+            return int(m.group(1))
+
+    # 3) Fallback regex по сырому html
+    m = re.search(r"showweek\(\s*(\d+)\s*\)[^<]*&nbsp;?<b>", html)
+    if m:
+        return int(m.group(1))
+
+    m = re.search(r"open_zan\(\s*\d+\s*,\s*(\d+)\s*\)", html)
+    if m:
+        return int(m.group(1))
+
+    return 0
+
+
+def _start_lesson_ids_from_soup(soup) -> tuple:
+    """rasp-id ссылок «Начать занятие» с onclick=open_zan(<rasp>, <week_param>)."""
+    ids: list = []
+    for a in soup.find_all("a"):
+        onclick = a.get("onclick", "") or ""
+        if not isinstance(onclick, str):
+            continue
+        # На странице встречаются и "Кнопка появится... Обновить." (update_zan), и нужная нам open_zan
+        m = re.search(r"open_zan\(\s*(\d+)\s*,\s*\d+\s*\)", onclick)
+        if not m:
+            continue
+        # Дополнительно фильтруем по тексту, чтобы не схватить что-то случайное
+        text = a.get_text(" ", strip=True)
+        if text and "Начать занятие" in text:
+            ids.append(m.group(1))
+    return _dedupe_preserving_order(ids)
+
+
+def _knop_ids_from_soup(soup) -> tuple:
+    """lesson_id из элементов с id вида 'knopXXXX'."""
+    ids = []
+    for tag in soup.find_all(True):
+        _id = tag.get("id", "")
+        if isinstance(_id, str) and _id.startswith("knop") and len(_id) > 4:
+            ids.append(_id[4:])
+    return _dedupe_preserving_order(ids)
+
+
+# --- Быстрый путь: open_zan/showweek без построения дерева --------------------
+# Для клика нужны только onclick ссылок, их текст и заголовок недели. Регулярки идут по HTML
+# потоком тегов <a> (как токенизатор, но без дерева) — на порядок дешевле
+# BeautifulSoup(html.parser). Семантика та же, что у *_from_soup: текст ссылки
+# склеивается как get_text(" ", strip=True), <b> — потомок ссылки. Если
+# разметка есть, а быстрый путь ничего не нашёл, он возвращает None —
+# вызывающий проверяет страницу через DOM (tests/test_parsers.py сверяет оба).
+
+_A_TAG_RE = re.compile(
+    r"""<a\b((?:[^>"']|"[^"]*"|'[^']*')*)>(.*?)</a\s*>""", re.IGNORECASE | re.DOTALL
+)
+_ONCLICK_ATTR_RE = re.compile(
+    r"""(?:^|\s)onclick\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))""", re.IGNORECASE
+)
+_TAG_RE = re.compile(r"<[^>]*>")
+_B_TAG_RE = re.compile(r"<b(?:\s[^>]*)?/?>", re.IGNORECASE)
+_OPEN_ZAN_RE = re.compile(r"open_zan\(\s*(\d+)\s*,\s*(\d+)\s*\)")
+_SHOWWEEK_RE = re.compile(r"showweek\(\s*(\d+)\s*\)")
+
+
+def _onclick_links(html: str) -> list:
+    """[(onclick, внутренний html)] ссылок <a> с атрибутом onclick."""
+    links = []
+    for m in _A_TAG_RE.finditer(html):
+        attr = _ONCLICK_ATTR_RE.search(m.group(1))
+        if attr:
+            value = next(group for group in attr.groups() if group is not None)
+            links.append((_unescape_html(value), m.group(2)))
+    return links
+
+
+def _link_text(inner_html: str) -> str:
+    """Текст ссылки как у bs4 get_text(" ", strip=True)."""
+    parts = (_unescape_html(part).strip() for part in _TAG_RE.split(inner_html))
+    return " ".join(part for part in parts if part)
+
+
+def _start_lesson_ids_fast(html: str) -> tuple | None:
+    """rasp-id кнопок «Начать занятие» без DOM; None — нужна проверка через DOM."""
+    if "open_zan" not in html:
+        return tuple()
+    ids = []
+    for onclick, inner in _onclick_links(html):
+        m = _OPEN_ZAN_RE.search(onclick)
+        if m and "Начать занятие" in _link_text(inner):
+            ids.append(m.group(1))
+    return _dedupe_preserving_order(ids) or None
+
+
+def _week_param_fast(html: str) -> int | None:
+    """week_param в том же порядке, что _week_param_from_soup; None — нужна проверка через DOM."""
+    if "showweek" not in html and "open_zan" not in html:
+        return 0
+    links = _onclick_links(html)
+    for onclick, inner in links:
+        m = _SHOWWEEK_RE.search(onclick)
+        if m and _B_TAG_RE.search(inner):
+            return int(m.group(1))
+    for onclick, _inner in links:
+        m = _OPEN_ZAN_RE.search(onclick)
+        if m:
+            return int(m.group(2))
+    return None
+
+
+_HEADER_RE = re.compile(r"<(h[23])\b[^>]*>(.*?)</\1\s*>", re.IGNORECASE | re.DOTALL)
+
+
+def _week_number_fast(html: str) -> int | None:
+    """Номер недели из первого h3/h2 без DOM; None — нужна проверка через DOM."""
+    m = _HEADER_RE.search(html)
+    if m:
+        number = re.search(r"№\s*(\d+)", _link_text(m.group(2)))
+        if number:
+            return int(number.group(1))
+    return None
+
+
+def _day_rows_from_soup(soup) -> dict:
+    """
+    Строки занятий таблицы simple-little-table по датам: {'DD.MM.YYYY': [row, ...]}.
+    row — dict pair_number/subject/room/teacher/rasp/week_param; rasp и
+    week_param — из кнопки «Начать занятие» (None, если её ещё нет).
+    """
+    days: dict = {}
+    table = soup.find("table", class_="simple-little-table")
+    tbody = table.find("tbody") if table else None
+    if not tbody:
+        return days
+
+    current_day = None
+    for tr in tbody.find_all("tr"):
+        tds = tr.find_all("td")
+        if not tds:
+            continue
+
+        # Заголовок дня: td[colspan=6] + <b>День</b> + <small><br/>DD.MM.YYYY</small>
+        if len(tds) == 1 and tds[0].has_attr("colspan") and "6" in str(tds[0].get("colspan")):
+            day_text = tds[0].get_text(" ", strip=True)
+            m = re.search(r"(\d{2}\.\d{2}\.\d{4})", day_text)
+            current_day = m.group(1) if m else None
+            continue
+
+        # В примере: [0]=пара, [1]=предмет, [2]=пусто/тип, [3]=кабинет, [4]=преподаватель, [5]=ссылки + кнопка
+        if current_day is None or len(tds) < 6:
+            continue
+
+        pair_cell_text = tds[0].get_text(" ", strip=True)
+        # Пример: "3 (13:00-14:35)"
+        m_pair = re.search(r"(\d+)\s*\(", pair_cell_text)
+        if not m_pair:
+            continue
+
+        # Ищем "Начать занятие" (open_zan) внутри последней ячейки.
+        # Для напоминаний кнопки может ещё НЕ быть (препод/время) — строку
+        # всё равно сохраняем, rasp/week_param остаются None.
+        rasp = None
+        week_param = None
+        for a in tds[-1].find_all("a"):
+            onclick = a.get("onclick", "") or ""
+            if "Начать занятие" in a.get_text(" ", strip=True) and "open_zan" in onclick:
+                m_onclick = re.search(r"open_zan\(\s*(\d+)\s*,\s*(\d+)\s*\)", onclick)
+                if m_onclick:
+                    rasp = m_onclick.group(1)
+                    week_param = m_onclick.group(2)
+                break
+
+        b_tag = tds[1].find("b")
+        subject = b_tag.get_text(" ", strip=True) if b_tag else tds[1].get_text(" ", strip=True)
+
+        days.setdefault(current_day, []).append({
+            "pair_number": int(m_pair.group(1)),
+            "subject": subject,
+            "room": tds[3].get_text(" ", strip=True),
+            "teacher": tds[4].get_text(" ", strip=True),
+            "rasp": rasp,
+            "week_param": week_param,
+        })
+    return days
+
 
 def parse_week_number(html: str) -> int:
     """
@@ -49,25 +330,12 @@ def parse_week_number(html: str) -> int:
         return 0
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
-
-        # 1) Быстрый путь: h3/h2, как было раньше.
-        header = soup.find(["h3", "h2"])
-        if header:
-            header_text = header.get_text(" ", strip=True)
-            m = re.search(r"№\s*(\d+)", header_text)
-            if m:
-                return int(m.group(1))
-
-        # 2) Fallback: ищем "Неделя №X" по всему тексту страницы.
-        page_text = soup.get_text(" ", strip=True)
-        m = re.search(r"(Недел[яи]|Week)\s*№?\s*(\d+)", page_text, flags=re.IGNORECASE)
-        if m:
-            return int(m.group(2))
-
-        # 3) Не нашли — оставляем 0, но логируем контекст.
-        logging.warning("Не найден номер недели в расписании (нет h3/h2/паттерна 'Неделя №'), используем неделю 0")
-        return 0
+        week_number = _week_number_fast(html)
+        if week_number is None:
+            week_number = _week_number_from_soup(make_soup(html))
+        if not week_number:
+            logging.warning("Не найден номер недели в расписании (нет h3/h2/паттерна 'Неделя №'), используем неделю 0")
+        return week_number
     except Exception as e:
         logging.error("Ошибка при разборе номера недели: %s", e, exc_info=True)
         return 0
@@ -82,36 +350,10 @@ def parse_week_param(html: str) -> int:
         return 0
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
-
-        # 1) Самый надежный способ: ссылка showweek(...) текущей недели обычно выделена <b>...</b>
-        for a in soup.find_all("a"):
-            onclick = a.get("onclick", "") or ""
-            if not isinstance(onclick, str):
-                continue
-            m = re.search(r"showweek\(\s*(\d+)\s*\)", onclick)
-            if m and a.find("b"):
-                return int(m.group(1))
-
-        # 2) Fallback: берем week_param из любой кнопки "Начать занятие" open_zan(rasp, week)
-        for a in soup.find_all("a"):
-            onclick = a.get("onclick", "") or ""
-            if not isinstance(onclick, str):
-                continue
-            m = re.search(r"open_zan\(\s*\d+\s*,\s*(\d+)\s*\)", onclick)
-            if m:
-                return int(m.group(1))
-
-        # 3) Fallback regex по сырому html
-        m = re.search(r"showweek\(\s*(\d+)\s*\)[^<]*&nbsp;?<b>", html)
-        if m:
-            return int(m.group(1))
-
-        m = re.search(r"open_zan\(\s*\d+\s*,\s*(\d+)\s*\)", html)
-        if m:
-            return int(m.group(1))
-
-        return 0
+        week_param = _week_param_fast(html)
+        if week_param is not None:
+            return week_param
+        return _week_param_from_soup(make_soup(html), html)
     except Exception:
         logging.warning("Не удалось извлечь week_param из HTML, используем 0", exc_info=True)
         return 0
@@ -126,22 +368,10 @@ def extract_start_lesson_ids(html: str) -> tuple:
         return tuple()
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
-        ids: list = []
-        for a in soup.find_all("a"):
-            onclick = a.get("onclick", "") or ""
-            if not isinstance(onclick, str):
-                continue
-            # На странице встречаются и "Кнопка появится... Обновить." (update_zan), и нужная нам open_zan
-            m = re.search(r"open_zan\(\s*(\d+)\s*,\s*\d+\s*\)", onclick)
-            if not m:
-                continue
-            # Дополнительно фильтруем по тексту, чтобы не схватить что-то случайное
-            text = a.get_text(" ", strip=True)
-            if text and "Начать занятие" in text:
-                ids.append(m.group(1))
-
-        return _dedupe_preserving_order(ids)
+        ids = _start_lesson_ids_fast(html)
+        if ids is not None:
+            return ids
+        return _start_lesson_ids_from_soup(make_soup(html))
     except Exception:
         return tuple()
 
@@ -152,17 +382,215 @@ def extract_lesson_ids_fallback(html: str) -> tuple:
     На lk.sut.ru часто используются элементы с id вида 'knopXXXX'.
     """
     try:
-        soup = BeautifulSoup(html or "", "html.parser")
-        ids = []
-        for tag in soup.find_all(True):
-            _id = tag.get("id", "")
-            if isinstance(_id, str) and _id.startswith("knop") and len(_id) > 4:
-                ids.append(_id[4:])
-        return _dedupe_preserving_order(ids)
+        return _knop_ids_from_soup(make_soup(html))
     except Exception:
         return tuple()
 
 
+class LKTimetablePage:
+    """
+    Страница raspisanie.php, разобранная один раз.
+
+    Один объект обслуживает и клик «Начать занятие», и напоминания, и статус:
+    раньше каждое поле (неделя, week_param, id кнопок, строки дня) строило
+    свой soup на одном и том же HTML. Поля клика (week_number, week_param,
+    start_lesson_ids) берутся быстрым путём по тегам <a>/<h3>; DOM строится
+    один раз и только при обращении к knop_ids/days или если быстрый путь не
+    решил (см. _fill_timetable_page).
+    """
+
+    def __init__(self, html: str = ""):
+        self.html = html or ""
+        self.week_param = 0
+        self.start_lesson_ids = tuple()
+        # Флаги ошибок ЛК: протухшая сессия / у аккаунта не определена группа.
+        self.session_expired = "login=no" in self.html or self.html.strip() == LK_ERR_MSG
+        self.group_undefined = "Ваша группа не определена" in self.html
+        # Ленивые поля: {имя: значение}; пока страница не разобрана
+        # (_fill_timetable_page), они остаются пустыми.
+        self._lazy: dict = {"week_number": 0, "knop_ids": tuple(), "days": {}}
+        self._pending: set = set()
+        self._soup = None
+
+    @property
+    def week_number(self) -> int:
+        return self._lazy_field("week_number")
+
+    @property
+    def knop_ids(self) -> tuple:
+        """lesson_id из элементов knopXXXX (запасной вариант для клика)."""
+        return self._lazy_field("knop_ids")
+
+    @property
+    def days(self) -> dict:
+        """Строки занятий по датам (см. _day_rows_from_soup)."""
+        return self._lazy_field("days")
+
+    def _lazy_field(self, attr: str):
+        """Значение ленивого поля; считается при первом обращении."""
+        if attr in self._pending:
+            self._pending.discard(attr)
+            try:
+                self._lazy[attr] = _LAZY_PAGE_FIELDS[attr](self)
+            except Exception:
+                logging.warning("Ошибка разбора поля %s страницы расписания", attr, exc_info=True)
+            if not self._pending:
+                self._soup = None  # все поля посчитаны — дерево больше не держим
+        return self._lazy[attr]
+
+    def soup(self):
+        """DOM страницы: строится при первом обращении, один раз на страницу."""
+        if self._soup is None:
+            self._soup = make_soup(self.html)
+        return self._soup
+
+    @property
+    def lesson_ids(self) -> tuple:
+        """id для клика: кнопки open_zan, иначе запасные knopXXXX."""
+        return self.start_lesson_ids or self.knop_ids
+
+    def next_lesson_start(self, now: datetime, intervals) -> datetime | None:
+        """
+        Начало ближайшей ещё не закончившейся пары на странице (в tz из now).
+        intervals — сетка пар [(начало, конец), ...], пара N — intervals[N-1].
+        """
+        best = None
+        for date_str, rows in self.days.items():
+            try:
+                day = datetime.strptime(date_str, "%d.%m.%Y").date()
+            except ValueError:
+                continue
+            for row in rows:
+                index = row["pair_number"] - 1
+                if not 0 <= index < len(intervals):
+                    continue
+                start_time, end_time = intervals[index]
+                if datetime.combine(day, end_time, tzinfo=now.tzinfo) < now:
+                    continue
+                start_dt = datetime.combine(day, start_time, tzinfo=now.tzinfo)
+                if best is None or start_dt < best:
+                    best = start_dt
+        return best
+
+    def lesson_details(self, date_str: str, pair_number: int):
+        """
+        Строка пары pair_number (1..7) на дату 'DD.MM.YYYY' или None.
+        Кнопки «Начать занятие» может ещё не быть — тогда rasp/week_param = None.
+        """
+        for row in self.days.get(date_str, ()):
+            if row["pair_number"] == int(pair_number):
+                return dict(row)
+        return None
+
+
+class PageParseMemo:
+    """
+    LRU разобранных страниц raspisanie.php по хэшу тела (blake2b, 128 бит).
+
+    ЛК минута за минутой отдаёт один и тот же HTML; при совпадении тела
+    BeautifulSoup не запускается вовсе — возвращается готовый LKTimetablePage.
+    Страницы из памяти общие для всех вызывающих: их читают, но не меняют.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max(1, int(max_entries))
+        # digest -> (страница, сколько секунд занял её разбор)
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.saved_sec = 0.0
+
+    @staticmethod
+    def key(html: str) -> bytes:
+        return hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get(self, key: bytes) -> LKTimetablePage | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved_sec += entry[1]
+        return entry[0]
+
+    def put(self, key: bytes, page: LKTimetablePage, parse_sec: float) -> None:
+        self._entries[key] = (page, parse_sec)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "saved_ms": round(self.saved_sec * 1000, 1),
+        }
+
+
+# Общая память разборов процесса. Доступ — parsers.page_memo.
+page_memo = PageParseMemo()
+
+
+def parse_lk_timetable_page(html: str) -> LKTimetablePage:
+    """
+    Разбирает raspisanie.php в LKTimetablePage одним парсом.
+    Ошибки разбора не пробрасываются: поля остаются пустыми, как у
+    parse_week_number/parse_week_param и extract_* при сбое.
+
+    Повторный HTML с тем же телом берётся из page_memo без разбора.
+    """
+    page = LKTimetablePage(html)
+    if not page.html or page.session_expired:
+        return page
+
+    key = page_memo.key(page.html)
+    cached = page_memo.get(key)
+    if cached is not None:
+        return cached
+    started = time.perf_counter()
+    _fill_timetable_page(page)
+    page_memo.put(key, page, time.perf_counter() - started)
+    return page
+
+
+def _fast_or_dom(fast_result, dom_extract, *args):
+    """Результат быстрого пути, а если он не решил (None) — разбор по DOM."""
+    return dom_extract(*args) if fast_result is None else fast_result
+
+
+def _fill_timetable_page(page: LKTimetablePage) -> None:
+    """
+    Заполняет поля клика быстрым путём; DOM строится, только если быстрый
+    путь не решил. knop_ids/days (и week_number без «№» в заголовке) считаются
+    при первом обращении.
+    """
+    page._pending.update(page._lazy)
+    for attr, fast, dom_extract in (
+        ("week_param", _week_param_fast, lambda: _week_param_from_soup(page.soup(), page.html)),
+        ("start_lesson_ids", _start_lesson_ids_fast, lambda: _start_lesson_ids_from_soup(page.soup())),
+    ):
+        try:
+            setattr(page, attr, _fast_or_dom(fast(page.html), dom_extract))
+        except Exception:
+            logging.warning("Ошибка разбора поля %s страницы расписания", attr, exc_info=True)
+
+
+_LAZY_PAGE_FIELDS = {
+    "week_number": lambda page: _fast_or_dom(
+        _week_number_fast(page.html), lambda: _week_number_from_soup(page.soup())
+    ),
+    "knop_ids": lambda page: _knop_ids_from_soup(page.soup()),
+    "days": lambda page: _day_rows_from_soup(page.soup()),
+}
+
+
 def _dedupe_preserving_order(items) -> tuple:
     """Убирает дубликаты, сохраняя порядок первого вхождения."""
     seen = set()
@@ -176,6 +604,9 @@ def _dedupe_preserving_order(items) -> tuple:
 
 # --- cabinet.sut.ru raspisanie_all_new: таблица расписания группы ------------
 
+TIMETABLE_NOT_FOUND = 'Расписание не найдено'
+
+
 def parse_timetable_table(html: str, group_name: str, first_day: datetime):
     """
     Разбирает HTML расписания группы (таблица class="simple-little-table").
@@ -186,12 +617,26 @@ def parse_timetable_table(html: str, group_name: str, first_day: datetime):
     first_day — дата начала первой недели (datetime); нужна для вычисления
     календарной даты каждого занятия.
     """
-    soup = BeautifulSoup(html or "", 'html.parser')
+    pairs = parse_timetable_pairs(html)
+    if isinstance(pairs, str):
+        return pairs
+    return expand_timetable_pairs(pairs, group_name, first_day)
+
+
+def parse_timetable_pairs(html: str):
+    """
+    Разбор таблицы группы в компактном виде — без раскрытия по неделям:
+    список кортежей (номер занятия, время, индекс дня, предмет, тип,
+    преподаватель, кабинет, (недели...)) в порядке страницы, либо
+    'Расписание не найдено'. Дёшево передаётся между процессами (parse_pool);
+    список занятий собирает expand_timetable_pairs.
+    """
+    soup = make_soup(html)
     table = soup.find('table', class_='simple-little-table')
     if not table:
-        return 'Расписание не найдено'
+        return TIMETABLE_NOT_FOUND
 
-    timetable_data = []
+    pairs = []
     tbody = table.find('tbody')
     rows = tbody.find_all('tr') if tbody else []
 
@@ -217,9 +662,6 @@ def parse_timetable_table(html: str, group_name: str, first_day: datetime):
             if day_index >= len(DAYS_OF_WEEK):
                 continue
 
-            day_name = DAYS_OF_WEEK[day_index]
-            day_of_week_int = DAYS_OF_WEEK_STR_TO_INT[day_name]
-
             for pair_div in pair_divs:
                 subject_element = pair_div.find('span', class_='subect')
                 subject = subject_element.strong.text.strip() if subject_element and subject_element.strong else None
@@ -239,29 +681,43 @@ def parse_timetable_table(html: str, group_name: str, first_day: datetime):
                     if weeks_element else None
                 )
 
-                weeks_list = []
+                weeks = []
                 if week_number_str:
-                    weeks_list = [w.strip() for w in week_number_str.split(',') if w.strip()]
-
-                for week_str in weeks_list:
-                    try:
-                        week_number = int(week_str)
-                    except (ValueError, TypeError):
-                        continue
-                    lesson_date = first_day + timedelta(days=week_number * 7 + day_of_week_int)
-                    timetable_data.append({
-                        'Группа': group_name,
-                        'Число': lesson_date.strftime('%Y.%m.%d'),
-                        'День недели': day_name,
-                        'Номер недели': week_number,
-                        'Номер дня недели': day_of_week_int,
-                        'Номер занятия': lesson_number,
-                        'Время занятия': lesson_time,
-                        'Предмет': subject,
-                        'Тип занятия': lesson_type,
-                        'ФИО преподавателя': teacher,
-                        'Номер кабинета': room,
-                    })
+                    for week_str in week_number_str.split(','):
+                        try:
+                            weeks.append(int(week_str.strip()))
+                        except (ValueError, TypeError):
+                            continue
+
+                pairs.append((
+                    lesson_number, lesson_time, day_index,
+                    subject, lesson_type, teacher, room, tuple(weeks),
+                ))
+
+    return pairs
+
+
+def expand_timetable_pairs(pairs, group_name: str, first_day: datetime) -> list:
+    """Компактный разбор (parse_timetable_pairs) -> отсортированный список занятий."""
+    timetable_data = []
+    for lesson_number, lesson_time, day_index, subject, lesson_type, teacher, room, weeks in pairs:
+        day_name = DAYS_OF_WEEK[day_index]
+        day_of_week_int = DAYS_OF_WEEK_STR_TO_INT[day_name]
+        for week_number in weeks:
+            lesson_date = first_day + timedelta(days=week_number * 7 + day_of_week_int)
+            timetable_data.append({
+                'Группа': group_name,
+                'Число': lesson_date.strftime('%Y.%m.%d'),
+                'День недели': day_name,
+                'Номер недели': week_number,
+                'Номер дня недели': day_of_week_int,
+                'Номер занятия': lesson_number,
+                'Время занятия': lesson_time,
+                'Предмет': subject,
+                'Тип занятия': lesson_type,
+                'ФИО преподавателя': teacher,
+                'Номер кабинета': room,
+            })
 
     return sorted(timetable_data, key=lambda x: (x['Номер недели'], x['Номер дня недели']))
 
@@ -273,7 +729,7 @@ def parse_message_rows(page_html: str) -> list:
     Разбирает одну страницу входящих сообщений (table id="mytable").
     Возвращает список словарей сообщений; при отсутствии таблицы — [].
     """
-    soup = BeautifulSoup(page_html or "", 'html.parser')
+    soup = make_soup(page_html)
     table = soup.find('table', id='mytable')
     if not table:
         return []
@@ -337,7 +793,7 @@ def parse_total_message_pages(html: str) -> int:
     (<center> со ссылкой на последнюю страницу или текстом «1-20 из 658»).
     Возвращает минимум 1.
     """
-    soup = BeautifulSoup(html or "", 'html.parser')
+    soup = make_soup(html)
     pagination = soup.find('center')
     if not pagination:
         return 1
@@ -0,0 +1,207 @@
+"""Координатор переавторизаций в ЛК при массовом истечении сессий.
+
+Когда lk.sut.ru сбрасывает все сессии разом (деплой/рестарт на их стороне),
+каждый LessonController в ту же минуту видит «Session expired» и логинится
+заново — шторм логинов, на который ЛК отвечает блокировкой IP бота.
+Координатор:
+
+- дедуплицирует переавторизацию по пользователю (одновременные вызовы ждут
+  один логин);
+- пропускает не больше REAUTH_CONCURRENCY логинов одновременно и в среднем
+  не чаще раза в LK_LOGIN_DELAY_SEC (ведро токенов, пачкой до LK_LOGIN_BURST);
+- считает истечения по разным пользователям в окне REAUTH_STORM_WINDOW_SEC: от
+  REAUTH_STORM_THRESHOLD — ЛК «сломан для всех», автоотметка ставится на паузу
+  (REAUTH_STORM_PAUSE_SEC, при неудачной пробе — вдвое дольше, до
+  REAUTH_STORM_PAUSE_MAX_SEC). После паузы первый логин — проба: идёт один,
+  успех закрывает предохранитель, провал снова открывает. Если ЛК ответил
+  пробе отказом в данных входа (LoginRejected — у пользователя сменился
+  пароль), ЛК жив, но о сессиях остальных проба ничего не сказала:
+  предохранитель не трогаем, пробой станет следующий логин из шторма.
+
+Пользователи, чьё истечение уже учтено в текущем шторме, повторно его не
+запускают, пока не переавторизуются, — иначе очередь на переавторизацию после
+паузы сама бы открывала предохранитель снова.
+
+Модуль зависит только от config и lk_limiter; логин передаётся вызывающим
+(LessonController.reauthenticate) как корутинная функция: True/False или
+LoginRejected при отказе ЛК в данных входа (наружу — как False).
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from config import (
+    LK_LOGIN_BURST,
+    LK_LOGIN_DELAY_SEC,
+    REAUTH_CONCURRENCY,
+    REAUTH_STORM_PAUSE_MAX_SEC,
+    REAUTH_STORM_PAUSE_SEC,
+    REAUTH_STORM_THRESHOLD,
+    REAUTH_STORM_WINDOW_SEC,
+)
+from lk_limiter import TokenBucket
+
+
+class LoginRejected(Exception):
+    """ЛК ответил на логин отказом в данных входа (неверный email/пароль), а не сбоем."""
+
+
+class ReauthCoordinator:
+    """Очередь переавторизаций + предохранитель на массовое истечение сессий."""
+
+    def __init__(self, concurrency: int = 2, login_interval_sec: float = 1.5,
+                 burst: int = 2, storm_threshold: int = 5, storm_window_sec: float = 120.0,
+                 pause_sec: float = 120.0, max_pause_sec: float = 900.0):
+        self.concurrency = max(1, int(concurrency))
+        self.storm_threshold = max(1, int(storm_threshold))
+        self.storm_window_sec = storm_window_sec
+        self.pause_sec = pause_sec
+        self.max_pause_sec = max(pause_sec, max_pause_sec)
+        self._bucket = TokenBucket(1.0 / login_interval_sec if login_interval_sec > 0 else 0, burst)
+        self._inflight: dict = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._probe_lock: Optional[asyncio.Lock] = None
+        self._loop = None
+        # (monotonic, user_id) истечений в окне; пользователи текущего шторма.
+        self._expiries = deque()
+        self._storm_users: set = set()
+        self._tripped = False
+        self._open_until = 0.0
+        self._current_pause = pause_sec
+        self.trips = 0
+
+    # --- предохранитель ---------------------------------------------------------
+
+    def pause_remaining(self) -> float:
+        """Сколько секунд ещё стоит пауза автоотметки (0 — работаем)."""
+        return max(0.0, self._open_until - time.monotonic())
+
+    @property
+    def tripped(self) -> bool:
+        """Предохранитель открыт или ждёт успешной пробы."""
+        return self._tripped
+
+    def note_expired(self, user_id) -> None:
+        """Сессия пользователя истекла; при всплеске по разным пользователям — пауза."""
+        now = time.monotonic()
+        if self._tripped:
+            self._storm_users.add(user_id)
+            return
+        if user_id in self._storm_users:
+            return
+        self._expiries.append((now, user_id))
+        while self._expiries and now - self._expiries[0][0] > self.storm_window_sec:
+            self._expiries.popleft()
+        distinct = {uid for _ts, uid in self._expiries}
+        if len(distinct) >= self.storm_threshold:
+            self._storm_users |= distinct
+            self._expiries.clear()
+            self._trip(now, "массовое истечение сессий: %s пользователей" % len(distinct))
+
+    def _trip(self, now: float, reason: str) -> None:
+        self._tripped = True
+        self._open_until = now + self._current_pause
+        self.trips += 1
+        logging.warning(
+            "ЛК похоже сломан для всех (%s) — автоотметка на паузе %.0f с",
+            reason, self._current_pause,
+        )
+
+    def _on_probe_result(self, ok: bool) -> None:
+        if ok:
+            logging.info("Проба переавторизации успешна — автоотметка возобновлена")
+            self._tripped = False
+            self._current_pause = self.pause_sec
+            return
+        self._current_pause = min(self.max_pause_sec, self._current_pause * 2)
+        self._trip(time.monotonic(), "проба переавторизации не прошла")
+
+    # --- очередь переавторизаций ---------------------------------------------
+
+    def _ensure_primitives(self) -> None:
+        # Примитивы asyncio привязаны к loop — пересоздаём при смене loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._probe_lock = asyncio.Lock()
+
+    async def reauthenticate(self, user_id, login: Callable[[], Awaitable[bool]]) -> bool:
+        """
+        Переавторизация пользователя через общую очередь. Повторный вызов для
+        того же пользователя, пока логин идёт, ждёт его результат.
+        """
+        self._ensure_primitives()
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._run(user_id, login))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda t, uid=user_id: self._on_done(uid, t))
+        # shield: отмена одного ожидающего не должна обрывать общий логин.
+        return await asyncio.shield(task)
+
+    def _on_done(self, user_id, task: asyncio.Future) -> None:
+        if self._inflight.get(user_id) is task:
+            del self._inflight[user_id]
+        if not task.cancelled():
+            task.exception()
+
+    async def _run(self, user_id, login: Callable[[], Awaitable[bool]]) -> bool:
+        while self.pause_remaining() > 0:
+            await asyncio.sleep(self.pause_remaining())
+        async with self._slots:
+            if self._tripped:
+                # После паузы — одна проба за раз; остальные ждут её итога.
+                async with self._probe_lock:
+                    if self._tripped:
+                        while self.pause_remaining() > 0:
+                            await asyncio.sleep(self.pause_remaining())
+                        await self._bucket.acquire()
+                        # Исключение (нет данных пользователя и т.п.) — не
+                        # вердикт о ЛК: пробой станет следующий логин.
+                        try:
+                            ok = await self._login(user_id, login)
+                        except LoginRejected:
+                            logging.warning(
+                                "Проба переавторизации: ЛК отклонил данные пользователя %s — "
+                                "пробуем следующим из шторма", user_id,
+                            )
+                            self._storm_users.discard(user_id)
+                            return False
+                        self._on_probe_result(ok)
+                        return ok
+            await self._bucket.acquire()
+            try:
+                return await self._login(user_id, login)
+            except LoginRejected:
+                logging.warning("ЛК отклонил данные входа пользователя %s", user_id)
+                return False
+
+    async def _login(self, user_id, login: Callable[[], Awaitable[bool]]) -> bool:
+        ok = bool(await login())
+        if ok:
+            self._storm_users.discard(user_id)
+        return ok
+
+    def stats(self) -> dict:
+        return {
+            "tripped": self._tripped,
+            "pause_remaining_sec": round(self.pause_remaining(), 1),
+            "in_flight": len(self._inflight),
+            "storm_users": len(self._storm_users),
+            "trips": self.trips,
+        }
+
+
+# Единый координатор процесса. Доступ — reauth_service.coordinator.
+coordinator = ReauthCoordinator(
+    concurrency=REAUTH_CONCURRENCY,
+    login_interval_sec=LK_LOGIN_DELAY_SEC,
+    burst=LK_LOGIN_BURST,
+    storm_threshold=REAUTH_STORM_THRESHOLD,
+    storm_window_sec=REAUTH_STORM_WINDOW_SEC,
+    pause_sec=REAUTH_STORM_PAUSE_SEC,
+    max_pause_sec=REAUTH_STORM_PAUSE_MAX_SEC,
+)
@@ -0,0 +1,15 @@
+"""Точка входа процесса бота: `python run.py`.
+
+Модуль нарочно тонкий. Воркеры parse_pool запускаются через spawn и
+импортируют главный модуль процесса заново (как __mp_main__): будь им
+main.py, каждый воркер тянул бы aiogram, хэндлеры и db.py с подключением к
+users.db и DDL (~118 МБ против ~25 МБ у одного parsers). Отсюда в воркере
+не исполняется ничего — фасад main импортируется только под __main__.
+"""
+
+if __name__ == "__main__":
+    import asyncio
+
+    import main
+
+    asyncio.run(main.main())
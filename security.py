@@ -13,6 +13,7 @@ load_dotenv() (выполняется в config.py) должен отработ
 import logging
 import os
 import time as time_module
+from typing import Optional
 
 from cryptography.fernet import Fernet, InvalidToken
 
@@ -55,6 +56,26 @@ def decrypt_password(stored: str) -> str:
         return stored
 
 
+def encrypt_secret(data: str) -> Optional[str]:
+    """
+    Шифрует служебный секрет (куки сессии ЛК). В отличие от пароля, без ключа
+    НЕ хранится открытым текстом: возвращает None — сохранять нечего.
+    """
+    if _fernet is None:
+        return None
+    return _fernet.encrypt(data.encode()).decode()
+
+
+def decrypt_secret(token: Optional[str]) -> Optional[str]:
+    """Расшифровывает секрет из encrypt_secret. Нет ключа / битый токен -> None."""
+    if _fernet is None or not token:
+        return None
+    try:
+        return _fernet.decrypt(token.encode()).decode()
+    except InvalidToken:
+        return None
+
+
 # --- Rate-limit на попытки входа (защита от перебора паролей) -----------------
 # In-memory троттл: не более LOGIN_RATE_LIMIT попыток входа на user_id
 # за окно LOGIN_RATE_WINDOW_SEC секунд. Настраивается через .env.
@@ -39,6 +39,7 @@ class _FakeSession:
 
     def __init__(self, **kwargs):
         self.posts = []
+        self.closed = False
 
     async def __aenter__(self):
         return self
@@ -46,7 +47,10 @@ class _FakeSession:
     async def __aexit__(self, *exc):
         return False
 
-    def post(self, url, data=None, proxy=None):
+    async def close(self):
+        self.closed = True
+
+    def post(self, url, data=None, headers=None, proxy=None):
         self.posts.append(data)
         return _FakeResponse(self.response_status, self.response_text)
 
@@ -166,3 +170,24 @@ def test_upcoming_lesson_details_none_after_start(load_fixture):
         )
 
     assert asyncio.run(scenario()) is None
+
+
+def test_timetable_page_parsed_once_for_same_html(monkeypatch, load_fixture):
+    """Клик и напоминание на одном HTML разбирают страницу один раз."""
+    html = load_fixture("raspisanie_today.html")
+    calls = []
+    real_parse = lk_client.parsers.parse_lk_timetable_page
+    monkeypatch.setattr(
+        lk_client.parsers, "parse_lk_timetable_page",
+        lambda text: calls.append(text) or real_parse(text),
+    )
+
+    async def scenario():
+        api = _api_with_timetable(html)
+        first = await api.get_timetable_page()
+        await api.get_current_lesson_details(datetime(2026, 5, 18, 13, 0), target_pair_index=2)
+        return first, await api.get_timetable_page()
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert len(calls) == 1
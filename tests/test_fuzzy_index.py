@@ -0,0 +1,151 @@
+"""Нечёткий поиск (fuzzy_index): нормализация, опечатки, инкрементальный sync."""
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import fuzzy_index
+import timetable_service
+from fuzzy_index import GROUPS, ROOMS, TEACHERS, FuzzyIndex, fold
+
+NAMES = {
+    GROUPS: ["ИКПИ-22", "ИКПИ-23", "ИКВ-11", "ИСТ-21м"],
+    TEACHERS: ["Иванов И.И.", "Иванова А.А.", "Петров П.П.", "Семёнов С.С."],
+    ROOMS: ["401; Б22/1", "512; Б22/1", "ауд. 7"],
+}
+
+
+def _index(names=NAMES) -> FuzzyIndex:
+    index = FuzzyIndex()
+    index.sync(names)
+    return index
+
+
+def _names(results) -> list:
+    return [name for _id, _kind, name, _score in results]
+
+
+def test_fold_lookalikes_case_and_punctuation():
+    # Латинские A, K, P, C и строчная «e»; ё -> е; дефис и точка -> пробел.
+    assert fold("ИKПИ-22") == fold("икпи 22") == "икпи 22"
+    assert fold("Семёнов С.С.") == "семенов с с"
+    assert fold("PCA") == "рса"
+    assert fold("b") == "b"
+
+
+def test_exact_after_normalisation():
+    index = _index()
+    assert index.exact("икпи 22", GROUPS) == "ИКПИ-22"
+    assert index.exact("ИKПИ-22", GROUPS) == "ИКПИ-22"
+    assert index.exact("ИКПИ-2", GROUPS) is None
+    assert index.exact("ИКПИ-22", TEACHERS) is None
+
+
+def test_typos_rank_closest_first():
+    index = _index()
+    assert _names(index.search("икпи22", GROUPS))[0] == "ИКПИ-22"
+    assert _names(index.search("Ивонов", TEACHERS))[0] == "Иванов И.И."
+    assert _names(index.search("Семенов", TEACHERS)) == ["Семёнов С.С."]
+    assert index.search("zzz") == []
+    assert index.search("  ") == []
+
+
+def test_teacher_surname_and_room_number_are_keys():
+    index = _index()
+    top = index.search("Иванов", TEACHERS)[0]
+    assert (top[2], top[3]) == ("Иванов И.И.", fuzzy_index.EXACT_SCORE)
+    assert _names(index.search("512", ROOMS))[0] == "512; Б22/1"
+
+
+def test_kinds_filter_and_limit():
+    index = _index()
+    assert {kind for _id, kind, _name, _score in index.search("Иванов", (TEACHERS,))} == {TEACHERS}
+    assert len(index.search("ИКПИ", GROUPS, limit=1)) == 1
+
+
+def test_sync_is_incremental_and_ids_stable():
+    index = _index()
+    kept = index.search("ИКВ-11", GROUPS)[0][0]
+    gone = index.search("ИКПИ-23", GROUPS)[0][0]
+
+    added, removed = index.sync({GROUPS: ["ИКПИ-22", "ИКВ-11", "ИСТ-21м", "ИКВ-12"]})
+    assert (added, removed) == (1, 1)
+    assert index.item(kept) == (GROUPS, "ИКВ-11")
+    assert index.item(gone) is None
+    assert index.item(10 ** 6) is None
+    assert "ИКПИ-23" not in _names(index.search("ИКПИ-23", GROUPS))
+    assert index.exact("икв 12", GROUPS) == "ИКВ-12"
+    # Другие виды не тронуты.
+    assert len(index) == 4 + len(NAMES[TEACHERS]) + len(NAMES[ROOMS])
+
+
+def test_refresh_search_indexes_follows_snapshot(monkeypatch):
+    monkeypatch.setattr(fuzzy_index, "index", FuzzyIndex())
+    snapshot = {"ИКПИ-22": [], "ИКВ-11": []}
+    monkeypatch.setattr(timetable_service.lk_client, "timetable_api", None)
+    timetable_service.refresh_search_indexes(snapshot)
+    assert timetable_service.search_index_synced(snapshot)
+    assert not timetable_service.search_index_synced(dict(snapshot))
+    assert fuzzy_index.index.exact("икпи-22", GROUPS) == "ИКПИ-22"
+
+
+def test_search_index_covers_groups_missing_from_snapshot(monkeypatch):
+    monkeypatch.setattr(fuzzy_index, "index", FuzzyIndex())
+    monkeypatch.setattr(timetable_service.lk_client, "timetable_api", None)
+    snapshot = {"ИКПИ-22": []}
+    timetable_service.refresh_search_indexes(snapshot)
+
+    # API со списком групп появился позже снимка: страница ИСТ-21м не загрузилась,
+    # но по названию группа находится, как и по id.
+    api = SimpleNamespace(groups_id={"1": "ИКПИ-22", "2": "ИСТ-21м"})
+    monkeypatch.setattr(timetable_service.lk_client, "timetable_api", api)
+    assert not timetable_service.search_index_synced(snapshot)
+    timetable_service.refresh_search_indexes(snapshot)
+    assert timetable_service.search_index_synced(snapshot)
+    assert fuzzy_index.index.exact("ист 21м", GROUPS) == "ИСТ-21м"
+    assert "ИСТ-21м" in _names(fuzzy_index.index.search("ИСТ-21", GROUPS))
+
+
+def test_search_is_sub_millisecond_on_university_sized_set():
+    rnd = random.Random(1)
+    surnames = ["Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов"]
+    names = {
+        GROUPS: [f"{prefix}-{number}" for prefix in ("ИКПИ", "ИСТ", "ИКБ", "РТ", "ЭК") for number in range(10, 100)],
+        TEACHERS: list({f"{rnd.choice(surnames)}{rnd.choice(['', 'а', 'ский'])} "
+                        f"{chr(0x410 + rnd.randrange(32))}.{chr(0x410 + rnd.randrange(32))}."
+                        for _ in range(1500)}),
+        ROOMS: [f"{number}; Б22/{building}" for number in range(100, 400) for building in (1, 2)],
+    }
+    index = _index(names)
+    queries = ["икпи22", "Ивонов", "Смирнова А", "3l2", "ИKБ-45"]
+    timings = []
+    for _ in range(5):                     # лучший из прогонов — без шума планировщика
+        started = time.perf_counter()
+        for query in queries * 20:
+            index.search(query)
+        timings.append((time.perf_counter() - started) * 1000 / (len(queries) * 20))
+    assert min(timings) < 1.0
+
+
+def test_did_you_mean_runs_command_for_the_user_not_the_bot(monkeypatch):
+    from handlers import schedule
+
+    index = _index()
+    monkeypatch.setattr(fuzzy_index, "index", index)
+    calls = []
+
+    async def _command(message, override=None, uid=None):
+        calls.append((message, override, uid))
+
+    monkeypatch.setitem(schedule._DID_YOU_MEAN_COMMANDS, TEACHERS, _command)
+
+    async def _answer(*args, **kwargs):
+        pass
+
+    item_id = index.search("Петров", TEACHERS)[0][0]
+    # from_user у сообщения с кнопкой — сам бот.
+    message = SimpleNamespace(from_user=SimpleNamespace(id=999))
+    callback = SimpleNamespace(data=f"dym:{item_id}", from_user=SimpleNamespace(id=42),
+                               message=message, answer=_answer)
+    asyncio.run(schedule.process_did_you_mean(callback))
+    assert calls == [(message, "Петров П.П.", 42)]
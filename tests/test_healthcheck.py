@@ -27,3 +27,19 @@ def test_healthcheck_fails_for_stale_file(tmp_path):
     ok, msg = healthcheck.check(hb, max_age_sec=120)
     assert ok is False
     assert "устарел" in msg
+
+
+def test_startup_progress_missing_file_is_empty(tmp_path):
+    assert healthcheck.startup_progress(tmp_path / "nope.json") == ""
+
+
+def test_startup_progress_reports_eta(tmp_path):
+    status = tmp_path / "startup.json"
+    status.write_text('{"total": 500, "done": 120, "eta_sec": 95.4, "finished": false}')
+    assert healthcheck.startup_progress(status) == "автологин: 120/500, ETA 95s"
+
+
+def test_startup_progress_finished(tmp_path):
+    status = tmp_path / "startup.json"
+    status.write_text('{"total": 3, "done": 3, "failed": 1, "finished": true}')
+    assert "завершён: 3/3" in healthcheck.startup_progress(status)
@@ -0,0 +1,76 @@
+"""Тесты общего HTTP-слоя (http_pool): пул на хост, прокси только к ЛК."""
+import asyncio
+
+import aiohttp
+from aiohttp_socks import ProxyConnector
+
+import http_pool
+
+
+def test_connector_reused_per_host_and_separate_between_hosts(monkeypatch):
+    monkeypatch.setattr(http_pool, "_CONNECTORS", {})
+    monkeypatch.setattr(http_pool, "LK_PROXY", None)
+
+    async def scenario():
+        lk = http_pool.get_connector(http_pool.LK_HOST)
+        same = http_pool.get_connector(http_pool.LK_HOST)
+        cabinet = http_pool.get_connector(http_pool.CABINET_HOST)
+        result = (lk is same, lk is cabinet, lk.limit, cabinet.limit)
+        await http_pool.close_connectors()
+        return result, lk.closed, cabinet.closed
+
+    (reused, shared, lk_limit, cabinet_limit), lk_closed, cabinet_closed = asyncio.run(scenario())
+    assert reused is True
+    assert shared is False
+    assert lk_limit == http_pool.LK_POOL_LIMIT
+    assert cabinet_limit == http_pool.SUT_POOL_LIMIT
+    assert lk_closed and cabinet_closed
+    assert http_pool._CONNECTORS == {}
+
+
+def test_proxy_applies_only_to_lk(monkeypatch):
+    monkeypatch.setattr(http_pool, "_CONNECTORS", {})
+    monkeypatch.setattr(http_pool, "LK_PROXY", "socks5://127.0.0.1:1080")
+
+    async def scenario():
+        lk = http_pool.get_connector(http_pool.LK_HOST)
+        cabinet = http_pool.get_connector(http_pool.CABINET_HOST)
+        result = (type(lk), type(cabinet))
+        await http_pool.close_connectors()
+        return result
+
+    lk_type, cabinet_type = asyncio.run(scenario())
+    assert issubclass(lk_type, ProxyConnector)
+    assert cabinet_type is aiohttp.TCPConnector
+    assert http_pool.proxy_for(http_pool.WWW_HOST) is None
+
+
+def test_session_does_not_own_pool(monkeypatch):
+    monkeypatch.setattr(http_pool, "_CONNECTORS", {})
+    monkeypatch.setattr(http_pool, "LK_PROXY", None)
+
+    async def scenario():
+        async with http_pool.session(http_pool.CABINET_HOST) as session:
+            connector = session.connector
+            trust_env = session.trust_env
+        reused = http_pool.get_connector(http_pool.CABINET_HOST) is connector
+        closed = connector.closed
+        await http_pool.close_connectors()
+        return reused, closed, trust_env
+
+    reused, closed, trust_env = asyncio.run(scenario())
+    assert reused is True
+    assert closed is False
+    assert trust_env is False
+
+
+def test_new_event_loop_gets_fresh_connector(monkeypatch):
+    monkeypatch.setattr(http_pool, "_CONNECTORS", {})
+    monkeypatch.setattr(http_pool, "LK_PROXY", None)
+
+    async def grab():
+        return http_pool.get_connector(http_pool.LK_HOST)
+
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    assert first is not second
@@ -0,0 +1,128 @@
+"""Тесты центрального планировщика автоотметки (lesson_scheduler.LessonScheduler)."""
+import asyncio
+
+from lesson_scheduler import LessonScheduler
+
+
+class _Controller:
+    """Минимальный контроллер: tick() пишет в общий журнал и отдаёт паузы из списка."""
+
+    def __init__(self, user_id, log, delays=(None,), work_sec=0.0, gauge=None):
+        self.user_id = user_id
+        self.is_running = True
+        self.log = log
+        self.delays = list(delays)
+        self.work_sec = work_sec
+        self.gauge = gauge
+
+    async def tick(self):
+        self.log.append(self.user_id)
+        if self.gauge is not None:
+            self.gauge["now"] += 1
+            self.gauge["max"] = max(self.gauge["max"], self.gauge["now"])
+        await asyncio.sleep(self.work_sec)
+        if self.gauge is not None:
+            self.gauge["now"] -= 1
+        return self.delays.pop(0) if self.delays else None
+
+
+def test_ticks_dispatched_in_due_order():
+    log = []
+
+    async def scenario():
+        scheduler = LessonScheduler(workers=1)
+        scheduler.schedule(_Controller(3, log), 0.03)
+        scheduler.schedule(_Controller(1, log), 0.01)
+        scheduler.schedule(_Controller(2, log), 0.02)
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert log == [1, 2, 3]
+
+
+def test_controller_rescheduled_by_returned_delay_until_none():
+    log = []
+
+    async def scenario():
+        scheduler = LessonScheduler()
+        controller = _Controller(1, log, delays=[0.01, 0.01, None])
+        scheduler.schedule(controller, 0)
+        await asyncio.sleep(0.1)
+        scheduled = scheduler.is_scheduled(controller)
+        await scheduler.stop()
+        return scheduled
+
+    assert asyncio.run(scenario()) is False
+    assert log == [1, 1, 1]
+
+
+def test_worker_pool_bounds_concurrent_ticks():
+    log, gauge = [], {"now": 0, "max": 0}
+
+    async def scenario():
+        scheduler = LessonScheduler(workers=2)
+        for user_id in range(6):
+            scheduler.schedule(_Controller(user_id, log, work_sec=0.02, gauge=gauge), 0)
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert sorted(log) == list(range(6))
+    assert gauge["max"] == 2
+
+
+def test_unschedule_and_stopped_controller_are_not_ticked():
+    log = []
+
+    async def scenario():
+        scheduler = LessonScheduler()
+        removed = _Controller(1, log)
+        stopped = _Controller(2, log)
+        scheduler.schedule(removed, 0.01)
+        scheduler.schedule(stopped, 0.01)
+        scheduler.unschedule(removed)
+        stopped.is_running = False
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert log == []
+
+
+def test_new_controller_replaces_previous_one_for_same_user():
+    log = []
+
+    async def scenario():
+        scheduler = LessonScheduler()
+        old = _Controller(1, log)
+        new = _Controller(1, log)
+        new.log = log_new = []
+        scheduler.schedule(old, 0.01)
+        scheduler.schedule(new, 0.01)
+        # Отмена от «осиротевшего» контроллера не снимает новый.
+        scheduler.unschedule(old)
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        return log_new
+
+    assert asyncio.run(scenario()) == [1]
+    assert log == []
+
+
+def test_earlier_event_wakes_sleeping_dispatcher():
+    log = []
+
+    async def scenario():
+        scheduler = LessonScheduler()
+        scheduler.schedule(_Controller(1, log), 60)
+        await asyncio.sleep(0.01)
+        scheduler.schedule(_Controller(2, log), 0)
+        await asyncio.sleep(0.02)
+        stats = scheduler.stats()
+        await scheduler.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert log == [2]
+    assert stats["scheduled"] == 1
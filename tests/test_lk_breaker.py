@@ -0,0 +1,131 @@
+"""Тесты предохранителя запросов к ЛК (lk_breaker.CircuitBreaker) и его
+подключения к DebuggableBonchAPI: fail fast при открытом, одна проба в half-open."""
+import asyncio
+
+import pytest
+
+import lk_breaker
+import lk_client
+from lk_breaker import CircuitBreaker, LKUnavailableError
+
+
+def _breaker(**kwargs):
+    params = dict(failure_threshold=3, reset_timeout_sec=60, max_reset_timeout_sec=240)
+    params.update(kwargs)
+    return CircuitBreaker("lk.test", **params)
+
+
+def _fail(breaker, times=1):
+    for _ in range(times):
+        with pytest.raises(asyncio.TimeoutError):
+            with breaker.guard():
+                raise asyncio.TimeoutError()
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = _breaker()
+    _fail(breaker, 2)
+    with breaker.guard():
+        pass  # успех обнуляет счётчик подряд идущих сбоев
+    _fail(breaker, 2)
+    assert breaker.state == lk_breaker.STATE_CLOSED
+    _fail(breaker)
+    assert breaker.state == lk_breaker.STATE_OPEN and breaker.is_open
+    with pytest.raises(LKUnavailableError) as info:
+        with breaker.guard():
+            pytest.fail("запрос не должен уходить при открытом предохранителе")
+    assert info.value.retry_after > 0
+    assert breaker.rejected == 1
+
+
+def test_half_open_lets_single_probe_through():
+    breaker = _breaker(failure_threshold=1)
+    _fail(breaker)
+    breaker._open_until = 0  # пауза истекла
+    with breaker.guard():
+        # Пока проба в полёте, остальные запросы отклоняются.
+        with pytest.raises(LKUnavailableError):
+            breaker.before_request()
+    assert breaker.state == lk_breaker.STATE_CLOSED and not breaker.is_open
+
+
+def test_failed_probe_doubles_pause_and_marked_status_counts():
+    breaker = _breaker(failure_threshold=1, reset_timeout_sec=0)
+    with breaker.guard() as call:
+        call.fail("HTTP 503")
+    assert breaker.state == lk_breaker.STATE_OPEN
+    breaker.reset_timeout_sec = breaker._current_timeout = 10
+    breaker._open_until = 0  # пауза истекла — следующий запрос станет пробой
+    _fail(breaker)
+    assert breaker.state == lk_breaker.STATE_OPEN
+    assert 19 < breaker.retry_after() <= 20
+
+
+def test_unrelated_error_releases_probe_without_verdict():
+    breaker = _breaker(failure_threshold=1)
+    _fail(breaker)
+    breaker._open_until = 0  # пауза истекла
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError("Session expired")
+    assert breaker.state == lk_breaker.STATE_HALF_OPEN
+    with breaker.guard():
+        pass  # следующая проба пропускается
+    assert breaker.state == lk_breaker.STATE_CLOSED
+
+
+class _Response:
+    def __init__(self, status):
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def text(self):
+        return "Service Unavailable"
+
+
+class _Session:
+    requests = 0
+    closed = False
+
+    def __init__(self, **kwargs):
+        pass
+
+    def get(self, url, headers=None, proxy=None):
+        type(self).requests += 1
+        return _Response(503)
+
+    async def close(self):
+        self.closed = True
+
+
+class _Connector:
+    closed = False
+
+    def __init__(self, **kwargs):
+        pass
+
+
+def test_lk_client_stops_hitting_network_when_breaker_opens(monkeypatch):
+    monkeypatch.setattr(lk_breaker, "_BREAKERS", {})
+    monkeypatch.setattr(lk_breaker, "LK_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(lk_client.aiohttp, "ClientSession", _Session)
+    monkeypatch.setattr(lk_client.aiohttp, "TCPConnector", _Connector)
+    _Session.requests = 0
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        for _ in range(2):
+            await api.get_raw_timetable(week_number=3)
+        with pytest.raises(LKUnavailableError):
+            await api.get_raw_timetable(week_number=3)
+        logged_in = await api.login("user@sut.ru", "pw")
+        return logged_in
+
+    assert asyncio.run(scenario()) is False
+    assert _Session.requests == 2
+    assert lk_client.lk_unavailable_message().startswith("⚠️ Личный кабинет")
@@ -0,0 +1,176 @@
+"""Тесты адаптивного ограничителя параллелизма к ЛК (lk_limiter.AdaptiveLimiter):
+AIMD-окно и приоритетные очереди."""
+import asyncio
+
+import pytest
+
+import lk_limiter
+from lk_limiter import (
+    AdaptiveLimiter,
+    lk_priority,
+    PRIORITY_BACKGROUND,
+    PRIORITY_CLICK,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_REMINDER,
+)
+
+
+def test_window_grows_on_fast_clean_responses():
+    limiter = AdaptiveLimiter(initial=1, max_limit=4, latency_target_sec=10)
+
+    async def scenario():
+        for _ in range(20):
+            async with limiter:
+                pass
+
+    asyncio.run(scenario())
+    assert limiter.limit == 4
+
+
+def test_window_holds_on_slow_responses():
+    limiter = AdaptiveLimiter(initial=2, max_limit=8, latency_target_sec=0)
+
+    async def scenario():
+        for _ in range(5):
+            async with limiter:
+                await asyncio.sleep(0.001)
+
+    asyncio.run(scenario())
+    assert limiter.limit == 2
+
+
+def test_overload_backs_off_once_per_cooldown():
+    limiter = AdaptiveLimiter(initial=8, max_limit=8, cooldown_sec=60)
+
+    async def scenario():
+        async with limiter:
+            limiter.note_overload("403")
+            limiter.note_overload("ERR_MSG")
+
+    asyncio.run(scenario())
+    assert limiter.limit == 4
+    assert limiter.overloads == 2
+
+
+def test_timeout_counts_as_overload():
+    limiter = AdaptiveLimiter(initial=4, max_limit=4)
+
+    async def scenario():
+        async with limiter:
+            raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scenario())
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+def test_limit_bounds_concurrency_and_reports_queue():
+    limiter = AdaptiveLimiter(initial=2, max_limit=2)
+    peak = {"running": 0, "max": 0, "queue": 0}
+
+    async def worker():
+        async with limiter:
+            peak["running"] += 1
+            peak["max"] = max(peak["max"], peak["running"])
+            peak["queue"] = max(peak["queue"], limiter.queue_depth)
+            await asyncio.sleep(0.01)
+            peak["running"] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(worker() for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert peak["max"] == 2
+    assert peak["queue"] >= 1
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+
+    async def scenario():
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        return limiter.in_flight, limiter.queue_depth
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_priority_lanes_serve_clicks_before_background():
+    limiter = AdaptiveLimiter(initial=1, max_limit=1, aging_sec=1000)
+    order = []
+
+    async def worker(name, priority):
+        with lk_priority(priority):
+            async with limiter:
+                order.append(name)
+
+    async def scenario():
+        await limiter.acquire()
+        tasks = [
+            asyncio.ensure_future(worker("background", PRIORITY_BACKGROUND)),
+            asyncio.ensure_future(worker("interactive", PRIORITY_INTERACTIVE)),
+            asyncio.ensure_future(worker("reminder", PRIORITY_REMINDER)),
+            asyncio.ensure_future(worker("click", PRIORITY_CLICK)),
+        ]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["click", "reminder", "interactive", "background"]
+    waits = limiter.stats()["waits"]
+    assert waits["click"]["count"] == 1
+    assert waits["background"]["max_wait_sec"] >= waits["click"]["max_wait_sec"]
+
+
+def test_aging_prevents_starvation(monkeypatch):
+    limiter = AdaptiveLimiter(initial=1, max_limit=1, aging_sec=1)
+    clock = {"now": 100.0}
+    monkeypatch.setattr(lk_limiter.time, "monotonic", lambda: clock["now"])
+    order = []
+
+    async def worker(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+        limiter.release()
+
+    async def scenario():
+        await limiter.acquire()
+        old = asyncio.ensure_future(worker("background", PRIORITY_BACKGROUND))
+        await asyncio.sleep(0)
+        clock["now"] += 10  # фоновый запрос ждёт давно
+        fresh = asyncio.ensure_future(worker("click", PRIORITY_CLICK))
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(old, fresh)
+
+    asyncio.run(scenario())
+    assert order == ["background", "click"]
+
+
+def test_token_bucket_paces_after_burst(monkeypatch):
+    clock = {"now": 0.0}
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        clock["now"] += delay
+
+    monkeypatch.setattr(lk_limiter.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(lk_limiter.asyncio, "sleep", fake_sleep)
+    bucket = lk_limiter.TokenBucket(rate=2.0, burst=2)
+
+    async def scenario():
+        for _ in range(4):
+            await bucket.acquire()
+
+    asyncio.run(scenario())
+    # Два токена пачкой, дальше — по одному раз в 0.5 с.
+    assert sleeps == [0.5, 0.5]
@@ -0,0 +1,376 @@
+"""Тесты keep-alive сессий DebuggableBonchAPI: переиспользование, закрытие
+простаивающих сессий, закрытие вытесненных из реестра lk_client.apis.
+
+Сеть замокана: aiohttp.ClientSession подменён счётчиком созданий.
+Сохранение кук в users.db проверяется на временной БД (фикстура temp_db).
+"""
+import asyncio
+from collections import OrderedDict
+
+from cryptography.fernet import Fernet
+from yarl import URL
+
+import lesson_controller
+import lk_client
+import login_service
+import security
+
+
+class _FakeResponse:
+    status = 200
+
+    def __init__(self, text):
+        self._text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def text(self):
+        return self._text
+
+
+class _CountingSession:
+    """Заглушка ClientSession: считает созданные экземпляры и GET-запросы."""
+
+    created = 0
+    page = "<html>raspisanie</html>"
+
+    def __init__(self, **kwargs):
+        type(self).created += 1
+        self.kwargs = kwargs
+        self.closed = False
+        self.gets = 0
+
+    async def close(self):
+        self.closed = True
+
+    def get(self, url, headers=None, proxy=None):
+        self.gets += 1
+        return _FakeResponse(type(self).page)
+
+
+class _FakeConnector:
+    closed = False
+
+    def __init__(self, **kwargs):
+        pass
+
+
+def _patch_network(monkeypatch, page="<html>raspisanie</html>"):
+    _CountingSession.created = 0
+    monkeypatch.setattr(_CountingSession, "page", page)
+    monkeypatch.setattr(lk_client.aiohttp, "ClientSession", _CountingSession)
+    monkeypatch.setattr(lk_client.aiohttp, "TCPConnector", _FakeConnector)
+    # Общий учёт кэшей страниц — свой на тест.
+    monkeypatch.setattr(lk_client, "_raw_cache_lru", OrderedDict())
+    monkeypatch.setattr(lk_client, "_raw_cache_total_bytes", 0)
+
+
+def test_session_reused_between_requests(monkeypatch):
+    """Два запроса расписания идут через одну сессию поверх cookie_jar."""
+    _patch_network(monkeypatch)
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        await api.get_raw_timetable(week_number=5)
+        await api.get_raw_timetable(week_number=6)
+        return api
+
+    api = asyncio.run(scenario())
+    assert _CountingSession.created == 1
+    assert api._session.gets == 2
+    assert api._session.kwargs["cookie_jar"] is api.cookie_jar
+    assert api._session.kwargs["connector_owner"] is False
+
+
+def test_close_idle_sessions_closes_only_idle(monkeypatch):
+    _patch_network(monkeypatch)
+    monkeypatch.setattr(lk_client, "apis", {})
+
+    async def scenario():
+        idle, busy = lk_client.DebuggableBonchAPI(), lk_client.DebuggableBonchAPI()
+        lk_client.apis.update({1: idle, 2: busy})
+        await idle.get_raw_timetable(week_number=1)
+        await busy.get_raw_timetable(week_number=1)
+        idle._session_last_used -= 1000
+        closed = await lk_client.close_idle_lk_sessions(max_idle_sec=600)
+        return closed, idle, busy
+
+    closed, idle, busy = asyncio.run(scenario())
+    assert closed == 1
+    assert idle._session is None
+    assert busy._session is not None and not busy._session.closed
+
+
+def test_set_api_closes_replaced_session(monkeypatch):
+    _patch_network(monkeypatch)
+    monkeypatch.setattr(lk_client, "apis", {})
+
+    async def scenario():
+        old = lk_client.DebuggableBonchAPI()
+        await lk_client.set_api(7, old)
+        await old.get_raw_timetable(week_number=1)
+        session = old._session
+        await lk_client.set_api(7, lk_client.DebuggableBonchAPI())
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.closed is True
+
+
+def test_concurrent_timetable_requests_share_one_fetch(monkeypatch):
+    """Одновременные запросы одной недели → один GET; разные недели — раздельно."""
+    _patch_network(monkeypatch)
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        results = await asyncio.gather(
+            api.get_raw_timetable(),
+            api.get_raw_timetable(),
+            api.get_raw_timetable(week_number=3),
+            api.get_raw_timetable(week_number=3),
+        )
+        return api, results
+
+    api, results = asyncio.run(scenario())
+    assert api._session.gets == 2
+    assert set(results) == {"<html>raspisanie</html>"}
+    assert api._raw_timetable_inflight == {}
+
+
+def test_timetable_weeks_cached_with_lru_limit(monkeypatch):
+    """Повторный запрос недели берётся из кэша; сверх лимита вытесняется самая старая."""
+    _patch_network(monkeypatch)
+    monkeypatch.setattr(lk_client, "LK_TIMETABLE_CACHE_WEEKS", 2)
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        for week in (1, 2, 1, 3, 1, 2):
+            await api.get_raw_timetable(week_number=week)
+        return api
+
+    api = asyncio.run(scenario())
+    # 1, 2 — сеть; 1 — кэш; 3 — сеть (вытесняет 2); 1 — кэш; 2 — снова сеть.
+    assert api._session.gets == 4
+    assert list(api._raw_timetable_cache) == [1, 2]
+
+
+def test_timetable_cache_expires_by_ttl(monkeypatch):
+    _patch_network(monkeypatch)
+    monkeypatch.setattr(lk_client, "LK_TIMETABLE_TTL_CURRENT_SEC", 0)
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        await api.get_raw_timetable()
+        await api.get_raw_timetable()
+        return api
+
+    assert asyncio.run(scenario())._session.gets == 2
+
+
+def test_timetable_cache_global_budget_evicts_other_users(monkeypatch):
+    _patch_network(monkeypatch)
+    monkeypatch.setattr(lk_client, "apis", {})
+    page_size = lk_client.sys.getsizeof("<html>raspisanie</html>")
+    monkeypatch.setattr(lk_client, "LK_TIMETABLE_CACHE_MAX_MB", 2.5 * page_size / (1024 * 1024))
+
+    async def scenario():
+        first, second = lk_client.DebuggableBonchAPI(), lk_client.DebuggableBonchAPI()
+        lk_client.apis.update({1: first, 2: second})
+        await first.get_raw_timetable(week_number=1)
+        await first.get_raw_timetable(week_number=2)
+        await second.get_raw_timetable(week_number=1)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert list(first._raw_timetable_cache) == [2]
+    assert list(second._raw_timetable_cache) == [1]
+    assert lk_client._raw_cache_total_bytes == 2 * page_size
+
+
+def test_timetable_cache_total_follows_put_and_pop(monkeypatch):
+    _patch_network(monkeypatch)
+    monkeypatch.setattr(lk_client, "LK_TIMETABLE_CACHE_WEEKS", 2)
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        for week in (1, 2, 3):
+            await api.get_raw_timetable(week_number=week)
+        return api
+
+    api = asyncio.run(scenario())
+    page_size = lk_client.sys.getsizeof("<html>raspisanie</html>")
+    assert lk_client._raw_cache_total_bytes == api._raw_timetable_cache_bytes == 2 * page_size
+    assert list(lk_client._raw_cache_lru) == [(id(api), 2), (id(api), 3)]
+    api.reset_session_state()
+    assert lk_client._raw_cache_total_bytes == 0 and not lk_client._raw_cache_lru
+
+
+def test_current_week_cached_under_one_key(monkeypatch, load_fixture):
+    html = load_fixture("raspisanie_with_lessons.html")
+    _patch_network(monkeypatch, page=html)
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        await api.get_raw_timetable(week_number=lk_client.parsers.parse_week_param(html))
+        page = await api.get_timetable_page()
+        # Явный week_param текущей недели — та же запись, без запроса.
+        await api.get_raw_timetable(week_number=page.week_param)
+        return api, page
+
+    api, page = asyncio.run(scenario())
+    assert page.week_param
+    assert list(api._raw_timetable_cache) == [0]
+    assert api._session.gets == 2
+
+
+# --- сохранение кук ЛК ---------------------------------------------------------
+
+def _register_with_cookies(monkeypatch, temp_db, user_id):
+    monkeypatch.setattr(security, "_fernet", Fernet(Fernet.generate_key()))
+    monkeypatch.setattr(lk_client, "apis", {})
+    monkeypatch.setattr(lesson_controller, "controllers", {})
+    temp_db.execute(
+        "INSERT INTO users (user_id, email, password) VALUES (?, ?, ?)",
+        (user_id, "user@sut.ru", "pw"),
+    )
+    temp_db.commit()
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        # Куки, выданные ЛК при логине.
+        api.cookie_jar.update_cookies({"PHPSESSID": "abc123"}, response_url=URL("https://lk.sut.ru/"))
+        await lk_client.set_api(user_id, api)
+        await lk_client.drop_api(user_id)
+
+    asyncio.run(scenario())
+
+
+def test_cookies_persisted_encrypted_and_restored(monkeypatch, temp_db):
+    _patch_network(monkeypatch)
+    _register_with_cookies(monkeypatch, temp_db, 5)
+
+    stored = temp_db.execute("SELECT lk_cookies FROM users WHERE user_id = 5").fetchone()[0]
+    assert stored and "abc123" not in stored
+
+    async def scenario():
+        api = lk_client.restore_api_from_cookies(5)
+        await api.close()
+        return api
+
+    api = asyncio.run(scenario())
+    assert [(c["name"], c["value"]) for c in api.export_cookies()] == [("PHPSESSID", "abc123")]
+
+
+def test_restore_lk_session_registers_live_session(monkeypatch, temp_db, load_fixture):
+    _patch_network(monkeypatch, page=load_fixture("raspisanie_with_lessons.html"))
+    _register_with_cookies(monkeypatch, temp_db, 6)
+
+    assert asyncio.run(login_service.restore_lk_session(6)) is True
+    assert 6 in lk_client.apis and 6 in lesson_controller.controllers
+    assert _CountingSession.created == 1
+
+
+def test_restore_lk_session_forgets_dead_cookies(monkeypatch, temp_db):
+    _patch_network(monkeypatch, page="<html>index.php?login=no</html>")
+    _register_with_cookies(monkeypatch, temp_db, 7)
+
+    assert asyncio.run(login_service.restore_lk_session(7)) is False
+    assert 7 not in lk_client.apis
+    assert temp_db.execute("SELECT lk_cookies FROM users WHERE user_id = 7").fetchone()[0] is None
+
+
+def test_restore_lk_session_keeps_cookies_while_lk_is_down(monkeypatch, temp_db):
+    _patch_network(monkeypatch)
+    _register_with_cookies(monkeypatch, temp_db, 8)
+
+    async def unavailable(self, week_number=False):
+        raise lk_client.LKUnavailableError(lk_client.LK_HOST, 30)
+    monkeypatch.setattr(lk_client.DebuggableBonchAPI, "get_timetable_page", unavailable)
+
+    # Проверить сессию нельзя — она регистрируется, без полного логина и без потери кук.
+    assert asyncio.run(login_service.restore_lk_session(8)) is True
+    assert 8 in lk_client.apis and 8 in lesson_controller.controllers
+    assert temp_db.execute("SELECT lk_cookies FROM users WHERE user_id = 8").fetchone()[0]
+
+
+def test_reauthenticate_relogs_in_place(monkeypatch, temp_db):
+    _patch_network(monkeypatch)
+    _register_with_cookies(monkeypatch, temp_db, 6)
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        api.cookie_jar.update_cookies({"PHPSESSID": "stale"}, response_url=URL("https://lk.sut.ru/"))
+        api._raw_cache_put(0, "<html></html>")
+        await lk_client.set_api(6, api)
+        logins = []
+
+        async def fake_login(email, password):
+            logins.append(email)
+            return True
+        monkeypatch.setattr(api, "login", fake_login)
+        controller = lesson_controller.LessonController(api=api, bot=None, user_id=6)
+        ok = await controller.reauthenticate()
+        return api, controller, ok, logins
+
+    api, controller, ok, logins = asyncio.run(scenario())
+    assert ok is True and logins == ["user@sut.ru"]
+    # Тот же объект API: keep-alive сессия не пересоздаётся, протухшие куки и кэш сброшены.
+    assert lk_client.apis[6] is api and controller.api is api
+    assert len(api.cookie_jar) == 0
+    assert not api._raw_timetable_cache
+
+
+def test_next_lesson_after_last_pair_of_week_estimates_next_week(monkeypatch, load_fixture):
+    """Пар до конца недели нет — сохраняется первая пара недели + 7 дней, а не NULL."""
+    page = lk_client.parsers.parse_lk_timetable_page(load_fixture("raspisanie_today.html"))
+    msk = lk_client.pytz.timezone("Europe/Moscow")
+    now = msk.localize(lk_client.datetime(2026, 5, 25, 12, 0))
+    first = page.next_lesson_start(now - lk_client.timedelta(weeks=1), lk_client.LESSON_INTERVALS)
+
+    class _Now(lk_client.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+    monkeypatch.setattr(lk_client, "datetime", _Now)
+    saved = []
+    monkeypatch.setattr(lk_client.db, "set_next_lesson_at", lambda user_id, value: saved.append(value))
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        api.user_id = 1
+        api._remember_next_lesson(page)
+
+    asyncio.run(scenario())
+    assert first is not None and page.next_lesson_start(now, lk_client.LESSON_INTERVALS) is None
+    assert saved == [(first + lk_client.timedelta(weeks=1)).isoformat()]
+
+
+def test_reauthenticate_reports_rejected_credentials(monkeypatch, temp_db):
+    """ЛК отклонил пароль: координатор получает LoginRejected, контроллер — False."""
+    _patch_network(monkeypatch)
+    _register_with_cookies(monkeypatch, temp_db, 6)
+    coordinator = lesson_controller.reauth_service.ReauthCoordinator(login_interval_sec=0)
+    monkeypatch.setattr(lesson_controller.reauth_service, "coordinator", coordinator)
+
+    async def scenario():
+        api = lk_client.DebuggableBonchAPI()
+        await lk_client.set_api(6, api)
+
+        async def rejected_login(email, password):
+            api.login_rejected = True
+            return False
+        monkeypatch.setattr(api, "login", rejected_login)
+        controller = lesson_controller.LessonController(api=api, bot=None, user_id=6)
+        try:
+            await controller._login_again()
+        except lesson_controller.reauth_service.LoginRejected:
+            raised = True
+        else:
+            raised = False
+        return raised, await controller.reauthenticate()
+
+    assert asyncio.run(scenario()) == (True, False)
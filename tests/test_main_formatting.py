@@ -75,3 +75,16 @@ def test_teacher_navigation_buttons_default_week():
     callbacks = _callbacks(main.get_teacher_week_navigation_buttons("Петров"))
     assert any(cb.endswith("_-1") for cb in callbacks)
     assert any(cb.endswith("_1") for cb in callbacks)
+
+
+# --- format_catalog_page -----------------------------------------------------
+
+def test_format_catalog_page_lists_counts_and_page():
+    text = main.format_catalog_page("👤 Преподаватели", [("Иванов И.И.", 34)], 1, 3, 81, "💡 подсказка")
+    assert text.startswith("👤 Преподаватели (81), стр. 2/3:")
+    assert "• Иванов И.И. — 34" in text
+    assert text.endswith("💡 подсказка")
+
+
+def test_format_catalog_single_page_omits_page_number():
+    assert "стр." not in main.format_catalog_page("🏫 Кабинеты", [("401", 2)], 0, 1, 1)
@@ -113,6 +113,29 @@ def test_notify_settings_text_disabled():
     assert "выключены" in text.lower()
 
 
+# --- catalog_page_kb ---------------------------------------------------------
+
+def test_catalog_kb_single_page_has_no_buttons():
+    assert main.catalog_page_kb("t", 0, 1) is None
+
+
+def test_catalog_kb_middle_page_has_cursors():
+    callbacks = _callbacks(main.catalog_page_kb("t", 5, 10))
+    assert callbacks == ["cat:t:0", "cat:t:4", "cat:noop", "cat:t:6", "cat:t:9"]
+
+
+def test_catalog_kb_edges_drop_unreachable_cursors():
+    assert _callbacks(main.catalog_page_kb("r", 0, 3)) == ["cat:noop", "cat:r:1", "cat:r:2"]
+    assert _callbacks(main.catalog_page_kb("g", 2, 3)) == ["cat:g:0", "cat:g:1", "cat:noop"]
+
+
+def test_did_you_mean_kb_one_button_per_suggestion():
+    kb = main.did_you_mean_kb([(7, "ИКПИ-22"), (1234, "Иванов И.И.")])
+    assert [btn.text for btn in _inline_buttons(kb)] == ["ИКПИ-22", "Иванов И.И."]
+    assert _callbacks(kb) == ["dym:7", "dym:1234"]
+    assert all(len(row) == 1 for row in kb.inline_keyboard)
+
+
 # --- HELP_TEXT ---------------------------------------------------------------
 
 def test_help_text_covers_main_sections():
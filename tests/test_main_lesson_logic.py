@@ -1,8 +1,9 @@
 """Тесты логики занятий: интервалы пар, разбор страницы дня, debug-дампы."""
 import asyncio
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 
 import main
+import parsers
 
 
 def _controller():
@@ -136,17 +137,6 @@ def test_parse_today_lesson_details_empty_html():
     assert _api()._parse_today_start_lesson_details("", "18.05.2026", 1) is None
 
 
-# --- delegаты парсеров в DebuggableBonchAPI ----------------------------------
-
-def test_api_week_parsers_delegate(load_fixture):
-    api = _api()
-    html = load_fixture("raspisanie_with_lessons.html")
-    assert api._get_week_safe(html) == 15
-    assert api._get_week_param_safe(html) == 38
-    assert api._extract_start_lesson_ids(html) == ("1001", "1002")
-    assert api._extract_lesson_ids_fallback(html) == ("1001", "1002")
-
-
 # --- save_debug_dump / _prune_debug_dumps ------------------------------------
 
 def test_save_debug_dump_disabled_returns_none(monkeypatch, tmp_path):
@@ -182,3 +172,357 @@ def test_save_debug_dump_prunes_old_files(monkeypatch, tmp_path):
         main.save_debug_dump("dump", f"content {i}")
     remaining = list((tmp_path / "debug_dumps").glob("*.html"))
     assert len(remaining) == 3
+
+
+# --- _click_tick: повторные клики после отметки --------------------------------
+
+class _ClickApi:
+    """API-заглушка: считает клики и проверки страницы."""
+
+    def __init__(self, start_ids_after_mark=(), fail_clicks=0):
+        self.clicks = 0
+        self.fail_clicks = fail_clicks
+        self.page_loads = 0
+        self.last_clicked_ids = ()
+        self._start_ids_after_mark = start_ids_after_mark
+
+    async def click_start_lesson(self, user_id=None):
+        self.clicks += 1
+        if self.clicks <= self.fail_clicks:
+            return 0
+        self.last_clicked_ids = ("1001",)
+        return 1
+
+    async def get_timetable_page(self, week_number=False):
+        self.page_loads += 1
+
+        class _Page:
+            start_lesson_ids = self._start_ids_after_mark
+        return _Page()
+
+
+class _Bot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, user_id, text, **kwargs):
+        self.sent.append(text)
+
+
+def _run_ticks(api, minutes, monkeypatch, verify_min=20):
+    monkeypatch.setattr(main.lesson_controller, "LESSON_VERIFY_INTERVAL_MIN", verify_min)
+    bot = _Bot()
+    controller = main.LessonController(api=api, bot=bot, user_id=1)
+    controller.click_offset_sec = 0  # разброс первого клика проверяется отдельно
+
+    async def scenario():
+        for minute in minutes:
+            await controller._click_tick(datetime(2026, 5, 18, 9, minute))
+
+    asyncio.run(scenario())
+    return bot
+
+
+def test_click_tick_stops_after_confirmed_mark(monkeypatch):
+    api = _ClickApi()
+    bot = _run_ticks(api, range(0, 15), monkeypatch, verify_min=0)
+    assert api.clicks == 1
+    assert api.page_loads == 0
+    assert len(bot.sent) == 1
+
+
+def test_click_tick_verifies_rarely_and_keeps_mark(monkeypatch):
+    api = _ClickApi()
+    _run_ticks(api, range(0, 45), monkeypatch, verify_min=20)
+    # Клик в 9:00, проверки в 9:20 и 9:40; кнопка не вернулась — кликов больше нет.
+    assert api.clicks == 1
+    assert api.page_loads == 2
+
+
+def test_click_tick_reclicks_when_mark_lost(monkeypatch):
+    api = _ClickApi(start_ids_after_mark=("1001",))
+    bot = _run_ticks(api, [0, 10, 20], monkeypatch, verify_min=20)
+    assert api.clicks == 2
+    # Сообщение об отметке — одно на пару.
+    assert len(bot.sent) == 1
+
+
+# --- разброс первого клика и ретраи --------------------------------------------
+
+def test_click_offset_is_deterministic_and_within_spread(monkeypatch):
+    monkeypatch.setattr(main.lesson_controller, "LESSON_CLICK_SPREAD_SEC", 120)
+    monkeypatch.setattr(main.lesson_controller, "LESSON_CLICK_DEADLINE_MIN", 10)
+    offsets = [main.lesson_controller.click_offset_sec(user_id) for user_id in range(200)]
+    assert offsets == [main.lesson_controller.click_offset_sec(user_id) for user_id in range(200)]
+    assert all(0 <= offset < 120 for offset in offsets)
+    # Пользователи разъезжаются по окну, а не кучкуются в начале.
+    assert min(offsets) < 20 and max(offsets) > 100
+    # Разброс не съедает дедлайн: не больше его половины.
+    monkeypatch.setattr(main.lesson_controller, "LESSON_CLICK_DEADLINE_MIN", 2)
+    assert all(main.lesson_controller.click_offset_sec(user_id) < 60 for user_id in range(200))
+
+
+def test_first_click_waits_for_user_offset_and_retries_with_backoff(monkeypatch):
+    monkeypatch.setattr(main.lesson_controller, "LESSON_CLICK_RETRY_SEC", 10)
+    metric = main.monitoring.TimeToMarkStats()
+    monkeypatch.setattr(main.monitoring, "time_to_mark", metric)
+    api = _ClickApi(fail_clicks=2)
+    controller = main.LessonController(api=api, bot=_Bot(), user_id=1)
+    controller.click_offset_sec = 90
+
+    async def scenario():
+        seconds = 0
+        while controller._marked_lesson_key is None and seconds < 600:
+            now_dt = datetime(2026, 5, 18, 9, 0) + timedelta(seconds=seconds)
+            await controller._click_tick(now_dt)
+            seconds += controller._seconds_until_next_tick(now_dt, False, 10)
+        return seconds
+
+    asyncio.run(scenario())
+    # 9:01:30 — сдвиг пользователя, затем ретраи через 10 и 20 с.
+    assert api.clicks == 3
+    assert metric.last_by_user[1] == (120.0, 3)
+    assert metric.snapshot()["missed_deadline"] == 0
+
+
+def test_click_retry_delay_is_clamped_to_deadline(monkeypatch):
+    monkeypatch.setattr(main.lesson_controller, "LESSON_CLICK_RETRY_SEC", 15)
+    controller = _controller()
+    deadline = datetime(2026, 5, 18, 9, 10)
+    controller._click_attempts = 5
+    assert controller._click_retry_delay(datetime(2026, 5, 18, 9, 0), deadline) == 60
+    assert controller._click_retry_delay(datetime(2026, 5, 18, 9, 9, 30), deadline) == 30
+    # После дедлайна — прежний минутный такт.
+    assert controller._click_retry_delay(datetime(2026, 5, 18, 9, 20), deadline) == 60
+
+
+# --- план дня ------------------------------------------------------------------
+
+class _PlanApi:
+    def __init__(self, html):
+        self.page_loads = 0
+        self._page = parsers.parse_lk_timetable_page(html)
+
+    async def get_timetable_page(self, week_number=False):
+        self.page_loads += 1
+        return self._page
+
+
+def test_day_plan_keeps_only_todays_pairs(load_fixture):
+    api = _PlanApi(load_fixture("raspisanie_today.html"))
+    controller = main.LessonController(api=api, bot=None, user_id=1)
+
+    async def scenario():
+        await controller._ensure_day_plan(datetime(2026, 5, 18, 7, 0))
+        await controller._ensure_day_plan(datetime(2026, 5, 18, 12, 0))
+
+    asyncio.run(scenario())
+    assert sorted(controller._day_plan) == [2, 4]  # 3-я и 5-я пары
+    assert api.page_loads == 1  # план строится раз в сутки
+    assert controller._slot_planned(2) and not controller._slot_planned(0)
+
+
+def test_day_plan_sunday_skips_lk(load_fixture):
+    api = _PlanApi(load_fixture("raspisanie_today.html"))
+    controller = main.LessonController(api=api, bot=None, user_id=1)
+    asyncio.run(controller._ensure_day_plan(datetime(2026, 5, 17, 8, 0)))  # воскресенье
+    assert controller._day_plan == {}
+    assert api.page_loads == 0
+
+
+def test_sleep_until_next_planned_event():
+    controller = _controller()
+    controller._day_plan = {2: {}}  # только 3-я пара, 13:00
+    # 8:00, напоминание за 10 мин -> следующее событие в 12:50, но не дольше лимита.
+    delay = controller._seconds_until_next_tick(datetime(2026, 5, 18, 8, 0), True, 10)
+    assert delay == main.lesson_controller.DAY_PLAN_MAX_SLEEP_SEC
+    assert controller._seconds_until_next_tick(datetime(2026, 5, 18, 12, 45), True, 10) == 300
+    # Внутри запланированной пары — минутный тик.
+    assert controller._seconds_until_next_tick(datetime(2026, 5, 18, 13, 5), True, 10) == 60
+    # Без плана — прежний минутный тик.
+    controller._day_plan = None
+    assert controller._seconds_until_next_tick(datetime(2026, 5, 18, 8, 0), True, 10) == 60
+
+
+# --- регистрация в центральном планировщике -------------------------------------
+
+def test_start_and_stop_lesson_use_central_scheduler(monkeypatch):
+    scheduler = main.lesson_scheduler.LessonScheduler()
+    monkeypatch.setattr(main.lesson_scheduler, "scheduler", scheduler)
+    controller = _controller()
+
+    async def scenario():
+        # Тик не нужен: ставим контроллер в очередь и сразу снимаем.
+        monkeypatch.setattr(controller, "tick", lambda: asyncio.sleep(0))
+        first = await controller.start_lesson()
+        again = await controller.start_lesson()
+        scheduled = scheduler.is_scheduled(controller)
+        await controller.stop_lesson(1)
+        unscheduled = not scheduler.is_scheduled(controller)
+        await scheduler.stop()
+        return first, again, scheduled, unscheduled
+
+    first, again, scheduled, unscheduled = asyncio.run(scenario())
+    assert first == "Автокликалка запущена."
+    assert again == "Автокликалка уже запущена."
+    assert scheduled and unscheduled
+    assert controller.is_running is False
+    assert asyncio.run(controller.tick()) is None  # остановленный контроллер не тикает
+
+
+# --- прогрев сессии перед парой ----------------------------------------------------
+
+class _WarmApi:
+    def __init__(self, alive):
+        self.alive = alive
+        self.checks = 0
+
+    async def check_session(self):
+        self.checks += 1
+        return self.alive
+
+
+def _warm_controller(monkeypatch, api, relogged=True):
+    monkeypatch.setattr(main.lesson_controller, "LESSON_WARMUP_MIN", 3)
+    controller = main.LessonController(api=api, bot=None, user_id=1)
+    controller._day_plan = {2: {}}  # 3-я пара, 13:00
+    controller.reauths = 0
+
+    async def fake_reauth():
+        controller.reauths += 1
+        return relogged
+    monkeypatch.setattr(controller, "reauthenticate", fake_reauth)
+    return controller
+
+
+def test_warm_up_checks_session_once_before_planned_pair(monkeypatch):
+    api = _WarmApi(alive=True)
+    controller = _warm_controller(monkeypatch, api)
+
+    async def scenario():
+        await controller._warm_up_before_pair(datetime(2026, 5, 18, 12, 50))  # рано
+        await controller._warm_up_before_pair(datetime(2026, 5, 18, 12, 57))
+        await controller._warm_up_before_pair(datetime(2026, 5, 18, 12, 58))
+        await controller._warm_up_before_pair(datetime(2026, 5, 18, 10, 43))  # 2-й пары нет в плане
+
+    asyncio.run(scenario())
+    assert api.checks == 1
+    assert controller.reauths == 0
+
+
+def test_warm_up_relogins_expired_session_ahead_of_pair(monkeypatch):
+    monkeypatch.setattr(main.reauth_service, "coordinator", main.reauth_service.ReauthCoordinator())
+    api = _WarmApi(alive=False)
+    controller = _warm_controller(monkeypatch, api)
+
+    async def scenario():
+        await controller._warm_up_before_pair(datetime(2026, 5, 18, 12, 58))
+        # Переавторизация ставится в очередь, тик её не ждёт.
+        await controller._reauth_task
+
+    asyncio.run(scenario())
+    assert api.checks == 1
+    assert controller.reauths == 1
+
+
+def test_warm_up_event_scheduled_before_pair(monkeypatch):
+    controller = _warm_controller(monkeypatch, _WarmApi(alive=True))
+    # Напоминания выключены: ближайшее событие — прогрев в 12:57.
+    assert controller._seconds_until_next_tick(datetime(2026, 5, 18, 12, 50), False, 10) == 420
+
+
+# --- отказ ЛК в переавторизации ----------------------------------------------------
+
+class _ExpiredApi:
+    """Каждая страница расписания — «сессия истекла»."""
+
+    def __init__(self):
+        self.pages = 0
+
+    async def get_timetable_page(self):
+        self.pages += 1
+        return parsers.LKTimetablePage(parsers.LK_ERR_MSG)
+
+
+class _Bot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, user_id, text):
+        self.sent.append((user_id, text))
+
+
+def test_rejected_reauth_backs_off_then_stops(monkeypatch):
+    monkeypatch.setattr(main.reauth_service, "coordinator", main.reauth_service.ReauthCoordinator())
+    monkeypatch.setattr(main.lesson_controller, "REAUTH_REJECT_BACKOFF_SEC", 60)
+    monkeypatch.setattr(main.lesson_controller, "REAUTH_MAX_REJECTIONS", 3)
+    monday = main.lesson_controller.pytz.timezone("Europe/Moscow").localize(datetime(2026, 5, 18, 8, 0))
+
+    class _Monday(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return monday
+    monkeypatch.setattr(main.lesson_controller, "datetime", _Monday)
+    bot = _Bot()
+    controller = main.LessonController(api=_ExpiredApi(), bot=bot, user_id=1)
+    controller.is_running = True
+    logins = []
+
+    async def rejected_reauth():
+        logins.append(1)
+        return False
+    monkeypatch.setattr(controller, "reauthenticate", rejected_reauth)
+
+    async def scenario():
+        delays = []
+        for _ in range(8):
+            delay = await controller.tick()
+            delays.append(delay)
+            if delay is None:
+                break
+            if controller._reauth_task is not None:
+                await asyncio.gather(controller._reauth_task, return_exceptions=True)
+        return delays
+
+    delays = asyncio.run(scenario())
+    poll = main.lesson_controller.REAUTH_POLL_SEC
+    # Отказ — пауза 60, 120 с вместо повтора через REAUTH_POLL_SEC; третий — стоп и /login.
+    assert delays == [poll, 60, poll, 120, poll, None]
+    assert len(logins) == 3
+    assert controller.is_running is False
+    assert bot.sent == [(1, main.lesson_controller.SESSION_EXPIRED_TEXT)]
+
+
+def test_successful_reauth_resets_rejections(monkeypatch):
+    controller = main.LessonController(api=None, bot=_Bot(), user_id=1)
+    controller._reauth_rejections = 2
+
+    async def scenario():
+        controller._reauth_task = asyncio.get_running_loop().create_future()
+        controller._reauth_task.set_result(True)
+        controller.is_running = True
+        monkeypatch.setattr(main.reauth_service.coordinator, "pause_remaining", lambda: 5.0)
+        return await controller.tick()
+
+    assert asyncio.run(scenario()) == 5.0
+    assert controller._reauth_rejections == 0
+
+
+def test_group_undefined_page_notifies_and_stops(monkeypatch):
+    monkeypatch.setattr(main.reauth_service, "coordinator", main.reauth_service.ReauthCoordinator())
+    monday = main.lesson_controller.pytz.timezone("Europe/Moscow").localize(datetime(2026, 5, 18, 8, 0))
+
+    class _Monday(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return monday
+    monkeypatch.setattr(main.lesson_controller, "datetime", _Monday)
+    bot = _Bot()
+    api = _PlanApi("<html><body>Ваша группа не определена</body></html>")
+    controller = main.LessonController(api=api, bot=bot, user_id=1)
+    controller.is_running = True
+
+    assert asyncio.run(controller.tick()) is None
+    assert controller.is_running is False
+    assert len(bot.sent) == 1 and "не назначена учебная группа" in bot.sent[0][1]
+    assert controller._day_plan is None  # пустой план не строится
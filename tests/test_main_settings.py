@@ -3,8 +3,12 @@
 Используют фикстуру temp_db — временную in-memory БД, чтобы не трогать
 настоящий users.db.
 """
+from datetime import datetime, timedelta, timezone
+
 import main
 
+MSK = timezone(timedelta(hours=3))
+
 
 def _register(conn, user_id: int) -> None:
     conn.execute(
@@ -82,3 +86,26 @@ def test_set_autoclick_re_enabled(temp_db):
     main.set_autoclick_enabled(8, False)
     main.set_autoclick_enabled(8, True)
     assert main.get_autoclick_enabled(8) is True
+
+
+# --- next_lesson_at ------------------------------------------------------------
+
+def test_user_ids_ordered_by_next_lesson(temp_db):
+    for user_id in (1, 2, 3):
+        _register(temp_db, user_id)
+    main.db.set_next_lesson_at(2, "2026-05-18T09:00:00+03:00")
+    main.db.set_next_lesson_at(3, "2026-05-18T13:00:00+03:00")
+    now = datetime(2026, 5, 18, 8, 0, tzinfo=MSK)
+    # У пользователя 1 данных нет — в конце очереди.
+    assert main.db.get_user_ids_by_next_lesson(now) == [2, 3, 1]
+
+
+def test_stale_next_lesson_projected_by_weeks(temp_db):
+    for user_id in (1, 2, 3, 4):
+        _register(temp_db, user_id)
+    # Бот простоял: сохранённые времена — прошлые недели.
+    main.db.set_next_lesson_at(1, "2026-05-04T13:00:00+03:00")   # пн 13:00
+    main.db.set_next_lesson_at(2, "2026-05-12T09:00:00+03:00")   # вт 09:00
+    main.db.set_next_lesson_at(3, "2026-05-11T09:00:00+03:00")   # пн 09:00 — уже прошла
+    now = datetime(2026, 5, 18, 10, 0, tzinfo=MSK)                # пн 10:00
+    assert main.db.get_user_ids_by_next_lesson(now) == [1, 2, 3, 4]
@@ -0,0 +1,110 @@
+"""Тесты пула процессов разбора расписаний групп (parse_pool)."""
+import asyncio
+import pickle
+import sys
+import types
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+
+import parse_pool
+import parsers
+
+FIRST_DAY = datetime(2025, 9, 1)
+
+
+def test_cpu_quota_reads_cgroup_v2(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_pool.os, "sched_getaffinity", lambda pid: set(range(8)))
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert parse_pool.cpu_quota(tmp_path) == 2
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert parse_pool.cpu_quota(tmp_path) == 8
+
+
+def test_cpu_quota_reads_cgroup_v1_and_defaults(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_pool.os, "sched_getaffinity", lambda pid: set(range(4)))
+    assert parse_pool.cpu_quota(tmp_path) == 4
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("50000")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000")
+    assert parse_pool.cpu_quota(tmp_path) == 1
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1")
+    assert parse_pool.cpu_quota(tmp_path) == 4
+
+
+def test_compact_form_expands_to_full_timetable(load_fixture):
+    html = load_fixture("group_timetable.html")
+    pairs = parsers.parse_timetable_pairs(html)
+    lessons = parsers.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY)
+    assert parsers.expand_timetable_pairs(pairs, "ИКПИ-22", FIRST_DAY) == lessons
+    assert len(pickle.dumps(pairs)) < len(pickle.dumps(lessons))
+    assert parsers.parse_timetable_pairs("<html></html>") == parsers.TIMETABLE_NOT_FOUND
+
+
+def test_pool_parse_matches_inline(monkeypatch, load_fixture):
+    monkeypatch.setattr(parse_pool, "PARSE_POOL_WORKERS", 1)
+    monkeypatch.setattr(parse_pool, "_executor", None)
+    html = load_fixture("group_timetable.html")
+
+    async def scenario():
+        try:
+            return (
+                await parse_pool.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY),
+                await parse_pool.parse_timetable_table("<html></html>", "ИКПИ-22", FIRST_DAY),
+            )
+        finally:
+            parse_pool.shutdown()
+
+    lessons, missing = asyncio.run(scenario())
+    assert lessons == parsers.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY)
+    assert missing == parsers.TIMETABLE_NOT_FOUND
+
+
+def test_zero_workers_parses_inline(monkeypatch, load_fixture):
+    monkeypatch.setattr(parse_pool, "PARSE_POOL_WORKERS", 0)
+    monkeypatch.setattr(parse_pool, "_executor", None)
+    html = load_fixture("group_timetable.html")
+
+    lessons = asyncio.run(parse_pool.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY))
+    assert lessons == parsers.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY)
+    assert parse_pool._executor is None
+
+
+def test_broken_pool_falls_back_inline_and_is_recreated(monkeypatch, load_fixture):
+    class _BrokenExecutor:
+        shut_down = False
+
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("воркер убит")
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = True
+
+    broken = _BrokenExecutor()
+    monkeypatch.setattr(parse_pool, "_executor", broken)
+    html = load_fixture("group_timetable.html")
+
+    lessons = asyncio.run(parse_pool.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY))
+    assert lessons == parsers.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY)
+    assert broken.shut_down
+    assert parse_pool._executor is None
+
+
+def test_pool_worker_does_not_import_bot(monkeypatch):
+    # spawn переимпортирует главный модуль процесса — при запуске через run.py
+    # воркер не должен поднимать ни aiogram, ни db.py (подключение к users.db).
+    entry = types.ModuleType("__main__")
+    entry.__file__ = str(Path(parse_pool.__file__).with_name("run.py"))
+    entry.__spec__ = None
+    monkeypatch.setitem(sys.modules, "__main__", entry)
+    monkeypatch.setattr(parse_pool, "PARSE_POOL_WORKERS", 1)
+    monkeypatch.setattr(parse_pool, "_executor", None)
+    try:
+        executor = parse_pool._get_executor()
+        modules = executor.submit(eval, "sorted(__import__('sys').modules)").result(timeout=60)
+    finally:
+        parse_pool.shutdown()
+
+    assert "parsers" in modules
+    assert "db" not in modules and "main" not in modules
+    assert not any(name == "aiogram" or name.startswith("aiogram.") for name in modules)
@@ -0,0 +1,72 @@
+"""Эквивалентность бэкендов разбора HTML (parsers.set_html_parser).
+
+Каждый парсер parsers.py на каждой фикстуре tests/fixtures должен давать
+одинаковый результат на html.parser и lxml — иначе смена HTML_PARSER молча
+поменяет поведение бота.
+"""
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+import parsers
+
+pytest.importorskip("lxml")
+
+FIXTURES = sorted(path.name for path in (Path(__file__).parent / "fixtures").glob("*.html"))
+
+
+def _page_fields(html):
+    page = parsers.LKTimetablePage(html)
+    parsers._fill_timetable_page(page)
+    return (page.week_number, page.week_param, page.start_lesson_ids, page.knop_ids, page.days)
+
+
+def _dom_only(html):
+    soup = parsers.make_soup(html)
+    return (parsers._week_param_from_soup(soup, html), parsers._start_lesson_ids_from_soup(soup))
+
+
+PARSER_FUNCTIONS = {
+    "parse_week_number": parsers.parse_week_number,
+    "parse_week_param": parsers.parse_week_param,
+    "extract_start_lesson_ids": parsers.extract_start_lesson_ids,
+    "extract_lesson_ids_fallback": parsers.extract_lesson_ids_fallback,
+    "lk_timetable_page": _page_fields,
+    "dom_only": _dom_only,
+    "parse_timetable_table": lambda html: parsers.parse_timetable_table(html, "ИКПИ-22", datetime(2025, 9, 1)),
+    "parse_message_rows": parsers.parse_message_rows,
+    "parse_total_message_pages": parsers.parse_total_message_pages,
+    "parse_recipients": parsers.parse_recipients,
+}
+
+
+@pytest.fixture
+def restore_backend():
+    backend = parsers.get_html_parser()
+    yield
+    parsers.set_html_parser(backend)
+
+
+@pytest.mark.parametrize("fixture_name", FIXTURES)
+@pytest.mark.parametrize("function_name", sorted(PARSER_FUNCTIONS))
+def test_backends_agree(fixture_name, function_name, load_fixture, restore_backend):
+    html = load_fixture(fixture_name)
+    parse = PARSER_FUNCTIONS[function_name]
+
+    parsers.set_html_parser("html.parser")
+    expected = parse(html)
+    parsers.set_html_parser("lxml")
+    assert parse(html) == expected
+
+
+def test_set_html_parser_falls_back_without_lxml(monkeypatch, restore_backend):
+    monkeypatch.setattr(parsers, "_lxml_available", lambda: False)
+    assert parsers.set_html_parser("lxml") == "html.parser"
+    assert parsers.set_html_parser("auto") == "html.parser"
+
+
+def test_set_html_parser_unknown_name_is_auto(restore_backend):
+    assert parsers.set_html_parser("html5lib") == "lxml"
+    assert parsers.set_html_parser("html.parser") == "html.parser"
+    assert parsers.get_html_parser() == "html.parser"
@@ -6,6 +6,8 @@
 """
 from datetime import datetime
 
+from bs4 import BeautifulSoup
+
 import parsers
 
 
@@ -105,6 +107,72 @@ def test_extract_start_lesson_ids_requires_button_text():
     assert parsers.extract_start_lesson_ids(html) == ()
 
 
+# --- быстрый путь open_zan/showweek против DOM -------------------------------
+
+_FAST_PATH_CASES = {
+    "single_quotes": "<a href='#' onclick='showweek(7)'><b>7</b></a><a onclick='open_zan(5, 7)'>Начать занятие</a>",
+    "nested_text": '<a onclick="open_zan(11, 3)"><span>Начать</span> <i>занятие</i></a>',
+    "entity_in_onclick": '<a onclick="open_zan(&#49;2, 4)">Начать&#32;занятие</a>',
+    "gt_in_attribute": '<a title="a>b" onclick="open_zan(13, 5)">Начать занятие</a>',
+    "uppercase_tag": '<A HREF="#" ONCLICK="showweek(9)">&nbsp;<B>9</B></A>',
+    "br_is_not_bold": '<a onclick="showweek(8)">8<br/></a><a onclick="showweek(9)"><b>9</b></a>',
+    "update_zan_only": '<a onclick="update_zan(14, 6)">Кнопка появится. Обновить.</a>',
+    "open_zan_other_text": '<a onclick="open_zan(15, 6)">Открыть</a>',
+    "no_markup": "<html><body><h3>Неделя №1</h3></body></html>",
+    "header_markup": "<H2 class='w'>Неделя <b>№&nbsp;4</b></H2><h3>№ 9</h3>",
+    "header_without_number": "<h3>Расписание</h3><p>Неделя 5</p>",
+}
+
+
+def _fast_path_pages(load_fixture):
+    pages = {name: load_fixture(name) for name in (
+        "raspisanie_with_lessons.html", "raspisanie_no_candidates.html", "raspisanie_today.html",
+    )}
+    pages.update(_FAST_PATH_CASES)
+    return pages
+
+
+def test_fast_path_matches_dom_on_fixtures_and_edge_cases(load_fixture):
+    """Дифференциальный тест: быстрый путь (с DOM-подстраховкой) == чистый DOM."""
+    for name, html in _fast_path_pages(load_fixture).items():
+        soup = BeautifulSoup(html, "html.parser")
+        assert parsers.extract_start_lesson_ids(html) == parsers._start_lesson_ids_from_soup(soup), name
+        assert parsers.parse_week_param(html) == parsers._week_param_from_soup(soup, html), name
+        assert parsers.parse_week_number(html) == parsers._week_number_from_soup(soup), name
+
+
+def test_fast_path_decides_fixtures_without_dom(monkeypatch, load_fixture):
+    def _no_dom(*args, **kwargs):
+        raise AssertionError("DOM не должен строиться")
+
+    monkeypatch.setattr(parsers, "BeautifulSoup", _no_dom)
+    html = load_fixture("raspisanie_with_lessons.html")
+    assert parsers.extract_start_lesson_ids(html) == ("1001", "1002")
+    assert parsers.parse_week_param(html) == 38
+    assert parsers.extract_start_lesson_ids(load_fixture("raspisanie_no_candidates.html")) == ()
+    assert parsers.parse_week_number(html) == 15
+
+
+def test_timetable_page_click_fields_without_dom(monkeypatch, load_fixture):
+    monkeypatch.setattr(parsers, "page_memo", parsers.PageParseMemo(max_entries=4))
+    soups = []
+    real_soup = parsers.BeautifulSoup
+    monkeypatch.setattr(parsers, "BeautifulSoup", lambda *a, **kw: soups.append(1) or real_soup(*a, **kw))
+
+    page = parsers.parse_lk_timetable_page(load_fixture("raspisanie_with_lessons.html"))
+    assert (page.week_number, page.week_param, page.lesson_ids) == (15, 38, ("1001", "1002"))
+    assert soups == []
+    # Строки дня и knop_ids — из одного DOM, построенного по требованию.
+    page.days, page.knop_ids
+    assert len(soups) == 1
+
+
+def test_fast_path_undecided_falls_back_to_dom():
+    # Разметка есть, но быстрый путь не нашёл значения — решает DOM.
+    assert parsers._start_lesson_ids_fast(_FAST_PATH_CASES["open_zan_other_text"]) is None
+    assert parsers._week_param_fast('<a onclick="showweek(3)">3</a>') is None
+
+
 # --- extract_lesson_ids_fallback ---------------------------------------------
 
 def test_extract_lesson_ids_fallback_from_knop_ids(load_fixture):
@@ -117,6 +185,83 @@ def test_extract_lesson_ids_fallback_no_knop_returns_empty(load_fixture):
     assert parsers.extract_lesson_ids_fallback(html) == ()
 
 
+# --- parse_lk_timetable_page -------------------------------------------------
+
+def test_parse_lk_timetable_page_matches_single_field_parsers(load_fixture):
+    # Один разбор даёт то же, что отдельные парсеры на том же HTML.
+    for name in ("raspisanie_with_lessons.html", "raspisanie_no_candidates.html", "raspisanie_today.html"):
+        html = load_fixture(name)
+        page = parsers.parse_lk_timetable_page(html)
+        assert page.week_number == parsers.parse_week_number(html)
+        assert page.week_param == parsers.parse_week_param(html)
+        assert page.start_lesson_ids == parsers.extract_start_lesson_ids(html)
+        assert page.knop_ids == parsers.extract_lesson_ids_fallback(html)
+
+
+def test_parse_lk_timetable_page_lesson_details(load_fixture):
+    page = parsers.parse_lk_timetable_page(load_fixture("raspisanie_today.html"))
+    details = page.lesson_details("18.05.2026", 3)
+    assert details["subject"] == "Базы данных"
+    assert details["rasp"] == "7788"
+    assert page.lesson_details("18.05.2026", 7) is None
+    assert page.lesson_details("01.01.2000", 3) is None
+
+
+def test_parse_lk_timetable_page_error_flags():
+    expired = parsers.parse_lk_timetable_page("<html>index.php?login=no</html>")
+    assert expired.session_expired and expired.lesson_ids == ()
+    assert parsers.parse_lk_timetable_page(parsers.LK_ERR_MSG).session_expired
+    no_group = parsers.parse_lk_timetable_page("<html>Ваша группа не определена</html>")
+    assert no_group.group_undefined and not no_group.session_expired
+
+
+def test_parse_lk_timetable_page_empty_html():
+    page = parsers.parse_lk_timetable_page("")
+    assert page.week_param == 0 and page.lesson_ids == () and page.days == {}
+
+
+def test_parse_lk_timetable_page_memoized_by_body(monkeypatch, load_fixture):
+    monkeypatch.setattr(parsers, "page_memo", parsers.PageParseMemo(max_entries=4))
+    soups = []
+    real_soup = parsers.BeautifulSoup
+    monkeypatch.setattr(parsers, "BeautifulSoup", lambda *a, **kw: soups.append(1) or real_soup(*a, **kw))
+    html = load_fixture("raspisanie_with_lessons.html")
+
+    first = parsers.parse_lk_timetable_page(html)
+    # Та же страница новым объектом строки (свежий ответ ЛК) — без разбора.
+    second = parsers.parse_lk_timetable_page("".join(list(html)))
+
+    assert second is first
+    # Поля клика решены быстрым путём; DOM строится один раз — для строк дня.
+    assert len(soups) == 0
+    assert first.days == {} and second.knop_ids == ("1001", "1002")
+    assert len(soups) == 1
+    stats = parsers.page_memo.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert parsers.page_memo.saved_sec > 0
+
+
+def test_parse_memo_skips_error_pages_and_evicts_lru(monkeypatch, load_fixture):
+    monkeypatch.setattr(parsers, "page_memo", parsers.PageParseMemo(max_entries=1))
+    parsers.parse_lk_timetable_page(parsers.LK_ERR_MSG)
+    assert parsers.page_memo.stats()["entries"] == 0
+
+    today = load_fixture("raspisanie_today.html")
+    first = parsers.parse_lk_timetable_page(today)
+    parsers.parse_lk_timetable_page(load_fixture("raspisanie_no_candidates.html"))
+    assert parsers.parse_lk_timetable_page(today) is not first
+    assert parsers.page_memo.stats()["entries"] == 1
+
+
+def test_parse_lk_timetable_page_next_lesson_start(load_fixture):
+    from datetime import time
+    intervals = [(time(9 + i, 0), time(9 + i, 50)) for i in range(7)]
+    page = parsers.parse_lk_timetable_page(load_fixture("raspisanie_today.html"))
+    # 18.05 после конца 3-й пары (11:50) ближайшая — 5-я, 13:00.
+    assert page.next_lesson_start(datetime(2026, 5, 18, 12, 0), intervals) == datetime(2026, 5, 18, 13, 0)
+    assert page.next_lesson_start(datetime(2030, 1, 1), intervals) is None
+
+
 # --- parse_timetable_table ---------------------------------------------------
 
 FIRST_DAY = datetime(2026, 2, 3)
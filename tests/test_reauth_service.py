@@ -0,0 +1,123 @@
+"""Тесты координатора переавторизаций (reauth_service.ReauthCoordinator):
+дедупликация, лимит параллелизма, пауза при массовом истечении сессий."""
+import asyncio
+
+from reauth_service import LoginRejected, ReauthCoordinator
+
+
+def _coordinator(**kwargs):
+    params = dict(concurrency=2, login_interval_sec=0, burst=1,
+                  storm_threshold=3, storm_window_sec=60, pause_sec=0.05, max_pause_sec=0.2)
+    params.update(kwargs)
+    return ReauthCoordinator(**params)
+
+
+def test_concurrent_reauth_for_same_user_is_deduplicated():
+    coordinator = _coordinator()
+    calls = []
+
+    async def login():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return True
+
+    async def scenario():
+        return await asyncio.gather(*(coordinator.reauthenticate(1, login) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [True] * 5
+    assert len(calls) == 1
+
+
+def test_logins_respect_concurrency_cap():
+    coordinator = _coordinator(concurrency=2)
+    gauge = {"now": 0, "max": 0}
+
+    def make_login():
+        async def login():
+            gauge["now"] += 1
+            gauge["max"] = max(gauge["max"], gauge["now"])
+            await asyncio.sleep(0.01)
+            gauge["now"] -= 1
+            return True
+        return login
+
+    async def scenario():
+        await asyncio.gather(*(coordinator.reauthenticate(uid, make_login()) for uid in range(6)))
+
+    asyncio.run(scenario())
+    assert gauge["max"] == 2
+
+
+def test_mass_expiry_trips_breaker_and_known_users_do_not_retrip():
+    coordinator = _coordinator(storm_threshold=3)
+    coordinator.note_expired(1)
+    coordinator.note_expired(1)
+    coordinator.note_expired(2)
+    assert coordinator.pause_remaining() == 0
+    coordinator.note_expired(3)
+    assert coordinator.tripped and coordinator.pause_remaining() > 0
+    assert coordinator.trips == 1
+
+    async def scenario():
+        async def login():
+            return True
+        # Переавторизация ждёт конца паузы; успешная проба закрывает предохранитель.
+        return await coordinator.reauthenticate(1, login)
+
+    assert asyncio.run(scenario()) is True
+    assert not coordinator.tripped
+    # Оставшиеся из шторма пользователи ещё не переавторизованы — новый шторм не открывают.
+    for user_id in (2, 3, 2, 3):
+        coordinator.note_expired(user_id)
+    assert coordinator.trips == 1
+
+
+def test_failed_probe_reopens_breaker_with_longer_pause():
+    coordinator = _coordinator(storm_threshold=1, pause_sec=0.02, max_pause_sec=1)
+    coordinator.note_expired(1)
+
+    async def scenario():
+        async def login():
+            return False
+        return await coordinator.reauthenticate(1, login)
+
+    assert asyncio.run(scenario()) is False
+    assert coordinator.tripped and coordinator.trips == 2
+    assert 0.02 < coordinator.pause_remaining() <= 0.04
+
+
+def test_rejected_probe_keeps_breaker_and_next_user_probes():
+    """Отказ в данных входа у пробы — не сбой ЛК: пауза не растёт, пробует следующий."""
+    coordinator = _coordinator(storm_threshold=2, pause_sec=0.02, max_pause_sec=1)
+    coordinator.note_expired(1)
+    coordinator.note_expired(2)
+    attempts = []
+
+    def make_login(user_id, result):
+        async def login():
+            attempts.append(user_id)
+            if result is LoginRejected:
+                raise LoginRejected("неверный пароль")
+            return result
+        return login
+
+    async def scenario():
+        rejected = await coordinator.reauthenticate(1, make_login(1, LoginRejected))
+        state = (coordinator.tripped, coordinator.trips, coordinator.pause_remaining())
+        relogged = await coordinator.reauthenticate(2, make_login(2, True))
+        return rejected, state, relogged
+
+    rejected, (tripped, trips, pause), relogged = asyncio.run(scenario())
+    assert rejected is False
+    assert tripped and trips == 1 and pause == 0
+    assert relogged is True and not coordinator.tripped
+    assert attempts == [1, 2]
+
+
+def test_rejected_login_outside_storm_is_false():
+    coordinator = _coordinator()
+
+    async def login():
+        raise LoginRejected("неверный пароль")
+
+    assert asyncio.run(coordinator.reauthenticate(1, login)) is False
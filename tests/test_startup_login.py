@@ -0,0 +1,66 @@
+"""Тесты стартового автологина (main.auto_login_all_users): порядок по
+ближайшей паре, восстановление из кук без логина, прогресс в статус-файле.
+
+Сеть не нужна: restore_lk_session / auto_login_user / auto_start_lesson
+подменены заглушками.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import main
+
+
+def _register(conn, user_id, next_lesson_at=None):
+    conn.execute(
+        "INSERT INTO users (user_id, email, password, next_lesson_at) VALUES (?, ?, ?, ?)",
+        (user_id, "user@sut.ru", "pw", next_lesson_at),
+    )
+    conn.commit()
+
+
+def test_startup_pipeline_orders_by_next_lesson(monkeypatch, temp_db, tmp_path):
+    _register(temp_db, 1)
+    now = datetime.now(timezone.utc)
+    _register(temp_db, 2, (now + timedelta(hours=1)).isoformat())
+    _register(temp_db, 3, (now + timedelta(hours=2)).isoformat())
+    status_file = tmp_path / "startup.json"
+    calls = []
+
+    async def fake_restore(user_id):
+        calls.append(("restore", user_id))
+        return user_id == 3
+
+    async def fake_login(user_id, try_restore=True):
+        calls.append(("login", user_id))
+        return user_id != 1
+
+    async def fake_start(user_id):
+        calls.append(("start", user_id))
+
+    monkeypatch.setattr(main, "restore_lk_session", fake_restore)
+    monkeypatch.setattr(main, "auto_login_user", fake_login)
+    monkeypatch.setattr(main, "auto_start_lesson", fake_start)
+    monkeypatch.setattr(main, "LK_STARTUP_WORKERS", 1)
+    monkeypatch.setattr(main, "LK_LOGIN_DELAY_SEC", 0)
+    monkeypatch.setattr(main, "LK_LOGIN_JITTER_SEC", 0)
+    monkeypatch.setattr(main, "STARTUP_STATUS_FILE", status_file)
+
+    asyncio.run(main.auto_login_all_users())
+
+    assert [user_id for kind, user_id in calls if kind == "restore"] == [2, 3, 1]
+    assert ("login", 3) not in calls
+    assert [user_id for kind, user_id in calls if kind == "start"] == [2, 3]
+    status = json.loads(status_file.read_text(encoding="utf-8"))
+    assert status["finished"] is True
+    assert (status["ok"], status["restored"], status["failed"]) == (2, 1, 1)
+
+
+def test_startup_progress_eta():
+    progress = main.StartupProgress(4)
+    assert progress.eta_seconds() is None
+    progress.record(True)
+    progress.record(False)
+    snapshot = progress.snapshot()
+    assert (snapshot["done"], snapshot["ok"], snapshot["failed"]) == (2, 1, 1)
+    assert snapshot["eta_sec"] is not None and not snapshot["finished"]
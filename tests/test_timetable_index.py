@@ -0,0 +1,117 @@
+"""Инвертированные индексы расписания (timetable_index): запросы и порядок выдачи."""
+from datetime import datetime
+
+import pytest
+
+import timetable_index
+from TImetabels import BonchAPI
+from timetable_index import (
+    EXACT, GROUPS, PREFIX, ROOM, ROOMS, SUBJECTS, SUBSTRING, TEACHER, TEACHERS, TimetableIndex,
+)
+from timetable_model import GroupTimetable
+
+FIRST_DAY = datetime(2025, 9, 1)
+ALL_WEEKS = tuple(range(1, 18))
+
+SNAPSHOT = {
+    "ИКВ-11": GroupTimetable.from_pairs([
+        ("2", "10:45-12:20", 0, "Химия", "Практика", "Петров П.П.; Иванова А.А.", "512; Б22/1", ALL_WEEKS),
+        ("1", "09:00-10:35", 0, "Физика", "Лекция", "Иванов И.И.", "401; Б22/1", ALL_WEEKS[::2]),
+        ("3", "13:00-14:35", 3, "Матанализ", "Лекция", "Иванов И.И.", "401; Б22/1", (2, 3)),
+    ], "ИКВ-11", FIRST_DAY),
+    "ИКВ-12": GroupTimetable.from_pairs([
+        ("1", "09:00-10:35", 0, "Физика", "Лекция", "Иванов И.И.", "401; Б22/1", ALL_WEEKS[::2]),
+        ("4", "14:45-16:20", 1, "История", "Лекция", None, None, (1,)),
+    ], "ИКВ-12", FIRST_DAY),
+    # Группа, оставшаяся в старом формате (не свернулась при загрузке).
+    "ИКВ-13": [{
+        "ФИО преподавателя": "Иванов И.И.", "Номер кабинета": "ауд. 7", "Номер недели": 2,
+        "Номер дня недели": 0, "Время занятия": "09:00-10:35", "Предмет": "Физкультура",
+    }],
+}
+
+
+def _scan(timetable, key, query):
+    """Прежняя реализация: подстрока по всем занятиям + сортировка со strptime."""
+    found = [lesson for lessons in timetable.values() for lesson in lessons
+             if lesson.get(key) and query in lesson[key]]
+    return sorted(found, key=lambda x: (x['Номер недели'], x['Номер дня недели'],
+                                        BonchAPI.parse_lesson_time(x['Время занятия'])))
+
+
+@pytest.fixture
+def index():
+    return TimetableIndex(SNAPSHOT)
+
+
+@pytest.mark.parametrize("query", ["Иванов", "Иванов И.И.", "П.П.; Ив", "Нет такого"])
+def test_substring_matches_full_scan(index, query):
+    assert index.lookup(TEACHER, query) == _scan(SNAPSHOT, 'ФИО преподавателя', query)
+
+
+@pytest.mark.parametrize("query", ["401", "Б22", "ауд", "999"])
+def test_room_substring_matches_full_scan(index, query):
+    assert index.lookup(ROOM, query) == _scan(SNAPSHOT, 'Номер кабинета', query)
+
+
+def test_exact_matches_single_teacher_of_shared_pair(index):
+    lessons = index.lookup(TEACHER, "Иванова А.А.", EXACT)
+    assert {lesson["Предмет"] for lesson in lessons} == {"Химия"}
+    assert len(lessons) == len(ALL_WEEKS)
+    assert index.lookup(TEACHER, "Иванов", EXACT) == []
+
+
+def test_prefix_lookup(index):
+    subjects = {lesson["Предмет"] for lesson in index.lookup(TEACHER, "Иванов", PREFIX)}
+    assert subjects == {"Химия", "Физика", "Матанализ", "Физкультура"}
+    assert index.lookup(TEACHER, "Петров", PREFIX) == index.lookup(TEACHER, "Петров", SUBSTRING)
+    assert index.lookup(ROOM, "ауд", PREFIX)[0]["Предмет"] == "Физкультура"
+
+
+def test_week_filter_and_weeks(index):
+    assert index.weeks(TEACHER, "Иванов И.И.", EXACT) == sorted(set(ALL_WEEKS[::2]) | {2, 3})
+    week_two = index.lookup(TEACHER, "Иванов И.И.", EXACT, week=2)
+    assert [l["Предмет"] for l in week_two] == ["Физкультура", "Матанализ"]
+
+
+def test_week_lessons_sorted_by_day_and_time(index):
+    lessons = index.week_lessons(1)
+    keys = [(l["Номер дня недели"], BonchAPI.parse_lesson_time(l["Время занятия"])) for l in lessons]
+    assert keys == sorted(keys)
+    assert {l["Предмет"] for l in lessons} == {"Химия", "Физика", "История"}
+
+
+def test_names_and_empty_query(index):
+    assert index.names(TEACHER) == ["Иванов И.И.", "Иванова А.А.", "Петров П.П."]
+    assert index.lookup(TEACHER, "") == []
+    with pytest.raises(ValueError):
+        index.lookup(TEACHER, "Иванов", "regex")
+
+
+def test_catalog_counts_lessons_per_item(index):
+    catalog = index.catalog
+    weeks_odd = len(ALL_WEEKS[::2])
+    assert catalog.items(TEACHERS) == [
+        ("Иванов И.И.", 2 * weeks_odd + 2 + 1),
+        ("Иванова А.А.", len(ALL_WEEKS)),
+        ("Петров П.П.", len(ALL_WEEKS)),
+    ]
+    assert catalog.count(ROOMS, "401; Б22/1") == 2 * weeks_odd + 2
+    assert catalog.count(SUBJECTS, "История") == 1
+    assert catalog.items(GROUPS) == [("ИКВ-11", len(ALL_WEEKS) + weeks_odd + 2), ("ИКВ-12", weeks_odd + 1), ("ИКВ-13", 1)]
+
+
+def test_catalog_pages_are_slices(index):
+    catalog = index.catalog
+    assert catalog.page(TEACHERS, 0, per_page=2) == (catalog.items(TEACHERS)[:2], 0, 2)
+    assert catalog.page(TEACHERS, 1, per_page=2) == (catalog.items(TEACHERS)[2:], 1, 2)
+    # Номер страницы за пределами — последняя/первая.
+    assert catalog.page(TEACHERS, 99, per_page=2)[1] == 1
+    assert catalog.page(TEACHERS, -1, per_page=2)[1] == 0
+    assert catalog.page("unknown", 0) == ([], 0, 1)
+
+
+def test_for_snapshot_builds_once_per_snapshot():
+    first = timetable_index.for_snapshot(SNAPSHOT)
+    assert timetable_index.for_snapshot(SNAPSHOT) is first
+    assert timetable_index.for_snapshot(dict(SNAPSHOT)) is not first
@@ -0,0 +1,120 @@
+"""Компактное хранение расписания (timetable_model): маска недель, раскрытие, JSON."""
+import json
+from collections.abc import Mapping
+from datetime import datetime
+
+import pytest
+
+import parsers
+import timetable_model
+from formatting import filter_group_lessons_by_date
+from TImetabels import BonchAPI
+from timetable_model import GroupTimetable
+
+FIRST_DAY = datetime(2025, 9, 1)
+ALL_WEEKS = tuple(range(1, 18))
+
+# Две пары в один день (порядок страницы важен) и пара по нечётным неделям.
+PAIRS = [
+    ("1", "09:00-10:35", 0, "Физика", "Лекция", "Иванов И.И.", "ауд. 401", ALL_WEEKS),
+    ("2", "10:45-12:20", 0, "Химия", "Практика", "Петров П.П.; Сидоров С.С.", "ауд. 512", ALL_WEEKS),
+    ("3", "13:00-14:35", 2, "Матанализ", "Лекция", "Иванов И.И.", "ауд. 401", ALL_WEEKS[::2]),
+]
+
+
+@pytest.fixture
+def group():
+    return GroupTimetable.from_pairs(PAIRS, "ИКВ-11", FIRST_DAY)
+
+
+def test_weeks_mask_roundtrip():
+    assert timetable_model.mask_to_weeks(timetable_model.weeks_to_mask((3, 1, 17))) == [1, 3, 17]
+    assert timetable_model.weeks_to_mask((-1, 0)) == 1
+    assert timetable_model.mask_to_weeks(0) == []
+
+
+def test_view_matches_full_expansion(group):
+    expected = parsers.expand_timetable_pairs(PAIRS, "ИКВ-11", FIRST_DAY)
+    assert list(group) == expected
+    assert len(group) == len(expected)
+    assert group[0] == expected[0]
+    assert group[-1] == expected[-1]
+    assert group.weeks() == list(ALL_WEEKS)
+
+
+def test_view_matches_parsed_page(load_fixture):
+    html = load_fixture("group_timetable.html")
+    group = GroupTimetable.from_pairs(parsers.parse_timetable_pairs(html), "ИКПИ-22", FIRST_DAY)
+    assert group == parsers.parse_timetable_table(html, "ИКПИ-22", FIRST_DAY)
+
+
+def test_lesson_view_is_read_only_mapping(group):
+    lesson = group[0]
+    assert isinstance(lesson, Mapping)
+    assert list(lesson) == list(timetable_model.LESSON_KEY_ORDER)
+    assert lesson.get("Предмет") == "Физика"
+    assert lesson.get("Нет такого ключа", "—") == "—"
+    assert "ФИО преподавателя" in lesson
+    with pytest.raises(TypeError):
+        lesson["Предмет"] = "Химия"
+
+
+def test_strings_interned_across_groups():
+    teacher = "".join(["Иванов", " И.И."])
+    first = GroupTimetable.from_pairs(PAIRS, "ИКВ-11", FIRST_DAY)
+    second = GroupTimetable.from_pairs([PAIRS[0][:5] + (teacher,) + PAIRS[0][6:]], "ИКВ-12", FIRST_DAY)
+    assert second.records[0].teacher is first.records[0].teacher
+    assert not hasattr(first.records[0], "__dict__")
+
+
+def test_dates_derived_from_first_day(group):
+    lesson = next(iter(group))
+    assert (lesson["Номер недели"], lesson["Число"]) == (1, "2025.09.08")
+
+
+def test_teacher_and_classroom_lookup_match_expanded(group):
+    expanded = {"ИКВ-11": list(group)}
+    compact = {"ИКВ-11": group}
+    for teacher in ("Иванов", "Сидоров", "Нет такого"):
+        assert BonchAPI.teacher_timetable(compact, teacher) == BonchAPI.teacher_timetable(expanded, teacher)
+    assert BonchAPI.classroom_timetable(compact, "512") == BonchAPI.classroom_timetable(expanded, "512")
+
+
+def test_filter_by_date_accepts_compact_view(group):
+    lessons = filter_group_lessons_by_date(group, "2025.09.08")
+    assert [lesson["Предмет"] for lesson in lessons] == ["Физика", "Химия"]
+
+
+def test_compact_json_roundtrip_and_size(tmp_path, group):
+    path = tmp_path / "timetable.json"
+    BonchAPI.save_to_json({"ИКВ-11": group}, str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["format"] == timetable_model.COMPACT_FORMAT
+    assert data["first_day"] == "2025-09-01"
+
+    loaded = BonchAPI.load_from_json(str(path))
+    assert loaded == {"ИКВ-11": group}
+
+    legacy_size = len(json.dumps({"ИКВ-11": [dict(lesson) for lesson in group]}, indent=4, ensure_ascii=False))
+    assert len(path.read_text(encoding="utf-8")) * 10 < legacy_size
+
+
+def test_legacy_json_is_folded_losslessly(tmp_path, group):
+    path = tmp_path / "timetable.json"
+    lessons = [dict(lesson) for lesson in group]
+    path.write_text(json.dumps({"ИКВ-11": lessons}, ensure_ascii=False), encoding="utf-8")
+    loaded = BonchAPI.load_from_json(str(path))
+    assert isinstance(loaded["ИКВ-11"], GroupTimetable)
+    assert loaded["ИКВ-11"].first_day == FIRST_DAY
+    assert list(loaded["ИКВ-11"]) == list(group)
+
+
+def test_legacy_lessons_with_inconsistent_dates_stay_lists(group):
+    lessons = [dict(lesson) for lesson in group]
+    lessons[3]["Число"] = "2030.01.01"
+    assert timetable_model.load_timetable({"ИКВ-11": lessons})["ИКВ-11"] is lessons
+
+
+def test_unknown_compact_version_rejected():
+    with pytest.raises(ValueError):
+        timetable_model.load_timetable({"format": timetable_model.COMPACT_FORMAT, "version": 99})
@@ -5,7 +5,8 @@ sidecar-файлом метаданных расписания (timetable.meta.j
 метки времени, расчёт возраста кэша, проверка устаревания, человекочитаемое
 форматирование возраста.
 
-timetable.json (~58 МБ) формат не трогаем — метаданные пишем в sidecar-файл.
+Формат самого timetable.json (timetable_model) не трогаем — метаданные пишем
+в sidecar-файл.
 Если кэш старше TTL, при запросе группы он обновляется в фоне, а пользователю
 сразу отдаются текущие (пусть и слегка устаревшие) данные.
 
@@ -0,0 +1,255 @@
+"""Инвертированные индексы расписания всех групп: преподаватель, кабинет, неделя.
+
+TimetableBonchAPI.teacher_timetable / classroom_timetable на каждый клик
+навигации проходили подстрокой по всем занятиям всех групп и сортировали
+попадания с strptime на элемент. Теперь на снимок кэша
+(timetable_service.all_groups_timetable_cache) один раз строится
+TimetableIndex:
+
+- записи всех групп (клетки сетки GroupTimetable или dict старого формата)
+  нумеруются в порядке (день недели, время начала, группа, порядок в
+  группе) — id записи сразу задаёт порядок выдачи внутри недели;
+- преподаватель -> id, кабинет -> id, неделя -> id.
+
+Запросы — exact (точное ФИО/кабинет; у пары с несколькими преподавателями
+«А; Б» — каждый отдельно), prefix и substring (как раньше: подстрока поля).
+Результат — занятия в том же порядке, что давала прежняя сортировка
+(неделя, день, время), без сортировки на запрос.
+
+Там же — Catalog: отсортированные списки преподавателей, кабинетов, групп
+и предметов с числом занятий для постраничных /teachers, /classrooms,
+/groups (страница — срез готового списка).
+
+Индекс привязан к объекту снимка: for_snapshot() перестраивает его, только
+когда кэш переприсвоен. Модуль зависит только от stdlib и timetable_model.
+"""
+import bisect
+import logging
+import re
+import time
+from typing import Optional
+
+from timetable_model import GroupTimetable, LessonView, mask_to_weeks
+
+TEACHER = "teacher"
+ROOM = "room"
+
+TEACHERS = "teachers"
+ROOMS = "rooms"
+GROUPS = "groups"
+SUBJECTS = "subjects"
+CATALOG_PAGE_SIZE = 40
+
+EXACT = "exact"
+PREFIX = "prefix"
+SUBSTRING = "substring"
+
+# Ключ занятия старого формата (dict) для поля индекса.
+_LEGACY_KEYS = {TEACHER: 'ФИО преподавателя', ROOM: 'Номер кабинета'}
+_TIME_RE = re.compile(r"(\d{1,2}):(\d{1,2})$")
+
+
+def _start_minutes(time_str) -> int:
+    """Начало занятия в минутах от полуночи; как BonchAPI.parse_lesson_time, мусор — 0."""
+    if not time_str:
+        return 0
+    match = _TIME_RE.match(time_str.split('-')[0])
+    if not match:
+        return 0
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if hours > 23 or minutes > 59:
+        return 0
+    return hours * 60 + minutes
+
+
+def _split_teachers(value: str) -> list:
+    return [name.strip() for name in value.split(';') if name.strip()]
+
+
+class _FieldIndex:
+    """Значение поля -> id записей; отдельно — отдельные имена для exact/prefix."""
+
+    __slots__ = ("by_value", "by_name", "names")
+
+    def __init__(self):
+        self.by_value = {}
+        self.by_name = {}
+        self.names = []
+
+    def add(self, value: str, names, entry_id: int) -> None:
+        self.by_value.setdefault(value, []).append(entry_id)
+        for name in names:
+            ids = self.by_name.setdefault(name, [])
+            if not ids or ids[-1] != entry_id:
+                ids.append(entry_id)
+
+    def freeze(self) -> None:
+        self.by_value = {value: tuple(ids) for value, ids in self.by_value.items()}
+        self.by_name = {name: tuple(ids) for name, ids in self.by_name.items()}
+        self.names = sorted(self.by_name)
+
+    def find(self, query: str, mode: str) -> list:
+        """id записей по запросу, по возрастанию (т.е. в порядке выдачи)."""
+        if mode == EXACT:
+            return list(self.by_name.get(query, ()))
+        if mode == PREFIX:
+            start = bisect.bisect_left(self.names, query)
+            groups = []
+            for name in self.names[start:]:
+                if not name.startswith(query):
+                    break
+                groups.append(self.by_name[name])
+        elif mode == SUBSTRING:
+            groups = [ids for value, ids in self.by_value.items() if query in value]
+        else:
+            raise ValueError(f"Неизвестный режим поиска: {mode}")
+        if len(groups) == 1:
+            return list(groups[0])
+        return sorted({entry_id for ids in groups for entry_id in ids})
+
+
+class Catalog:
+    """Отсортированные списки (название, число занятий) по видам: TEACHERS, ROOMS, GROUPS, SUBJECTS."""
+
+    def __init__(self, counts: dict):
+        self._counts = counts
+        self._items = {kind: sorted(kind_counts.items()) for kind, kind_counts in counts.items()}
+
+    def items(self, kind: str) -> list:
+        return self._items.get(kind, [])
+
+    def count(self, kind: str, name: str) -> int:
+        return self._counts.get(kind, {}).get(name, 0)
+
+    def page(self, kind: str, page: int, per_page: int = CATALOG_PAGE_SIZE) -> tuple:
+        """(элементы страницы, номер страницы, всего страниц); номер обрезается до диапазона."""
+        items = self.items(kind)
+        pages = max(1, (len(items) + per_page - 1) // per_page)
+        page = max(0, min(page, pages - 1))
+        return items[page * per_page:(page + 1) * per_page], page, pages
+
+
+def _add_count(counts: dict, name, amount: int) -> None:
+    if name:
+        counts[name] = counts.get(name, 0) + amount
+
+
+class TimetableIndex:
+    """Индексы одного снимка расписания всех групп."""
+
+    def __init__(self, timetable: dict):
+        started = time.perf_counter()
+        entries = []
+        for lessons in timetable.values():
+            if isinstance(lessons, GroupTimetable):
+                for lesson in lessons.records_by_day:
+                    entries.append((lesson.day_index, _start_minutes(lesson.lesson_time),
+                                    lessons, lesson, lesson.weeks_mask))
+            elif isinstance(lessons, list):
+                for lesson in lessons:
+                    week = lesson.get('Номер недели')
+                    if not isinstance(week, int) or week < 0:
+                        continue
+                    entries.append((lesson.get('Номер дня недели', 0), _start_minutes(lesson.get('Время занятия')),
+                                    None, lesson, 1 << week))
+        # Стабильная сортировка: равные (день, время) — в порядке групп и страницы.
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        # id -> (владелец GroupTimetable или None для dict, запись, маска недель)
+        self._entries = [(owner, lesson, mask) for _day, _minutes, owner, lesson, mask in entries]
+
+        self._fields = {TEACHER: _FieldIndex(), ROOM: _FieldIndex()}
+        weeks = {}
+        counts = {TEACHERS: {}, ROOMS: {}, GROUPS: {}, SUBJECTS: {}}
+        for entry_id, (owner, lesson, mask) in enumerate(self._entries):
+            lessons_count = bin(mask).count("1")
+            teacher = self._value(owner, lesson, TEACHER)
+            if teacher:
+                names = _split_teachers(teacher)
+                self._fields[TEACHER].add(teacher, names, entry_id)
+                for name in names:
+                    _add_count(counts[TEACHERS], name, lessons_count)
+            room = self._value(owner, lesson, ROOM)
+            if room:
+                self._fields[ROOM].add(room, (room.strip(),), entry_id)
+                _add_count(counts[ROOMS], room.strip(), lessons_count)
+            subject = lesson.get('Предмет') if owner is None else lesson.subject
+            _add_count(counts[SUBJECTS], subject, lessons_count)
+            for week in mask_to_weeks(mask):
+                weeks.setdefault(week, []).append(entry_id)
+        for group_name, lessons in timetable.items():
+            if isinstance(lessons, (GroupTimetable, list)):
+                counts[GROUPS][group_name] = len(lessons)
+        self.catalog = Catalog(counts)
+        for field in self._fields.values():
+            field.freeze()
+        self._weeks = {week: tuple(ids) for week, ids in sorted(weeks.items())}
+        self.build_ms = (time.perf_counter() - started) * 1000
+        logging.info("Индекс расписания: %s записей, %s преподавателей, %s кабинетов за %.0f мс",
+                     len(self._entries), len(self._fields[TEACHER].by_name),
+                     len(self._fields[ROOM].by_name), self.build_ms)
+
+    @staticmethod
+    def _value(owner, lesson, field: str):
+        if owner is None:
+            return lesson.get(_LEGACY_KEYS[field])
+        return getattr(lesson, field)
+
+    def _expand(self, entry_id: int, week: int):
+        owner, lesson, _mask = self._entries[entry_id]
+        return lesson if owner is None else LessonView(owner, lesson, week)
+
+    def _ids(self, field: str, query: str, mode: str) -> list:
+        if not query:
+            return []
+        return self._fields[field].find(query, mode)
+
+    def weeks(self, field: str, query: str, mode: str = SUBSTRING) -> list:
+        """Недели, в которые есть занятия по запросу, по возрастанию."""
+        mask = 0
+        for entry_id in self._ids(field, query, mode):
+            mask |= self._entries[entry_id][2]
+        return mask_to_weeks(mask)
+
+    def lookup(self, field: str, query: str, mode: str = SUBSTRING, week: Optional[int] = None) -> list:
+        """
+        Занятия по запросу к полю (TEACHER, ROOM), отсортированные по
+        (неделя, день, время начала). week — только эта неделя.
+        """
+        ids = self._ids(field, query, mode)
+        if week is not None:
+            weeks = [week]
+        else:
+            mask = 0
+            for entry_id in ids:
+                mask |= self._entries[entry_id][2]
+            weeks = mask_to_weeks(mask)
+        result = []
+        for current_week in weeks:
+            bit = 1 << current_week if current_week >= 0 else 0
+            for entry_id in ids:
+                if self._entries[entry_id][2] & bit:
+                    result.append(self._expand(entry_id, current_week))
+        return result
+
+    def week_lessons(self, week: int) -> list:
+        """Все занятия недели по (день, время)."""
+        return [self._expand(entry_id, week) for entry_id in self._weeks.get(week, ())]
+
+    def names(self, field: str) -> list:
+        """Отдельные значения поля (ФИО, кабинеты), отсортированные."""
+        return list(self._fields[field].names)
+
+
+# Индекс текущего снимка: (снимок, индекс). Снимок держим ссылкой — сравнение
+# по identity, переприсвоение кэша в timetable_service даёт новый индекс.
+_current = (None, None)
+
+
+def for_snapshot(timetable: dict) -> TimetableIndex:
+    """Индекс снимка расписания; строится один раз на объект снимка."""
+    global _current
+    snapshot, index = _current
+    if snapshot is not timetable or index is None:
+        index = TimetableIndex(timetable)
+        _current = (timetable, index)
+    return index
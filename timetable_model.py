@@ -0,0 +1,326 @@
+"""Компактное хранение расписания групп: одна запись на клетку сетки.
+
+parsers.parse_timetable_table раскрывает каждую пару страницы в отдельный
+dict на каждую неделю из span.weeks: группа, предмет, преподаватель, кабинет
+и дата повторяются ~15 раз, отсюда timetable.json на ~58 МБ и такой же
+объём в all_groups_timetable_cache. Здесь пара хранится один раз:
+
+    (номер занятия, время, индекс дня, предмет, тип, преподаватель,
+     кабинет, маска недель)
+
+где бит N маски — «занятие идёт на неделе N». Дата ('Число') не хранится,
+а вычисляется из first_day при раскрытии.
+
+Запись — Lesson со __slots__; строки интернируются (sys.intern), так что
+ФИО, кабинеты, предметы и время занятий — по одному объекту на процесс,
+сколько бы групп их ни делили.
+
+GroupTimetable — read-only последовательность поверх этих записей: при
+итерации отдаёт LessonView — read-only Mapping с теми же ключами и
+значениями, что dict из parsers.parse_timetable_table, в том же порядке
+(неделя, день). Поэтому format_timetable_dict, rendering и
+TimetableBonchAPI.teacher_timetable работают с ней без изменений.
+
+dump_timetable / load_timetable — компактный формат timetable.json; старый
+формат (dict группа -> список dict) по-прежнему читается и, если это
+возможно без потерь, сразу сворачивается в компактный.
+
+Модуль зависит только от stdlib и parsers (названия дней недели).
+"""
+import logging
+import sys
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timedelta
+from typing import Optional
+
+from parsers import DAYS_OF_WEEK, DAYS_OF_WEEK_STR_TO_INT
+
+COMPACT_FORMAT = "timetable-compact"
+COMPACT_VERSION = 1
+FIRST_DAY_FORMAT = "%Y-%m-%d"
+LESSON_DATE_FORMAT = "%Y.%m.%d"
+
+# Поля записи (порядок — как у parsers.parse_timetable_pairs, последнее — маска).
+COLUMNS = ("lesson_number", "lesson_time", "day_index", "subject",
+           "lesson_type", "teacher", "room", "weeks_mask")
+# Ключи занятия в формате TImetabels.py, в порядке dict из parsers.
+LESSON_KEY_ORDER = (
+    'Группа', 'Число', 'День недели', 'Номер недели', 'Номер дня недели',
+    'Номер занятия', 'Время занятия', 'Предмет', 'Тип занятия',
+    'ФИО преподавателя', 'Номер кабинета',
+)
+LESSON_KEYS = frozenset(LESSON_KEY_ORDER)
+# Ключ занятия -> поле Lesson (остальные ключи вычисляются из недели и группы).
+_LESSON_FIELDS = {
+    'Номер занятия': 'lesson_number',
+    'Время занятия': 'lesson_time',
+    'Предмет': 'subject',
+    'Тип занятия': 'lesson_type',
+    'ФИО преподавателя': 'teacher',
+    'Номер кабинета': 'room',
+}
+
+
+def weeks_to_mask(weeks) -> int:
+    """Номера недель -> битовая маска (отрицательные номера отбрасываются)."""
+    mask = 0
+    for week in weeks:
+        if week >= 0:
+            mask |= 1 << week
+    return mask
+
+
+def mask_to_weeks(mask: int) -> list:
+    """Битовая маска -> номера недель по возрастанию."""
+    weeks = []
+    week = 0
+    while mask:
+        if mask & 1:
+            weeks.append(week)
+        mask >>= 1
+        week += 1
+    return weeks
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Lesson:
+    """Клетка сетки: пара и маска недель. Строки интернированы."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, lesson_number, lesson_time, day_index, subject, lesson_type,
+                 teacher, room, weeks_mask):
+        self.lesson_number = _intern(lesson_number)
+        self.lesson_time = _intern(lesson_time)
+        self.day_index = day_index
+        self.subject = _intern(subject)
+        self.lesson_type = _intern(lesson_type)
+        self.teacher = _intern(teacher)
+        self.room = _intern(room)
+        self.weeks_mask = weeks_mask
+
+    def as_record(self) -> tuple:
+        return (self.lesson_number, self.lesson_time, self.day_index, self.subject,
+                self.lesson_type, self.teacher, self.room, self.weeks_mask)
+
+    def __eq__(self, other):
+        if not isinstance(other, Lesson):
+            return NotImplemented
+        return self.as_record() == other.as_record()
+
+    def __hash__(self):
+        return hash(self.as_record())
+
+    def __repr__(self) -> str:
+        return f"Lesson{self.as_record()!r}"
+
+
+def union_mask(lessons) -> int:
+    """Объединение масок недель записей."""
+    mask = 0
+    for lesson in lessons:
+        mask |= lesson.weeks_mask
+    return mask
+
+
+def records_from_pairs(pairs) -> list:
+    """Результат parsers.parse_timetable_pairs -> записи Lesson с маской недель."""
+    return [Lesson(*pair[:7], weeks_to_mask(pair[7])) for pair in pairs]
+
+
+class LessonView(Mapping):
+    """
+    Занятие группы на конкретной неделе — read-only Mapping с ключами
+    формата TImetabels.py ('Группа', 'Число', ... 'Номер кабинета').
+    Ничего не копирует: значения берутся из Lesson и GroupTimetable.
+    """
+
+    __slots__ = ("_group", "_lesson", "_week")
+
+    def __init__(self, group: "GroupTimetable", lesson: Lesson, week: int):
+        self._group = group
+        self._lesson = lesson
+        self._week = week
+
+    def __getitem__(self, key):
+        field = _LESSON_FIELDS.get(key)
+        if field is not None:
+            return getattr(self._lesson, field)
+        if key == 'Номер недели':
+            return self._week
+        if key == 'Номер дня недели':
+            return self._lesson.day_index
+        if key == 'День недели':
+            return DAYS_OF_WEEK[self._lesson.day_index]
+        if key == 'Число':
+            return self._group.lesson_date(self._week, self._lesson.day_index)
+        if key == 'Группа':
+            return self._group.group_name
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(LESSON_KEY_ORDER)
+
+    def __len__(self) -> int:
+        return len(LESSON_KEY_ORDER)
+
+    def __contains__(self, key) -> bool:
+        return key in LESSON_KEYS
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class GroupTimetable(Sequence):
+    """
+    Расписание одной группы: записи клеток сетки + first_day. Как
+    последовательность — раскрытые по неделям занятия (LessonView, формат
+    TImetabels.py), отсортированные по (неделя, день недели).
+    """
+
+    __slots__ = ("group_name", "first_day", "records", "records_by_day")
+
+    def __init__(self, group_name: str, first_day: datetime, records):
+        self.group_name = _intern(group_name)
+        self.first_day = first_day
+        self.records = list(records)
+        # Стабильная сортировка по дню: внутри (неделя, день) — порядок страницы.
+        self.records_by_day = sorted(self.records, key=lambda lesson: lesson.day_index)
+
+    @classmethod
+    def from_pairs(cls, pairs, group_name: str, first_day: datetime) -> "GroupTimetable":
+        return cls(group_name, first_day, records_from_pairs(pairs))
+
+    def weeks(self) -> list:
+        """Недели, в которые у группы есть занятия, по возрастанию."""
+        return mask_to_weeks(union_mask(self.records))
+
+    def lesson_date(self, week: int, day_index: int) -> str:
+        return (self.first_day + timedelta(days=week * 7 + day_index)).strftime(LESSON_DATE_FORMAT)
+
+    def expand(self, lesson: Lesson, week: int) -> LessonView:
+        """Одна запись на одной неделе -> занятие (как dict из parsers.expand_timetable_pairs)."""
+        return LessonView(self, lesson, week)
+
+    def __iter__(self):
+        for week in self.weeks():
+            bit = 1 << week
+            for lesson in self.records_by_day:
+                if lesson.weeks_mask & bit:
+                    yield LessonView(self, lesson, week)
+
+    def __len__(self) -> int:
+        return sum(bin(lesson.weeks_mask).count("1") for lesson in self.records)
+
+    def __getitem__(self, index):
+        # Произвольный доступ нужен редко (lessons[0] в рендеринге) — раскрываем.
+        return list(self)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, GroupTimetable):
+            return (self.group_name == other.group_name and self.first_day == other.first_day
+                    and self.records == other.records)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"GroupTimetable({self.group_name!r}, записей: {len(self.records)}, занятий: {len(self)})"
+
+
+# --- timetable.json ----------------------------------------------------------
+
+def _first_day_of(timetable: dict) -> Optional[datetime]:
+    """Общий first_day, если все группы компактные и он у них один; иначе None."""
+    first_days = set()
+    for lessons in timetable.values():
+        if not isinstance(lessons, GroupTimetable):
+            return None
+        first_days.add(lessons.first_day)
+    if len(first_days) > 1:
+        return None
+    return first_days.pop() if first_days else datetime.min
+
+
+def dump_timetable(timetable: dict) -> dict:
+    """
+    Расписание всех групп -> JSON-совместимый dict. Компактный формат, если
+    все группы — GroupTimetable с общим first_day; иначе старый (группа ->
+    список dict), чтобы не терять поля, которых в компактной записи нет.
+    """
+    first_day = _first_day_of(timetable)
+    if first_day is None:
+        return {
+            group: [dict(lesson) for lesson in lessons] if isinstance(lessons, GroupTimetable) else lessons
+            for group, lessons in timetable.items()
+        }
+    return {
+        "format": COMPACT_FORMAT,
+        "version": COMPACT_VERSION,
+        "first_day": first_day.strftime(FIRST_DAY_FORMAT) if timetable else None,
+        "columns": list(COLUMNS),
+        "groups": {
+            group: [list(lesson.as_record()) for lesson in lessons.records]
+            for group, lessons in timetable.items()
+        },
+    }
+
+
+def is_compact(data) -> bool:
+    return isinstance(data, dict) and data.get("format") == COMPACT_FORMAT
+
+
+def load_timetable(data: dict) -> dict:
+    """JSON timetable.json (компактный или старый формат) -> расписание всех групп."""
+    if not is_compact(data):
+        return {group: _from_legacy(group, lessons) for group, lessons in data.items()}
+    if data.get("version") != COMPACT_VERSION:
+        raise ValueError(f"Неизвестная версия компактного расписания: {data.get('version')}")
+    first_day = datetime.strptime(data["first_day"], FIRST_DAY_FORMAT) if data.get("first_day") else None
+    return {
+        group: GroupTimetable(group, first_day, [Lesson(*record) for record in records])
+        for group, records in data["groups"].items()
+    }
+
+
+def _from_legacy(group_name: str, lessons):
+    """
+    Список dict старого формата -> GroupTimetable, если свёртка без потерь:
+    все 11 полей на месте, дата согласована с неделей/днём, пары не
+    повторяются. Иначе список возвращается как есть.
+    """
+    if not isinstance(lessons, list) or not lessons:
+        return lessons
+    first_day = None
+    records = {}
+    for lesson in lessons:
+        if not isinstance(lesson, dict) or lesson.keys() != LESSON_KEYS:
+            return lessons
+        try:
+            day_name = lesson['День недели']
+            day_index = DAYS_OF_WEEK_STR_TO_INT[day_name]
+            week = lesson['Номер недели']
+            if lesson['Группа'] != group_name or lesson['Номер дня недели'] != day_index or week < 0:
+                return lessons
+            lesson_first_day = (datetime.strptime(lesson['Число'], LESSON_DATE_FORMAT)
+                                - timedelta(days=week * 7 + day_index))
+        except (KeyError, TypeError, ValueError):
+            return lessons
+        if first_day is None:
+            first_day = lesson_first_day
+        elif lesson_first_day != first_day:
+            return lessons
+        key = (lesson['Номер занятия'], lesson['Время занятия'], day_index, lesson['Предмет'],
+               lesson['Тип занятия'], lesson['ФИО преподавателя'], lesson['Номер кабинета'])
+        mask = records.get(key, 0)
+        if mask & (1 << week):
+            return lessons
+        records[key] = mask | (1 << week)
+    logging.debug("Группа %s: старый формат свёрнут в %s записей", group_name, len(records))
+    return GroupTimetable(group_name, first_day, [Lesson(*key, mask) for key, mask in records.items()])
+
@@ -6,7 +6,8 @@
 - `progress_updater` — фоновый цикл рассылки прогресса;
 - `get_all_groups_timetable` — главная точка: кэш в памяти + JSON + TTL-рефреш;
 - `_refresh_timetable_quietly` — фоновое обновление расписания без сообщений;
-- `preload_timetable` — фоновая предзагрузка расписания при старте бота.
+- `preload_timetable` — фоновая предзагрузка расписания при старте бота;
+- `refresh_search_indexes` — индексы снимка: timetable_index и fuzzy_index.
 
 Внутреннее изменяемое состояние сервиса (`all_groups_timetable_cache`,
 `timetable_loading`, `timetable_progress`, `timetable_progress_users`)
@@ -16,8 +17,8 @@
 устаревшую ссылку/значение.
 
 Направление зависимостей: timetable_service -> lk_client / timetable_cache /
-botcore / TImetabels (вниз по слоям). Модуль НЕ импортирует main на уровне
-модуля — цикла зависимостей нет.
+botcore / TImetabels / http_pool / timetable_index / fuzzy_index (вниз по слоям). Модуль НЕ импортирует main
+на уровне модуля — цикла зависимостей нет.
 """
 import asyncio
 import logging
@@ -25,6 +26,10 @@ from datetime import datetime
 
 import pytz
 
+import fuzzy_index
+import http_pool
+import lk_client
+import timetable_index
 from lk_client import get_timetable_api
 from timetable_cache import (
     _write_timetable_meta,
@@ -51,13 +56,42 @@ timetable_progress_users = {}  # Словарь {user_id: message} для отп
 timetable_progress = {'current': 0, 'total': 0, 'start_time': None}  # Прогресс загрузки
 
 
+def _search_sources(timetable) -> tuple:
+    """По чему строится поисковый индекс: снимок расписания и api.groups_id (если API уже создан)."""
+    return timetable, getattr(lk_client.timetable_api, "groups_id", None)
+
+
+def search_index_synced(timetable) -> bool:
+    """Индекс нечёткого поиска соответствует снимку и списку групп API."""
+    return fuzzy_index.index.is_synced(_search_sources(timetable))
+
+
+def refresh_search_indexes(timetable) -> None:
+    """
+    Индексы нового снимка: timetable_index строится заново (привязан к
+    объекту снимка), нечёткий поиск синхронизируется инкрементально — id
+    оставшихся групп/преподавателей/кабинетов не меняются. Названия групп —
+    ещё и из api.groups_id: группа, чья страница не загрузилась или не
+    разобралась, находится по названию так же, как по id.
+    """
+    sources = _search_sources(timetable)
+    names = {}
+    if timetable is not None:
+        catalog = timetable_index.for_snapshot(timetable).catalog
+        names = {kind: [name for name, _count in catalog.items(kind)] for kind in fuzzy_index.KINDS}
+    groups_id = sources[1]
+    if groups_id:
+        names[fuzzy_index.GROUPS] = set(names.get(fuzzy_index.GROUPS, ())) | set(groups_id.values())
+    added, removed = fuzzy_index.index.sync(names, snapshot=sources)
+    logging.info("Поисковый индекс: +%s, -%s, всего %s", added, removed, len(fuzzy_index.index))
+
+
 async def all_groups_timetable_with_progress(api):
     """
     Загружает расписание всех групп с отслеживанием прогресса.
     Использует оригинальный метод API, но отслеживает прогресс через глобальную переменную.
     """
     from datetime import datetime
-    import aiohttp
     from tqdm.asyncio import tqdm_asyncio
 
     start = datetime.now()
@@ -75,12 +109,15 @@ async def all_groups_timetable_with_progress(api):
     timetable_progress['current'] = 0
     timetable_progress['start_time'] = start
 
-    connector = aiohttp.TCPConnector(limit=api.limit)
-    async with aiohttp.ClientSession(connector=connector, trust_env=True, headers=BROWSER_HEADERS) as session:
+    # Соединения — из общего пула cabinet.sut.ru; api.limit ограничивает
+    # одновременные запросы загрузки.
+    slots = asyncio.Semaphore(api.limit)
+    async with http_pool.session(http_pool.CABINET_HOST, headers=BROWSER_HEADERS) as session:
         completed = 0
         async def track_progress(coro):
             nonlocal completed
-            result = await coro
+            async with slots:
+                result = await coro
             completed += 1
             timetable_progress['current'] = min(completed, total_groups)
             return result
@@ -206,6 +243,7 @@ async def get_all_groups_timetable(force_reload: bool = False, user_id: int = No
                 if timetable_from_json:
                     all_groups_timetable_cache = timetable_from_json
                     logging.info(f"Расписание загружено из JSON файла: {len(all_groups_timetable_cache)} групп")
+                    refresh_search_indexes(all_groups_timetable_cache)
                     return all_groups_timetable_cache
             except Exception as e:
                 logging.warning(f"Не удалось загрузить расписание из JSON: {e}. Загружаю с сервера...")
@@ -239,6 +277,8 @@ async def get_all_groups_timetable(force_reload: bool = False, user_id: int = No
 
             all_groups_timetable_cache = await all_groups_timetable_with_progress(api)
             logging.info(f"Расписание всех групп загружено: {len(all_groups_timetable_cache)} групп")
+            # Индексы преподавателей/кабинетов и поиска — сразу, а не на первом клике.
+            refresh_search_indexes(all_groups_timetable_cache)
             # Сохранение в JSON уже выполняется в all_groups_timetable_with_progress.
             # Метку времени пишем в sidecar — для TTL и текста «обновлено N назад».
             _write_timetable_meta(datetime.now(pytz.timezone("Europe/Moscow")))